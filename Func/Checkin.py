@@ -0,0 +1,233 @@
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# 上报协议：UDP 数据报，内容为 UTF-8 JSON
+#   客户端 -> 采集服务  {"type": "report", "id": 1, "token": "...", "sent": 1722124800.0, "info": {...}}
+#   采集服务 -> 客户端  {"type": "ack", "id": 1}  写入数据库后确认；{"type": "error", "id": 1, "error": "..."} 写入失败
+#   查询运行指标        {"type": "stats", "token": "..."} -> {"type": "stats", "metrics": {...}}
+#   心跳（不确认）      {"type": "heartbeat", "token": "...", "key": ["ComputerName", "Name"]}
+#   订阅变更推送        {"type": "subscribe", "token": "..."} -> {"type": "subscribed", "seq": 12}，需定期续订
+#   变更推送            {"type": "delta", "seq": 13, "rows": [[...], ...], "deleted": [["ComputerName", "Name"], ...]}
+#                       seq 逐条加一，订阅方发现不连续时说明有推送丢失
+REPORT = "report"
+ACK = "ack"
+ERROR = "error"
+STATS = "stats"
+HEARTBEAT = "heartbeat"
+SUBSCRIBE = "subscribe"
+SUBSCRIBED = "subscribed"
+DELTA = "delta"
+
+MAX_DATAGRAM = 8192  # 单个数据报的最大字节数
+
+
+def encode(message: Dict[str, Any]) -> bytes:
+    return json.dumps(message, ensure_ascii=False).encode("utf-8")
+
+
+def decode(data: bytes) -> Optional[Dict[str, Any]]:
+    """解析数据报，格式不正确时返回 None"""
+    try:
+        message = json.loads(data.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return None
+    return message if isinstance(message, dict) and "type" in message else None
+
+
+def report_message(report_id: int, info: Dict[str, Any], token="") -> Dict[str, Any]:
+    """上报消息，sent 为发送时的时间戳，用于统计端到端延迟"""
+    return {"type": REPORT, "id": report_id, "token": token, "sent": time.time(), "info": info}
+
+
+def heartbeat_message(key: Sequence[str], token="") -> Dict[str, Any]:
+    """心跳消息，key 为 (ComputerName, Name)"""
+    return {"type": HEARTBEAT, "token": token, "key": list(key)}
+
+
+def json_value(value):
+    """查询结果中的值转换为可序列化的值，日期时间为 'YYYY-MM-DD HH:MM:SS' 文本"""
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return str(value)
+
+
+def delta_chunks(rows: Sequence[Sequence], deleted: Sequence[Sequence], max_bytes=MAX_DATAGRAM - 256):
+    """
+    把变更拆分为多个不超过数据报大小的 (rows, deleted)，删除记录在前，与数据库中的顺序一致
+
+    每项单独估算编码后的长度，max_bytes 为消息其余部分预留了空间
+    """
+    chunk_rows, chunk_deleted, size = [], [], 0
+    items = [(True, key) for key in deleted] + [(False, row) for row in rows]
+    for is_deleted, item in items:
+        item = [json_value(value) for value in item]
+        item_size = len(encode(item)) + 1
+        if size + item_size > max_bytes and (chunk_rows or chunk_deleted):
+            yield chunk_rows, chunk_deleted
+            chunk_rows, chunk_deleted, size = [], [], 0
+        (chunk_deleted if is_deleted else chunk_rows).append(item)
+        size += item_size
+    if chunk_rows or chunk_deleted:
+        yield chunk_rows, chunk_deleted
+
+
+def percentile(values: Sequence[float], fraction: float) -> Optional[float]:
+    """已排序序列的百分位数，序列为空时返回 None"""
+    if not values:
+        return None
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class PresenceMap:
+    """
+    在线状态表：记录每台计算机最近一次心跳的时间，超过 ttl 秒没有心跳视为离线并移除
+
+    数据库中的 LastSeen 不随每次心跳更新：take_dirty 返回上次取出后有心跳的计算机，由调用方批量写入
+
+    :param ttl: 心跳有效期（秒）
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.last_seen: Dict[Tuple[str, str], float] = {}  # 主键 -> 最近一次心跳（time.monotonic）
+        self.dirty = set()  # 尚未写入 LastSeen 的主键
+
+    def __len__(self):
+        with self.lock:
+            return len(self.last_seen)
+
+    def seen(self, key: Tuple[str, str]):
+        """收到心跳或上报"""
+        with self.lock:
+            self.last_seen[key] = time.monotonic()
+            self.dirty.add(key)
+
+    def expire(self) -> int:
+        """移除超过有效期的计算机，返回移除的数量"""
+        deadline = time.monotonic() - self.ttl
+        with self.lock:
+            expired = [key for key, seen in self.last_seen.items() if seen < deadline]
+            for key in expired:
+                del self.last_seen[key]
+                self.dirty.discard(key)
+        return len(expired)
+
+    def take_dirty(self) -> List[Tuple[str, str]]:
+        """取出需要写入 LastSeen 的计算机"""
+        with self.lock:
+            keys, self.dirty = list(self.dirty), set()
+        return keys
+
+    def restore_dirty(self, keys: Sequence[Tuple[str, str]]):
+        """写入失败时放回，下次再写"""
+        with self.lock:
+            self.dirty.update(key for key in keys if key in self.last_seen)
+
+
+class Metrics:
+    """
+    采集服务的运行指标：收到与合并的上报数、批次大小分布、端到端与排队延迟
+
+    分布只保留最近 window 个样本
+    """
+
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.received = 0  # 收到的上报数
+        self.coalesced = 0  # 写入前被同一台计算机的新上报取代的上报数
+        self.rejected = 0  # 格式不正确或口令不符的数据报
+        self.heartbeats = 0
+        self.presence_writes = 0  # 批量写入 LastSeen 的次数
+        self.presence_rows = 0
+        self.deltas = 0  # 推送的变更消息数（每个订阅方计一次）
+        self.delta_rows = 0  # 推送的变更行数（含删除，不按订阅方重复计）
+        self.batches = 0
+        self.rows = 0  # 写入的行数
+        self.failed_batches = 0
+        self.batch_sizes = deque(maxlen=window)
+        self.latencies = deque(maxlen=window)  # 客户端发出到写入完成（秒）
+        self.queue_times = deque(maxlen=window)  # 收到到写入完成（秒）
+
+    def record_received(self, coalesced: bool):
+        with self.lock:
+            self.received += 1
+            if coalesced:
+                self.coalesced += 1
+
+    def record_heartbeat(self):
+        with self.lock:
+            self.heartbeats += 1
+
+    def record_presence(self, rows: int):
+        with self.lock:
+            self.presence_writes += 1
+            self.presence_rows += rows
+
+    def record_delta(self, messages: int, rows: int):
+        with self.lock:
+            self.deltas += messages
+            self.delta_rows += rows
+
+    def record_rejected(self):
+        with self.lock:
+            self.rejected += 1
+
+    def record_batch(self, size: int, latencies: Sequence[float], queue_times: Sequence[float]):
+        with self.lock:
+            self.batches += 1
+            self.rows += size
+            self.batch_sizes.append(size)
+            self.latencies.extend(latencies)
+            self.queue_times.extend(queue_times)
+
+    def record_failure(self):
+        with self.lock:
+            self.failed_batches += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前指标，延迟单位为毫秒"""
+        with self.lock:
+            sizes = sorted(self.batch_sizes)
+            latencies = sorted(self.latencies)
+            queue_times = sorted(self.queue_times)
+            counts = {
+                "received": self.received,
+                "coalesced": self.coalesced,
+                "rejected": self.rejected,
+                "heartbeats": self.heartbeats,
+                "presence_writes": self.presence_writes,
+                "presence_rows": self.presence_rows,
+                "deltas": self.deltas,
+                "delta_rows": self.delta_rows,
+                "batches": self.batches,
+                "rows": self.rows,
+                "failed_batches": self.failed_batches,
+            }
+
+        def milliseconds(value):
+            return None if value is None else round(value * 1000, 1)
+
+        return {
+            **counts,
+            "batch_size": {
+                "mean": round(sum(sizes) / len(sizes), 1) if sizes else None,
+                "p50": percentile(sizes, 0.5),
+                "p95": percentile(sizes, 0.95),
+                "max": sizes[-1] if sizes else None,
+            },
+            "latency_ms": {
+                "p50": milliseconds(percentile(latencies, 0.5)),
+                "p95": milliseconds(percentile(latencies, 0.95)),
+                "max": milliseconds(latencies[-1] if latencies else None),
+            },
+            "queue_ms": {
+                "p50": milliseconds(percentile(queue_times, 0.5)),
+                "p95": milliseconds(percentile(queue_times, 0.95)),
+            },
+        }
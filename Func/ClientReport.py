@@ -0,0 +1,70 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from Func import GetClientInfo, Statements
+
+# 上次写入数据库的本机信息、身份哈希与上报次数
+CLIENT_INFO_PATH = Path("Data/client_info.json")
+
+
+def load_client_info(path=CLIENT_INFO_PATH) -> Dict[str, Any]:
+    """读取客户端信息文件"""
+    if not path.exists():
+        # 文件不存在，创建文件返回空字典
+        with open(path, 'w', encoding='utf-8'):
+            return {}
+
+    # 文件存在，读取旧数据
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            data = json.load(f)
+            return data
+        except json.JSONDecodeError:
+            # 如果文件内容不是合法的 json（如空文件），可以选择覆盖
+            with open(path, 'w', encoding='utf-8'):
+                return {}
+
+
+def save_client_info(path, client_info: Dict[str, Any], counters: Dict[str, int]):
+    """保存已写入数据库的客户端信息、身份哈希与上报次数"""
+    record = {**client_info, "IdentityHash": GetClientInfo.identity_hash(client_info), "Counters": counters}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(record, f, ensure_ascii=False, indent=4)
+
+
+def load_counters(old_data: Dict[str, Any]) -> Dict[str, int]:
+    """本机完整写入与只更新登录时间的次数"""
+    return old_data.get("Counters", {"upserts": 0, "touches": 0})
+
+
+def needs_upsert(new_data: Dict[str, Any], old_data: Dict[str, Any]) -> bool:
+    """比较当前计算机的身份信息与上次写入的是否不同（忽略 StartTime），不同时需要完整写入"""
+    if not old_data:
+        return True
+    old_hash = old_data.get("IdentityHash") or GetClientInfo.identity_hash(old_data)
+    return GetClientInfo.identity_hash(new_data) != old_hash
+
+
+def upsert_statement(new_data: Dict[str, Any], use_procedures=False) -> Tuple[str, List, Tuple]:
+    """
+    完整写入本机信息的语句
+
+    :return: (语句, 参数, 写操作日志的合并键)，同一台计算机尚未写入的上报只保留最新一条
+    """
+    sql = Statements.resolve(Statements.UPSERT_COMPUTER, use_procedures)
+    params = [
+        new_data['ComputerName'],
+        new_data['Name'],
+        new_data['LoginUserName'],
+        new_data['ComputerMAC'],
+        new_data['ComputerIP'],
+        new_data['StartTime']
+    ]
+    return sql, params, ("upsert", new_data['ComputerName'], new_data['Name'])
+
+
+def touch_statement(new_data: Dict[str, Any], counted=False) -> Tuple[str, List]:
+    """身份信息未变化时只更新最近登录时间的语句，counted 为 True 时同时累加 TouchCount"""
+    sql = Statements.TOUCH_COMPUTER_COUNTED if counted else Statements.TOUCH_COMPUTER
+    return sql, [new_data['StartTime'], new_data['ComputerName'], new_data['Name']]
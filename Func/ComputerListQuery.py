@@ -0,0 +1,120 @@
+from typing import List, Tuple, Optional
+
+# ComputerList 查询返回的列，顺序与搜索表格的列一致
+COLUMNS = ["Name", "LoginUserName", "ComputerName", "ComputerIP", "ComputerMAC", "StartTime", "Tab"]
+
+# 分页键 (LoginUserName, ComputerName) 在查询结果中的位置
+KEY_INDEXES = (1, 2)
+
+SELECT_COLUMNS = "SELECT " + ", ".join(COLUMNS) + " FROM ComputerList"
+
+
+# 数据库主键 (ComputerName, Name) 在查询结果中的位置，与 MERGE 的 ON 条件一致
+PRIMARY_KEY_INDEXES = (2, 0)
+
+
+def row_key(row) -> Tuple:
+    """查询结果行的分页键 (LoginUserName, ComputerName)"""
+    return tuple(row[i] for i in KEY_INDEXES)
+
+
+def primary_key(row) -> Tuple:
+    """查询结果行的数据库主键 (ComputerName, Name)"""
+    return tuple(row[i] for i in PRIMARY_KEY_INDEXES)
+
+
+def select_top(limit, where="", order_by="", dialect="mssql") -> str:
+    """
+    生成带行数限制的查询语句
+
+    :param dialect: 'mssql' 使用 TOP，'sqlite' 使用 LIMIT
+    """
+    where = f" WHERE {where}" if where else ""
+    order_by = f" ORDER BY {order_by}" if order_by else ""
+    if dialect == "sqlite":
+        return f"{SELECT_COLUMNS}{where}{order_by} LIMIT {int(limit)}"
+    return f"SELECT TOP ({int(limit)}) {', '.join(COLUMNS)} FROM ComputerList{where}{order_by}"
+
+
+class KeysetPager:
+    """
+    基于 (LoginUserName, ComputerName) 的键集（seek）分页。
+
+    每页只按上一页的边界键向后/向前定位，不使用 OFFSET，翻页开销与总行数无关。
+    每次多取一行用于判断是否还有下一页/上一页。
+    """
+
+    FORWARD = "forward"
+    BACKWARD = "backward"
+
+    def __init__(self, page_size=100, dialect="mssql"):
+        self.page_size = page_size
+        self.dialect = dialect  # 生成语句的数据库方言，见 select_top
+        self.page_index = 0  # 当前页序号，从 0 开始
+        self.first_key = None  # 当前页第一行的键
+        self.last_key = None  # 当前页最后一行的键
+        self.has_next = False
+
+    def has_previous(self):
+        return self.page_index > 0
+
+    def first_page(self) -> Tuple[str, list, str]:
+        """第一页的查询语句"""
+        sql = select_top(self.page_size + 1, order_by="LoginUserName, ComputerName", dialect=self.dialect)
+        return sql, [], self.FORWARD
+
+    def next_page(self, after_key: Optional[Tuple] = None) -> Tuple[str, list, str]:
+        """下一页（默认为当前页最后一行之后）的查询语句"""
+        login_user_name, computer_name = after_key or self.last_key
+        sql = select_top(self.page_size + 1,
+                         "LoginUserName >= %s AND (LoginUserName > %s OR ComputerName > %s)",
+                         "LoginUserName, ComputerName", self.dialect)
+        return sql, [login_user_name, login_user_name, computer_name], self.FORWARD
+
+    def previous_page(self) -> Tuple[str, list, str]:
+        """上一页（当前页第一行之前）的查询语句，结果为倒序"""
+        login_user_name, computer_name = self.first_key
+        sql = select_top(self.page_size + 1,
+                         "LoginUserName <= %s AND (LoginUserName < %s OR ComputerName < %s)",
+                         "LoginUserName DESC, ComputerName DESC", self.dialect)
+        return sql, [login_user_name, login_user_name, computer_name], self.BACKWARD
+
+    def current_page(self) -> Tuple[str, list]:
+        """从当前页第一行开始（含）重新查询当前页，用于刷新"""
+        if self.first_key is None:
+            sql, params, _ = self.first_page()
+            return sql, params
+        login_user_name, computer_name = self.first_key
+        sql = select_top(self.page_size,
+                         "LoginUserName >= %s AND (LoginUserName > %s OR ComputerName >= %s)",
+                         "LoginUserName, ComputerName", self.dialect)
+        return sql, [login_user_name, login_user_name, computer_name]
+
+    def accept(self, rows: List, direction: str, restart=False) -> List:
+        """
+        接收一页查询结果，更新分页状态并返回本页要显示的行
+
+        :param rows: 查询结果（最多 page_size + 1 行）
+        :param direction: 查询方向
+        :param restart: 是否为第一页
+        """
+        more = len(rows) > self.page_size
+        rows = list(rows[:self.page_size])
+
+        if direction == self.BACKWARD:
+            rows.reverse()
+            self.page_index = max(0, self.page_index - 1)
+            self.has_next = True
+            if not more:  # 已经回到开头
+                self.page_index = 0
+        elif restart:
+            self.page_index = 0
+            self.has_next = more
+        else:
+            self.page_index += 1
+            self.has_next = more
+
+        if rows:
+            self.first_key = row_key(rows[0])
+            self.last_key = row_key(rows[-1])
+        return rows
@@ -0,0 +1,153 @@
+import copy
+import json
+from pathlib import Path
+from typing import Dict, Any
+
+CONFIG_PATH = Path("Data/config.json")
+
+# 默认配置，Data/config.json 中的同名项会覆盖这里的值
+DEFAULT_CONFIG = {
+    "database": {
+        "server": "192.168.248.236",
+        "port": 1433,
+        "database": "LanRemoteMaster",
+        "user": "sa",
+        "password": "yuan@5419",
+        "login_timeout": 5,  # 建立连接的超时秒数，一台服务器不可达时不会长时间阻塞启动与探测
+    },
+    # 多台服务器（主库、只读副本、各站点服务器），为空时只使用 database。每项可填写 name、role（primary/replica）
+    # 及 server、port 等连接参数，未填写的参数沿用 database。查询使用探测延迟最低的可用服务器，写操作使用主库。
+    # 例：[{"name": "总部", "role": "primary"}, {"name": "分部", "server": "10.1.0.5"}]
+    "endpoints": [],
+    # 联合搜索：同一搜索同时发往各站点的 LanRemoteMaster 数据库，结果按 (LoginUserName, ComputerName) 合并去重并标注来源
+    "federation": {
+        "enabled": False,
+        "local_name": "本站",  # 本站数据库（database/endpoints）在来源列中的名称
+        "include_local": True,  # 是否同时搜索本站数据库
+        "sites": [],  # 各站点数据库，每项可填写 name 及 server、port、database 等连接参数，未填写的沿用 database
+    },
+    "pool": {
+        "max_size": 4,  # 最大连接数，同时也是并行执行任务的线程数
+        "min_idle": 1,  # 启动时预先建立的连接数
+        "max_idle": 2,  # 归还后最多保留的空闲连接数，多余的直接关闭
+        "health_check_after": 30,  # 空闲超过该秒数的连接在借出前先做一次健康检查
+        "keepalive_interval": 60,  # 每隔该秒数检查空闲连接，保持连接不被防火墙/NAT 断开，0 表示不检查
+        "max_retries": 3,  # 连接断开时查询的最多重试次数（写操作不重试）
+        "retry_backoff": 0.5,  # 首次重连等待秒数，之后每次加倍
+        "retry_backoff_max": 30,  # 重连等待秒数上限
+    },
+    "stream": {
+        "chunk_size": 500,  # 流式查询每批读取的行数
+        "max_pending_batches": 2,  # 主线程尚未处理的批次上限，超过后暂停读取
+    },
+    "journal": {
+        "enabled": True,  # 写操作先写入本地日志，数据库不可达时不丢失，恢复连接后按顺序重放
+        "path": "Data/write_journal.jsonl",
+    },
+    "statements": {
+        "prepare": True,  # 把带参数的语句包装为 sp_executesql 调用，SQL Server 可复用执行计划
+        "use_procedures": False,  # 使用结构迁移安装的存储过程（usp_UpsertComputer 等）执行写入与七列搜索
+    },
+    "search": {
+        "live": True,  # 是否边输入边搜索
+        "debounce_ms": 300,  # 停止输入多少毫秒后才发出搜索
+        "min_chars": 2,  # 边输入边搜索时搜索词的最少字符数，过短的词不发出查询
+        "typed": True,  # 识别 IP、网段、MAC、日期搜索词，只查询对应列
+        # 整数形式 IP 的计算列名，执行结构迁移（python -m Func.Migrations upgrade）后可设为 ComputerIPNum，网段搜索改用数值范围
+        "ip_number_column": None,
+    },
+    "browse": {
+        "page_size": 100,  # 分页浏览每页行数
+        "prefetch": True,  # 是否在后台预取下一页
+    },
+    "refresh": {
+        "interval": 5,  # 自动刷新间隔（秒）
+    },
+    "cache": {
+        "enabled": True,
+        "max_entries": 128,  # 最多缓存的查询数
+        "ttl": 30,  # 结果保持新鲜的秒数
+        "stale_while_revalidate": 60,  # 过期后仍先返回旧结果并在后台刷新的秒数，0 表示不启用
+        "max_rows": 5000,  # 单个结果超过该行数时不缓存
+    },
+    "client_info": {
+        "interval": 10,  # 后台采集本机网络信息的间隔（秒），只在信息变化时刷新界面
+        "watch": True,  # 监视 IP 地址变化（Windows NotifyAddrChange），变化后立即重新采集
+        "user_check_interval": 300,  # 重新读取登录用户的间隔（秒），0 表示只在启动时读取
+        "min_report_interval": 60,  # 信息变化后上报到数据库的最小间隔（秒），频繁变化时合并为一次上报
+        "report_interval": 9000,  # 信息未变化时的定期上报间隔（秒）
+        # 身份信息未变化时的上报同时累加 TouchCount，统计省去的完整写入次数（需执行结构迁移版本 7）
+        "touch_counter": False,
+        "fleet_stats_interval": 300,  # 启用 touch_counter 时读取全部计算机上报统计的间隔（秒），显示在计算机名的提示中
+    },
+    # 在线状态：上报代理经采集服务定期发送心跳，采集服务批量更新 LastSeen（需执行结构迁移版本 8）；
+    # 界面在配置了 agent.collector 时也发送本机心跳，否则只运行界面的计算机显示为“无心跳”
+    "presence": {
+        "enabled": False,
+        "heartbeat_interval": 30,  # 代理与界面发送心跳的间隔（秒）
+        "flush_interval": 30,  # 采集服务批量写入 LastSeen 的间隔（秒）
+        "ttl": 120,  # 超过该秒数没有心跳视为离线，应大于心跳间隔与写入间隔之和
+        "refresh_interval": 30,  # 界面重新读取在线计算机的间隔（秒）
+    },
+    # 变更推送：采集服务轮询 ComputerList 的变更并推送给订阅的界面（需要结构迁移版本 9 与 agent.collector）
+    "live": {
+        "enabled": False,
+        "poll_interval": 2,  # 采集服务读取变更的间隔（秒）
+        "batch_rows": 500,  # 每次最多读取的变更行数，超过时继续读取
+        # 每次轮询重新读取该秒数内的版本：并行事务可能晚于更大的版本提交，窗口应大于最长的写事务
+        "reread_window": 30,
+        # 删除记录的保留秒数，本地副本（replica）的增量同步据此同步删除，应大于其同步间隔
+        "tombstone_retention": 86400,
+        "subscription_ttl": 90,  # 订阅有效期（秒），界面需在此之前续订
+        "renew_interval": 30,  # 界面续订的间隔（秒）
+    },
+    # 无界面上报代理（python agent.py）
+    "agent": {
+        "journal_path": "Data/agent_journal.jsonl",  # 代理的写操作日志，与界面程序分开，两者可同时运行
+        "log_path": "",  # 日志文件，为空时输出到控制台
+        "collector": "",  # 采集服务地址（host:port），填写后通过采集服务上报，不再直接连接数据库
+        "collector_timeout": 5,  # 等待采集服务确认的秒数
+        "collector_retries": 3,  # 未收到确认时的重发次数
+    },
+    # 上报采集服务（python collector.py），合并各客户端的上报后批量写入
+    "collector": {
+        "host": "0.0.0.0",
+        "port": 5140,
+        "token": "",  # 客户端与服务共用的口令，不符的数据报被丢弃，为空时不校验
+        "flush_interval": 1.0,  # 批量写入间隔（秒）
+        "max_batch": 200,  # 每批最多写入的计算机数（不超过 SQL Server 参数数上限对应的行数）
+        "pool_size": 2,  # 数据库连接数，即同时进行的批量写入数
+        "metrics_interval": 60,  # 输出运行指标的间隔（秒），0 表示不输出
+        "log_path": "",
+    },
+    "replica": {
+        "enabled": False,  # 是否启用 ComputerList 的本地 SQLite 副本
+        "path": "Data/replica.db",
+        "serve_searches": True,  # 为 True 时搜索总在本地副本执行，否则仅在服务器不可达时使用
+        "sync_interval": 60,  # 增量同步间隔（秒）
+        "full_sync_interval": 3600,  # 全量同步间隔（秒），用于同步删除与编辑
+        "chunk_size": 1000,  # 同步时每批读取的行数
+        "trigram_index": True,  # 是否为本地搜索建立三元组索引（内存中），代替七列 LIKE 全表扫描
+        "search_limit": 0,  # 索引搜索最多返回的行数（按匹配程度排序），0 表示不限
+    },
+}
+
+
+def merge_config(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """递归合并配置，override 覆盖 base"""
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def load_config(path: Path = CONFIG_PATH) -> Dict[str, Any]:
+    """读取配置文件，文件不存在或格式错误时使用默认配置"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return merge_config(DEFAULT_CONFIG, json.load(f))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return copy.deepcopy(DEFAULT_CONFIG)
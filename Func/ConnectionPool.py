@@ -0,0 +1,187 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Any
+
+
+class PoolClosedError(Exception):
+    """连接池已关闭"""
+
+
+class PoolTimeoutError(Exception):
+    """等待空闲连接超时"""
+
+
+# 连接已断开或无法建立时驱动错误信息中的特征（pymssql/FreeTDS 错误号与文本、套接字错误）
+CONNECTION_ERROR_MARKERS = (
+    "dbprocess is dead", "not connected", "connection failed", "unable to connect",
+    "write to the server failed", "read from the server failed", "server connection timed out",
+    "connection reset", "connection refused", "broken pipe", "communication link failure",
+    "(20003", "(20004", "(20006", "(20009", "(20047",
+)
+
+
+def is_connection_error(error: Exception) -> bool:
+    """判断异常是否由连接断开/不可达引起（可以重连后重试），而不是语句本身的错误"""
+    if isinstance(error, (PoolClosedError, PoolTimeoutError)):
+        return False
+    if isinstance(error, OSError) or type(error).__name__ == "InterfaceError":
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in CONNECTION_ERROR_MARKERS)
+
+
+class ConnectionPool:
+    """
+    线程安全的数据库连接池，与具体驱动无关。
+
+    :param factory: 无参函数，返回一个 DB-API 连接（pymssql.connect / sqlite3.connect 等）
+    :param max_size: 最大连接数
+    :param min_idle: 预先建立的连接数
+    :param max_idle: 归还后最多保留的空闲连接数
+    :param health_check_after: 空闲超过该秒数的连接在借出前执行健康检查
+    :param health_check_sql: 健康检查语句
+    """
+
+    def __init__(self, factory: Callable[[], Any], max_size=4, min_idle=1, max_idle=2,
+                 health_check_after=30, health_check_sql="SELECT 1"):
+        self.factory = factory
+        self.max_size = max(1, max_size)
+        self.min_idle = min(max(0, min_idle), self.max_size)
+        self.max_idle = max(self.min_idle, max_idle)
+        self.health_check_after = health_check_after
+        self.health_check_sql = health_check_sql
+
+        self._idle = deque()  # 空闲连接，元素为 (连接, 归还时间)
+        self._size = 0  # 当前已建立（空闲 + 借出）的连接数
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def fill(self):
+        """预先建立 min_idle 个连接，连接失败时抛出驱动异常"""
+        while True:
+            with self._condition:
+                if self._closed or self._size >= self.min_idle:
+                    return
+                self._size += 1
+            try:
+                connection = self.factory()
+            except Exception:
+                self._forget()
+                raise
+            self.release(connection)
+
+    def acquire(self, timeout=None):
+        """借出一个连接，没有空闲连接且已达上限时阻塞等待"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise PoolClosedError("连接池已关闭")
+                    if self._idle:
+                        connection, idle_since = self._idle.pop()  # 后进先出，优先复用最近用过的连接
+                        break
+                    if self._size < self.max_size:
+                        connection, idle_since = None, None
+                        self._size += 1
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise PoolTimeoutError("等待数据库连接超时")
+                    self._condition.wait(remaining)
+
+            if connection is None:
+                try:
+                    return self.factory()
+                except Exception:
+                    self._forget()
+                    raise
+
+            if time.monotonic() - idle_since < self.health_check_after or self.is_healthy(connection):
+                return connection
+            self.discard(connection)  # 失效连接直接丢弃，重新借出
+
+    def release(self, connection):
+        """归还连接，空闲连接过多或连接池已关闭时直接关闭"""
+        try:
+            connection.rollback()  # 结束未提交的事务，避免把事务状态带给下一个使用者
+        except Exception:
+            self.discard(connection)
+            return
+
+        with self._condition:
+            if not self._closed and len(self._idle) < self.max_idle:
+                self._idle.append((connection, time.monotonic()))
+                self._condition.notify()
+                return
+        self.discard(connection)
+
+    def discard(self, connection):
+        """关闭并丢弃一个连接（如连接已断开）"""
+        try:
+            connection.close()
+        except Exception:
+            pass
+        self._forget()
+
+    def keepalive(self, idle_time):
+        """
+        对空闲超过 idle_time 秒的连接执行健康检查，丢弃失效连接后补足 min_idle 个连接
+
+        定期调用可防止防火墙/NAT 断开长时间空闲的连接，也能在借出前发现服务器重启。补足连接失败时抛出驱动异常。
+        """
+        now = time.monotonic()
+        with self._condition:
+            stale = [item for item in self._idle if now - item[1] >= idle_time]
+            for item in stale:
+                self._idle.remove(item)
+        for connection, _ in stale:
+            if self.is_healthy(connection):
+                self.release(connection)
+            else:
+                self.discard(connection)
+        self.fill()
+
+    def is_healthy(self, connection):
+        """执行健康检查语句判断连接是否可用"""
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(self.health_check_sql)
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """借出连接的上下文管理器，退出时自动归还"""
+        connection = self.acquire(timeout)
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close(self):
+        """关闭连接池及所有空闲连接，借出中的连接在归还时关闭"""
+        with self._condition:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._condition.notify_all()
+        for connection, _ in idle:
+            self.discard(connection)
+
+    def stats(self):
+        """连接池状态"""
+        with self._condition:
+            return {"size": self._size, "idle": len(self._idle), "max_size": self.max_size}
+
+    def _forget(self):
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
@@ -0,0 +1,133 @@
+import threading
+from typing import Dict, List
+
+PRIMARY = "primary"  # 主库，执行写操作
+REPLICA = "replica"  # 只读副本或各站点服务器，只执行查询
+SITE = "site"  # 联合搜索的其他站点数据库（数据不同），只在指定时使用，不参与查询路由
+
+
+class Endpoint:
+    """
+    一个数据库服务器
+
+    :param name: 名称，用于区分连接池与显示
+    :param params: pymssql.connect 的连接参数
+    :param role: 'primary'、'replica' 或 'site'
+    """
+
+    def __init__(self, name: str, params: Dict, role=REPLICA):
+        self.name = name
+        self.params = params
+        self.role = role
+        self.latency = None  # 探测得到的往返延迟（秒，指数平滑），未探测时为 None
+        self.healthy = True
+        self.failures = 0  # 连续失败次数
+
+    def __repr__(self):
+        return f"Endpoint({self.name!r}, {self.role!r}, latency={self.latency}, healthy={self.healthy})"
+
+
+def load_endpoints(config) -> List[Endpoint]:
+    """
+    从配置读取服务器列表
+
+    endpoints 为空时只使用 database 一项作为主库；列表中各项未填写的连接参数（如账号密码）沿用 database 中的值。
+    没有标记为 primary 的项时第一项为主库。
+    """
+    database = config["database"]
+    items = config.get("endpoints") or []
+    if not items:
+        return [Endpoint(PRIMARY, dict(database), PRIMARY)]
+
+    endpoints = []
+    for item in items:
+        params = {**database, **{key: value for key, value in item.items() if key not in ("name", "role")}}
+        name = item.get("name") or f"{params['server']}:{params.get('port', 1433)}"
+        endpoints.append(Endpoint(name, params, item.get("role", REPLICA)))
+    if not any(endpoint.role == PRIMARY for endpoint in endpoints):
+        endpoints[0].role = PRIMARY
+    return endpoints
+
+
+def load_sites(config) -> List[Endpoint]:
+    """读取联合搜索的站点列表，未填写的连接参数沿用 database"""
+    database = config["database"]
+    sites = []
+    for item in config["federation"]["sites"]:
+        params = {**database, **{key: value for key, value in item.items() if key != "name"}}
+        name = item.get("name") or f"{params['server']}/{params['database']}"
+        sites.append(Endpoint(name, params, SITE))
+    return sites
+
+
+class EndpointSelector:
+    """
+    按探测延迟选择服务器：查询使用延迟最低的可用服务器，写操作使用主库；服务器出错后标记为不可用，下次探测成功后恢复。
+
+    :param endpoints: 服务器列表
+    :param smoothing: 延迟指数平滑系数，越大越偏向最近一次探测
+    """
+
+    def __init__(self, endpoints: List[Endpoint], smoothing=0.3):
+        self.endpoints = endpoints
+        self.smoothing = smoothing
+        self.lock = threading.Lock()
+        self.primary = next(endpoint for endpoint in endpoints if endpoint.role == PRIMARY)
+
+    def get(self, name: str) -> Endpoint:
+        """按名称取得服务器（如联合搜索的站点）"""
+        return next(endpoint for endpoint in self.endpoints if endpoint.name == name)
+
+    def record_latency(self, endpoint: Endpoint, latency: float):
+        """探测或查询成功，更新延迟并标记为可用"""
+        with self.lock:
+            if endpoint.latency is None:
+                endpoint.latency = latency
+            else:
+                endpoint.latency += self.smoothing * (latency - endpoint.latency)
+            endpoint.healthy = True
+            endpoint.failures = 0
+
+    def mark_down(self, endpoint: Endpoint):
+        """连接失败，标记为不可用"""
+        with self.lock:
+            endpoint.healthy = False
+            endpoint.failures += 1
+
+    def mark_up(self, endpoint: Endpoint):
+        """执行成功，标记为可用"""
+        with self.lock:
+            endpoint.healthy = True
+            endpoint.failures = 0
+
+    def read_order(self) -> List[Endpoint]:
+        """
+        查询时依次尝试的服务器
+
+        可用的服务器按延迟从低到高（未探测过的排在已探测的之后，主库优先），不可用的服务器按连续失败次数排在最后，
+        全部不可用时仍会依次尝试。
+        """
+        with self.lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint.role != SITE]
+            healthy = [endpoint for endpoint in candidates if endpoint.healthy]
+            down = [endpoint for endpoint in candidates if not endpoint.healthy]
+            healthy.sort(key=lambda endpoint: (endpoint.latency is None, endpoint.latency or 0,
+                                               endpoint.role != PRIMARY))
+            down.sort(key=lambda endpoint: endpoint.failures)
+            return healthy + down
+
+    def read_endpoint(self) -> Endpoint:
+        """查询使用的服务器；出错的服务器被标记为不可用后排到最后，重试时自然换到下一台"""
+        return self.read_order()[0]
+
+    def any_healthy(self) -> bool:
+        """主库或只读副本中是否有可用的服务器"""
+        with self.lock:
+            return any(endpoint.healthy for endpoint in self.endpoints if endpoint.role != SITE)
+
+    def stats(self) -> List[Dict]:
+        """各服务器状态"""
+        with self.lock:
+            return [{"name": endpoint.name, "role": endpoint.role, "healthy": endpoint.healthy,
+                     "latency_ms": None if endpoint.latency is None else round(endpoint.latency * 1000, 1)}
+                    for endpoint in self.endpoints]
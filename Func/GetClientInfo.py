@@ -1,9 +1,20 @@
+import hashlib
+import json
 import socket
+import sys
+import threading
+import time
 from datetime import datetime
 import psutil
 import ctypes
 from ctypes import wintypes
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
+
+# 比较信息是否变化时忽略的字段（每次采集都不同）
+VOLATILE_FIELDS = ("StartTime",)
+
+# 身份信息：任一字段变化时需要完整写入 ComputerList
+IDENTITY_FIELDS = ("ComputerName", "Name", "LoginUserName", "ComputerMAC", "ComputerIP")
 
 
 def is_physical_interface(iface_name: str) -> bool:
@@ -43,15 +54,17 @@ def get_windows_user_full_name():
         return None  # 失败时返回空
 
 
-def get_system_info() -> Dict[str, Any]:
-    # 基础信息
-    static_info = {
+def get_static_info() -> Dict[str, Any]:
+    """基础信息：计算机名、用户全名、登录名，程序运行期间不变"""
+    return {
         "ComputerName": socket.gethostname(),
         "Name": get_windows_user_full_name(),
         "LoginUserName": psutil.users()[0].name,
     }
 
-    # 网络信息
+
+def get_network_info() -> Dict[str, Any]:
+    """网络信息：第一个已启用的物理网卡的 MAC 与 IPv4 地址"""
     net_info = {}
     try:
         # 获取活动网络接口
@@ -71,14 +84,141 @@ def get_system_info() -> Dict[str, Any]:
 
     except Exception as e:
         return {
-            **static_info,
             "ComputerIP": "169.254.169.254",
             "ComputerMAC": "00:00:00:00:00:00",
-            "StartTime": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
 
+    return net_info
+
+
+def get_system_info() -> Dict[str, Any]:
     return {
-        **static_info,
-        **net_info,
+        **get_static_info(),
+        **get_network_info(),
         "StartTime": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     }
+
+
+def same_info(new_info: Optional[Dict[str, Any]], old_info: Optional[Dict[str, Any]]) -> bool:
+    """忽略 StartTime 等每次都不同的字段，比较两次采集的信息是否相同"""
+    if not new_info or not old_info:
+        return False
+    return all(new_info.get(key) == old_info.get(key)
+               for key in new_info.keys() | old_info.keys() if key not in VOLATILE_FIELDS)
+
+
+def identity_hash(info: Dict[str, Any]) -> str:
+    """身份信息的哈希（不含 StartTime 等时间字段），用于判断是否需要完整写入"""
+    identity = [info.get(field) for field in IDENTITY_FIELDS]
+    return hashlib.sha256(json.dumps(identity, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class OVERLAPPED(ctypes.Structure):
+    _fields_ = [
+        ("Internal", ctypes.c_void_p),
+        ("InternalHigh", ctypes.c_void_p),
+        ("Offset", wintypes.DWORD),
+        ("OffsetHigh", wintypes.DWORD),
+        ("hEvent", wintypes.HANDLE),
+    ]
+
+
+class AddressChangeNotifier:
+    """
+    等待本机 IP 地址变化
+
+    Windows 下使用 NotifyAddrChange（重叠 I/O），地址变化时立即返回；其他系统或注册失败时只按超时等待，
+    由调用方定期比较网卡地址发现变化。注册在多次 wait 之间保持，分段等待不会漏掉通知。
+    """
+
+    ERROR_IO_PENDING = 997
+    WAIT_OBJECT_0 = 0
+
+    def __init__(self):
+        self.available = sys.platform == "win32"
+        self.event = None
+        self.overlapped = None
+        self.registered = False
+        if self.available:
+            try:
+                self.kernel32 = ctypes.windll.kernel32
+                self.iphlpapi = ctypes.windll.iphlpapi
+                self.kernel32.CreateEventW.restype = wintypes.HANDLE
+                self.event = self.kernel32.CreateEventW(None, True, False, None)
+                self.available = bool(self.event)
+            except (AttributeError, OSError):
+                self.available = False
+
+    def register(self):
+        """注册一次地址变化通知"""
+        self.overlapped = OVERLAPPED()
+        self.overlapped.hEvent = self.event
+        self.kernel32.ResetEvent(wintypes.HANDLE(self.event))
+        handle = wintypes.HANDLE()
+        result = self.iphlpapi.NotifyAddrChange(ctypes.byref(handle), ctypes.byref(self.overlapped))
+        if result != self.ERROR_IO_PENDING:
+            self.available = False
+            return
+        self.registered = True
+
+    def wait(self, timeout: float) -> bool:
+        """
+        等待地址变化
+
+        :param timeout: 最长等待秒数
+        :return: 期间是否收到地址变化通知
+        """
+        if self.available and not self.registered:
+            self.register()
+        if not self.available:
+            time.sleep(timeout)
+            return False
+        result = self.kernel32.WaitForSingleObject(wintypes.HANDLE(self.event), int(timeout * 1000))
+        if result == self.WAIT_OBJECT_0:
+            self.registered = False  # 通知只触发一次，下次等待时重新注册
+            return True
+        return False
+
+    def close(self):
+        if self.registered:
+            self.iphlpapi.CancelIPChangeNotify(ctypes.byref(self.overlapped))
+            self.registered = False
+        if self.event:
+            self.kernel32.CloseHandle(wintypes.HANDLE(self.event))
+            self.event = None
+
+
+class ClientInfoCollector:
+    """
+    客户端信息采集，基础信息只在首次采集时读取（GetUserNameExW、psutil.users 等调用较慢），之后每次只重新读取网络信息
+
+    sample() 返回最新信息及其与上次相比是否有变化，供后台线程定期调用、只在变化时通知界面
+    """
+
+    def __init__(self):
+        self.static_info = None
+        self.info = None  # 最近一次采集的信息
+        self.lock = threading.Lock()
+
+    def sample(self) -> Tuple[Dict[str, Any], bool]:
+        """
+        采集一次
+
+        :return: (信息, 与上次采集相比是否有变化)，首次采集视为有变化
+        """
+        with self.lock:
+            if self.static_info is None:
+                self.static_info = get_static_info()
+            info = {
+                **self.static_info,
+                **get_network_info(),
+                "StartTime": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            }
+            changed = not same_info(info, self.info)
+            self.info = info
+            return info, changed
+
+    def refresh_static(self):
+        """下次采集时重新读取基础信息（如切换了登录用户）"""
+        with self.lock:
+            self.static_info = None
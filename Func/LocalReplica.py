@@ -0,0 +1,266 @@
+import sqlite3
+import threading
+from datetime import datetime
+
+from Func.ComputerListQuery import COLUMNS, SELECT_COLUMNS, primary_key
+from Func.TrigramIndex import TrigramIndex
+
+# 从 SQL Server 拉取数据的语句：全量同步与按 StartTime 水位线的增量同步
+# 服务器有变更版本（迁移版本 9）时，增量同步改用 Statements.changed_computers / DELETED_COMPUTERS
+FULL_SYNC_SQL = SELECT_COLUMNS
+DELTA_SYNC_SQL = f"{SELECT_COLUMNS} WHERE StartTime >= %s"
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 副本表结构版本，主键改变时重建副本（由下一次全量同步重新填充）
+SCHEMA_VERSION = "2"
+
+
+def format_time(value):
+    """StartTime 统一保存为 'YYYY-MM-DD HH:MM:SS' 文本，保证可按字符串比较大小"""
+    if isinstance(value, datetime):
+        return value.strftime(TIME_FORMAT)
+    return None if value is None else str(value)
+
+
+class LocalReplica:
+    """
+    ComputerList 的本地 SQLite 副本。
+
+    由同步线程写入，搜索通过 connect() 创建的只读连接在本地执行；使用 WAL 模式，同步期间不阻塞搜索。
+    主键为 (ComputerName, Name)，与服务器上的 ComputerList 一致。
+    服务器有变更版本时按 ChangeVer 增量同步（含删除），否则按 StartTime 水位线增量同步、由全量同步清除已删除的行。
+    启用三元组索引时，七列模糊搜索在内存索引中完成，索引随同步增量维护。
+
+    :param path: 副本文件路径
+    :param trigram_index: 是否建立三元组索引
+    """
+
+    def __init__(self, path="Data/replica.db", trigram_index=True):
+        self.path = str(path)
+        self.lock = threading.Lock()  # 保护写连接
+        self.connection = self.connect()
+        self.create_schema()
+
+        self.index = TrigramIndex() if trigram_index else None
+        self.index_ready = threading.Event()  # 索引建立完成前搜索仍走 LIKE
+
+    def connect(self):
+        """创建一个到副本的连接，可作为 DatabaseWorker 的连接工厂"""
+        return sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+
+    def create_schema(self):
+        with self.lock:
+            self.connection.executescript("""
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS SyncState (
+                    Name TEXT PRIMARY KEY,
+                    Value TEXT
+                );
+            """)
+            row = self.connection.execute("SELECT Value FROM SyncState WHERE Name = 'schema'").fetchone()
+            if row is None or row[0] != SCHEMA_VERSION:  # 旧版本的副本主键不同，清空后重新全量同步
+                self.connection.execute("DROP TABLE IF EXISTS ComputerList")
+                self.connection.execute("DELETE FROM SyncState")
+                self._set_state("schema", SCHEMA_VERSION)
+            self.connection.execute(f"""
+                CREATE TABLE IF NOT EXISTS ComputerList (
+                    {", ".join(f"{column} TEXT" for column in COLUMNS)},
+                    PRIMARY KEY (ComputerName, Name)
+                )
+            """)
+            self.connection.commit()
+
+    def get_state(self, name):
+        with self.lock:
+            row = self.connection.execute("SELECT Value FROM SyncState WHERE Name = ?", [name]).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, name, value):
+        with self.lock:
+            self._set_state(name, value)
+            self.connection.commit()
+
+    def watermark(self):
+        """已同步数据中最大的 StartTime，增量同步从这里开始"""
+        return self.get_state("watermark")
+
+    def change_versions(self):
+        """已同步的 (行版本, 删除记录版本)，服务器没有变更版本时为 None"""
+        return self._parse_versions(self.get_state("change_versions"))
+
+    def reread_versions(self):
+        """
+        下一次增量同步的起始版本，即上一次同步前的版本
+
+        版本在事务提交前分配，较小的版本可能晚于较大的版本提交，因此每次都重读上一次同步以来的变更
+        """
+        return self._parse_versions(self.get_state("reread_versions")) or self.change_versions()
+
+    def build_index(self):
+        """从副本加载全部行建立三元组索引（耗时较长，在同步线程中调用）"""
+        if self.index is None:
+            return
+        with self.lock:
+            rows = self.connection.execute(FULL_SYNC_SQL).fetchall()
+        self.index.clear()
+        for row in rows:
+            self.index.add(primary_key(row), row, row)
+        self.index_ready.set()
+
+    def search(self, term, limit=None):
+        """
+        在三元组索引中搜索七列包含 term 的行，按匹配程度排序
+
+        :param limit: 最多返回的行数，None 表示不限
+        """
+        return self.index.search(term, limit)
+
+    def apply_rows(self, rows):
+        """按主键插入或更新一批行，并推进水位线，返回处理的行数"""
+        rows = self._normalize(rows)
+        if not rows:
+            return 0
+        with self.lock:
+            self._upsert(rows)
+            watermark = self._get_watermark()
+            newest = self._newest(rows)
+            if newest and (watermark is None or newest > watermark):
+                self._set_state("watermark", newest)
+            self.connection.commit()
+        if self.index is not None:
+            for row in rows:
+                self.index.add(primary_key(row), row, row)
+        return len(rows)
+
+    def apply_changes(self, rows, deleted, change_versions):
+        """
+        应用按变更版本读取的一批变更，同一主键以版本较大者为准，返回处理的行数
+
+        :param rows: changed_computers 的结果行，第一列为 ChangeVer
+        :param deleted: DELETED_COMPUTERS 的结果行 (ChangeVer, ComputerName, Name)
+        :param change_versions: 读取前服务器上的 (行版本, 删除记录版本)，与读到的最大版本一起作为新的版本
+        """
+        latest = {}
+        for row in rows:
+            key = primary_key(row[1:])
+            if key not in latest or row[0] > latest[key][0]:
+                latest[key] = (row[0], row[1:])
+        for version, computer_name, name in deleted:
+            key = (computer_name, name)
+            if key not in latest or version > latest[key][0]:
+                latest[key] = (version, None)
+        upserts = self._normalize(row for _, row in latest.values() if row is not None)
+        removed = [key for key, (_, row) in latest.items() if row is None]
+
+        with self.lock:
+            previous = self._parse_versions(self._get_state("change_versions")) or (0, 0)
+            versions = (max([previous[0], change_versions[0]] + [row[0] for row in rows]),
+                        max([previous[1], change_versions[1]] + [row[0] for row in deleted]))
+            try:
+                self._upsert(upserts)
+                self.connection.executemany("DELETE FROM ComputerList WHERE ComputerName = ? AND Name = ?", removed)
+                watermark = self._get_watermark()
+                newest = self._newest(upserts)
+                if newest and (watermark is None or newest > watermark):
+                    self._set_state("watermark", newest)
+                self._set_state("reread_versions", self._format_versions(previous))
+                self._set_state("change_versions", self._format_versions(versions))
+                self.connection.commit()
+            except Exception:
+                self.connection.rollback()
+                raise
+        if self.index is not None:
+            for key in removed:
+                self.index.remove(key)
+            for row in upserts:
+                self.index.add(primary_key(row), row, row)
+        return len(latest)
+
+    def replace_all(self, batches, change_versions=None):
+        """
+        全量替换副本内容（可清除服务器上已删除的行），在一个事务中完成
+
+        :param batches: 可迭代的行批次
+        :param change_versions: 读取前服务器上的 (行版本, 删除记录版本)，None 表示服务器没有变更版本
+        """
+        count = 0
+        newest = None
+        indexed_rows = [] if self.index is not None else None
+        with self.lock:
+            try:
+                self.connection.execute("DELETE FROM ComputerList")
+                for rows in batches:
+                    rows = self._normalize(rows)
+                    self._upsert(rows)
+                    count += len(rows)
+                    if indexed_rows is not None:
+                        indexed_rows.extend(rows)
+                    batch_newest = self._newest(rows)
+                    if batch_newest and (newest is None or batch_newest > newest):
+                        newest = batch_newest
+                self._set_state("watermark", newest)
+                versions = self._format_versions(change_versions)
+                self._set_state("change_versions", versions)
+                self._set_state("reread_versions", versions)
+                self.connection.commit()
+            except Exception:
+                self.connection.rollback()
+                raise
+        if indexed_rows is not None:
+            self._reindex(indexed_rows)
+        return count
+
+    def row_count(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM ComputerList").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    @staticmethod
+    def _normalize(rows):
+        return [tuple(format_time(value) if column == "StartTime" else value for column, value in zip(COLUMNS, row))
+                for row in rows]
+
+    @staticmethod
+    def _newest(rows):
+        return max((row[5] for row in rows if row[5]), default=None)
+
+    def _upsert(self, rows):
+        placeholders = ", ".join("?" * len(COLUMNS))
+        updates = ", ".join(f"{column} = excluded.{column}" for column in COLUMNS
+                            if column not in ("ComputerName", "Name"))
+        self.connection.executemany(
+            f"INSERT INTO ComputerList ({', '.join(COLUMNS)}) VALUES ({placeholders}) "
+            f"ON CONFLICT (ComputerName, Name) DO UPDATE SET {updates}", rows)
+
+    def _reindex(self, rows):
+        """全量同步后更新索引：删除服务器上已不存在的行，其余按内容增量更新"""
+        keys = {primary_key(row) for row in rows}
+        for key in [key for key in self.index.records if key not in keys]:
+            self.index.remove(key)
+        for row in rows:
+            self.index.add(primary_key(row), row, row)
+        self.index_ready.set()
+
+    def _get_watermark(self):
+        return self._get_state("watermark")
+
+    def _get_state(self, name):
+        row = self.connection.execute("SELECT Value FROM SyncState WHERE Name = ?", [name]).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _format_versions(versions):
+        return None if versions is None else ",".join(str(int(version or 0)) for version in versions)
+
+    @staticmethod
+    def _parse_versions(value):
+        return tuple(int(version) for version in value.split(",")) if value else None
+
+    def _set_state(self, name, value):
+        self.connection.execute(
+            "INSERT INTO SyncState (Name, Value) VALUES (?, ?) ON CONFLICT (Name) DO UPDATE SET Value = excluded.Value",
+            [name, value])
@@ -0,0 +1,477 @@
+import argparse
+import sqlite3
+import sys
+from typing import Dict, List, Optional
+
+from Func import Config
+
+# 支持的数据库
+MSSQL = "mssql"
+SQLITE = "sqlite"
+
+
+class Migration:
+    """
+    一个版本的结构变更
+
+    :param version: 版本号，按从小到大依次执行
+    :param description: 说明
+    :param statements: 数据库 -> 按顺序执行的语句列表
+    """
+
+    def __init__(self, version: int, description: str, statements: Dict[str, List[str]]):
+        self.version = version
+        self.description = description
+        self.statements = statements
+
+
+def sqlite_ip_number(column="ComputerIP"):
+    """SQLite 中把点分 IP 文本转换为整数的表达式（SQLite 没有 PARSENAME，逐段截取）"""
+    rest = f"({column} || '.')"
+    octets = []
+    for _ in range(4):
+        octets.append(f"CAST(substr({rest}, 1, instr({rest}, '.') - 1) AS INTEGER)")
+        rest = f"substr({rest}, instr({rest}, '.') + 1)"
+    return " + ".join(f"{octet} * {256 ** (3 - i)}" for i, octet in enumerate(octets))
+
+
+# SQL Server：按 IP 各段计算整数，格式不正确时为 NULL
+MSSQL_IP_NUMBER = ("TRY_CAST(PARSENAME(ComputerIP, 4) AS bigint) * 16777216 "
+                   "+ TRY_CAST(PARSENAME(ComputerIP, 3) AS bigint) * 65536 "
+                   "+ TRY_CAST(PARSENAME(ComputerIP, 2) AS bigint) * 256 "
+                   "+ TRY_CAST(PARSENAME(ComputerIP, 1) AS bigint)")
+
+# 搜索结果需要的列，作为覆盖索引的包含列
+SEARCH_COLUMNS = "Name, LoginUserName, ComputerName, ComputerIP, ComputerMAC, StartTime, Tab"
+
+# SQLite 重建为聚集表（WITHOUT ROWID）时的完整定义
+SQLITE_COMPUTER_LIST = f"""
+    CREATE TABLE ComputerList_new (
+        Name TEXT NOT NULL,
+        LoginUserName TEXT,
+        ComputerName TEXT NOT NULL,
+        ComputerIP TEXT,
+        ComputerMAC TEXT,
+        StartTime TEXT,
+        Tab TEXT,
+        ComputerIPNum INTEGER GENERATED ALWAYS AS ({sqlite_ip_number()}) STORED,
+        ComputerMACBin TEXT GENERATED ALWAYS AS (upper(replace(replace(ComputerMAC, ':', ''), '-', ''))) STORED,
+        PRIMARY KEY (ComputerName, Name)
+    ) WITHOUT ROWID
+"""
+
+MIGRATIONS = [
+    Migration(1, "创建 ComputerList（原有结构，StartTime 为文本）", {
+        MSSQL: [
+            """
+            IF OBJECT_ID(N'dbo.ComputerList', N'U') IS NULL
+            CREATE TABLE dbo.ComputerList (
+                Name nvarchar(128) NULL,
+                LoginUserName nvarchar(128) NULL,
+                ComputerName nvarchar(128) NULL,
+                ComputerIP varchar(15) NULL,
+                ComputerMAC varchar(17) NULL,
+                StartTime varchar(19) NULL,
+                Tab nvarchar(256) NULL
+            )
+            """,
+        ],
+        SQLITE: [
+            """
+            CREATE TABLE IF NOT EXISTS ComputerList (
+                Name TEXT, LoginUserName TEXT, ComputerName TEXT,
+                ComputerIP TEXT, ComputerMAC TEXT, StartTime TEXT, Tab TEXT
+            )
+            """,
+        ],
+    }),
+    Migration(2, "StartTime 改为 datetime2，主键列不允许为空", {
+        MSSQL: [
+            "UPDATE dbo.ComputerList SET Name = N'' WHERE Name IS NULL",
+            "UPDATE dbo.ComputerList SET ComputerName = N'' WHERE ComputerName IS NULL",
+            "UPDATE dbo.ComputerList SET StartTime = NULL "
+            "WHERE StartTime IS NOT NULL AND TRY_CONVERT(datetime2(0), StartTime, 120) IS NULL",
+            "ALTER TABLE dbo.ComputerList ALTER COLUMN StartTime datetime2(0) NULL",
+            "ALTER TABLE dbo.ComputerList ALTER COLUMN Name nvarchar(128) NOT NULL",
+            "ALTER TABLE dbo.ComputerList ALTER COLUMN ComputerName nvarchar(128) NOT NULL",
+        ],
+        SQLITE: [  # SQLite 没有日期类型，统一为可按字符串比较的 'YYYY-MM-DD HH:MM:SS'
+            "UPDATE ComputerList SET Name = '' WHERE Name IS NULL",
+            "UPDATE ComputerList SET ComputerName = '' WHERE ComputerName IS NULL",
+            "UPDATE ComputerList SET StartTime = datetime(StartTime) WHERE StartTime IS NOT NULL",
+        ],
+    }),
+    Migration(3, "增加整数 IP 列 ComputerIPNum 与二进制 MAC 列 ComputerMACBin（持久化计算列）", {
+        MSSQL: [
+            f"ALTER TABLE dbo.ComputerList ADD ComputerIPNum AS ({MSSQL_IP_NUMBER}) PERSISTED",
+            "ALTER TABLE dbo.ComputerList ADD ComputerMACBin AS "
+            "(TRY_CONVERT(binary(6), REPLACE(REPLACE(ComputerMAC, ':', ''), '-', ''), 2)) PERSISTED",
+        ],
+        SQLITE: [],  # 计算列在第 4 版重建表时一并创建
+    }),
+    Migration(4, "聚集主键 (ComputerName, Name)，与 MERGE 的 ON 条件一致", {
+        # 原表没有主键，同一台计算机可能有多行（第 2 版把空值改为 '' 后也可能重复），只保留 StartTime 最新的一行
+        MSSQL: [
+            """
+            WITH ranked AS (
+                SELECT ROW_NUMBER() OVER (PARTITION BY ComputerName, Name ORDER BY StartTime DESC) AS RowNumber
+                FROM dbo.ComputerList
+            )
+            DELETE FROM ranked WHERE RowNumber > 1
+            """,
+            """
+            IF NOT EXISTS (SELECT 1 FROM sys.indexes
+                           WHERE object_id = OBJECT_ID(N'dbo.ComputerList') AND is_primary_key = 1)
+            ALTER TABLE dbo.ComputerList ADD CONSTRAINT PK_ComputerList PRIMARY KEY CLUSTERED (ComputerName, Name)
+            """,
+        ],
+        SQLITE: [
+            """
+            DELETE FROM ComputerList WHERE rowid NOT IN (
+                SELECT rowid FROM (
+                    SELECT rowid, ROW_NUMBER() OVER (PARTITION BY ComputerName, Name
+                                                     ORDER BY StartTime DESC, rowid DESC) AS RowNumber
+                    FROM ComputerList
+                ) WHERE RowNumber = 1
+            )
+            """,
+            SQLITE_COMPUTER_LIST,
+            f"INSERT INTO ComputerList_new ({SEARCH_COLUMNS}) SELECT {SEARCH_COLUMNS} FROM ComputerList",
+            "DROP TABLE ComputerList",
+            "ALTER TABLE ComputerList_new RENAME TO ComputerList",
+        ],
+    }),
+    Migration(5, "搜索列的覆盖索引", {
+        MSSQL: [
+            "CREATE INDEX IX_ComputerList_LoginUserName ON dbo.ComputerList (LoginUserName, ComputerName) "
+            "INCLUDE (ComputerIP, ComputerMAC, StartTime, Tab)",
+            "CREATE INDEX IX_ComputerList_ComputerIP ON dbo.ComputerList (ComputerIP) "
+            "INCLUDE (LoginUserName, ComputerMAC, StartTime, Tab)",
+            "CREATE INDEX IX_ComputerList_ComputerIPNum ON dbo.ComputerList (ComputerIPNum) "
+            "INCLUDE (LoginUserName, ComputerIP, ComputerMAC, StartTime, Tab)",
+            "CREATE INDEX IX_ComputerList_ComputerMAC ON dbo.ComputerList (ComputerMAC) "
+            "INCLUDE (LoginUserName, ComputerIP, StartTime, Tab)",
+            "CREATE INDEX IX_ComputerList_ComputerMACBin ON dbo.ComputerList (ComputerMACBin)",
+            "CREATE INDEX IX_ComputerList_StartTime ON dbo.ComputerList (StartTime) "
+            "INCLUDE (LoginUserName, ComputerIP, ComputerMAC, Tab)",
+        ],
+        SQLITE: [
+            "CREATE INDEX IF NOT EXISTS IX_ComputerList_LoginUserName ON ComputerList (LoginUserName, ComputerName)",
+            "CREATE INDEX IF NOT EXISTS IX_ComputerList_ComputerIP ON ComputerList (ComputerIP)",
+            "CREATE INDEX IF NOT EXISTS IX_ComputerList_ComputerIPNum ON ComputerList (ComputerIPNum)",
+            "CREATE INDEX IF NOT EXISTS IX_ComputerList_ComputerMAC ON ComputerList (ComputerMAC)",
+            "CREATE INDEX IF NOT EXISTS IX_ComputerList_ComputerMACBin ON ComputerList (ComputerMACBin)",
+            "CREATE INDEX IF NOT EXISTS IX_ComputerList_StartTime ON ComputerList (StartTime)",
+        ],
+    }),
+    Migration(6, "存储过程 usp_UpsertComputer / usp_UpdateComputer / usp_SearchComputers", {
+        MSSQL: [
+            # 写操作不设置 NOCOUNT ON，调用方依据受影响的行数判断是否成功
+            """
+            CREATE OR ALTER PROCEDURE dbo.usp_UpsertComputer
+                @ComputerName nvarchar(128),
+                @Name nvarchar(128),
+                @LoginUserName nvarchar(128),
+                @ComputerMAC varchar(17),
+                @ComputerIP varchar(15),
+                @StartTime datetime2(0)
+            AS
+            BEGIN
+                MERGE INTO dbo.ComputerList WITH (HOLDLOCK) AS target
+                USING (SELECT @ComputerName AS ComputerName, @Name AS Name) AS source
+                ON target.ComputerName = source.ComputerName AND target.Name = source.Name
+                WHEN MATCHED THEN
+                    UPDATE SET LoginUserName = @LoginUserName, ComputerMAC = @ComputerMAC,
+                               ComputerIP = @ComputerIP, StartTime = @StartTime
+                WHEN NOT MATCHED THEN
+                    INSERT (ComputerName, Name, LoginUserName, ComputerMAC, ComputerIP, StartTime)
+                    VALUES (@ComputerName, @Name, @LoginUserName, @ComputerMAC, @ComputerIP, @StartTime);
+            END
+            """,
+            """
+            CREATE OR ALTER PROCEDURE dbo.usp_UpdateComputer
+                @Name nvarchar(128),
+                @ComputerName nvarchar(128),
+                @ComputerIP varchar(15),
+                @Tab nvarchar(256),
+                @KeyLoginUserName nvarchar(128),
+                @KeyComputerName nvarchar(128)
+            AS
+            BEGIN
+                UPDATE dbo.ComputerList
+                SET Name = @Name, ComputerName = @ComputerName, ComputerIP = @ComputerIP, Tab = @Tab
+                WHERE LoginUserName = @KeyLoginUserName AND ComputerName = @KeyComputerName;
+            END
+            """,
+            f"""
+            CREATE OR ALTER PROCEDURE dbo.usp_SearchComputers
+                @Term nvarchar(128)
+            AS
+            BEGIN
+                SET NOCOUNT ON;
+                DECLARE @Pattern nvarchar(130) = N'%' + @Term + N'%';
+                SELECT {SEARCH_COLUMNS} FROM dbo.ComputerList
+                WHERE Name LIKE @Pattern OR LoginUserName LIKE @Pattern OR ComputerName LIKE @Pattern
+                   OR ComputerIP LIKE @Pattern OR ComputerMAC LIKE @Pattern
+                   OR CONVERT(varchar(19), StartTime, 120) LIKE @Pattern OR Tab LIKE @Pattern;
+            END
+            """,
+        ],
+        SQLITE: [],  # SQLite 没有存储过程
+    }),
+    Migration(7, "增加 TouchCount 列，统计身份信息未变化、只更新登录时间的上报次数", {
+        MSSQL: [
+            "ALTER TABLE dbo.ComputerList ADD TouchCount int NOT NULL "
+            "CONSTRAINT DF_ComputerList_TouchCount DEFAULT 0",
+        ],
+        SQLITE: [
+            "ALTER TABLE ComputerList ADD COLUMN TouchCount INTEGER NOT NULL DEFAULT 0",
+        ],
+    }),
+    Migration(8, "增加 LastSeen 列，由采集服务按心跳批量更新，用于判断计算机是否在线", {
+        MSSQL: [
+            "ALTER TABLE dbo.ComputerList ADD LastSeen datetime2(0) NULL",
+            "CREATE INDEX IX_ComputerList_LastSeen ON dbo.ComputerList (LastSeen) INCLUDE (ComputerName, Name)",
+        ],
+        SQLITE: [
+            "ALTER TABLE ComputerList ADD COLUMN LastSeen TEXT",
+            "CREATE INDEX IF NOT EXISTS IX_ComputerList_LastSeen ON ComputerList (LastSeen)",
+        ],
+    }),
+    Migration(9, "增加变更版本 ChangeVer 与删除记录表 ComputerListDeleted，采集服务据此向界面推送变更", {
+        # 只有显示的列变化时才分配新版本，LastSeen、TouchCount 的更新不产生变更；
+        # 修改主键（编辑姓名、计算机名）时旧主键记入删除记录表
+        MSSQL: [
+            "CREATE SEQUENCE dbo.ComputerListChangeVer AS bigint START WITH 1 INCREMENT BY 1",
+            "ALTER TABLE dbo.ComputerList ADD ChangeVer bigint NOT NULL "
+            "CONSTRAINT DF_ComputerList_ChangeVer DEFAULT (NEXT VALUE FOR dbo.ComputerListChangeVer)",
+            "CREATE INDEX IX_ComputerList_ChangeVer ON dbo.ComputerList (ChangeVer)",
+            """
+            CREATE TABLE dbo.ComputerListDeleted (
+                ComputerName nvarchar(128) NOT NULL,
+                Name nvarchar(128) NOT NULL,
+                ChangeVer bigint NOT NULL,
+                DeletedAt datetime2(0) NOT NULL CONSTRAINT DF_ComputerListDeleted_DeletedAt DEFAULT (SYSDATETIME())
+            )
+            """,
+            "CREATE CLUSTERED INDEX IX_ComputerListDeleted_ChangeVer ON dbo.ComputerListDeleted (ChangeVer)",
+            """
+            CREATE OR ALTER TRIGGER dbo.TR_ComputerList_Update ON dbo.ComputerList AFTER UPDATE
+            AS
+            BEGIN
+                SET NOCOUNT ON;
+                IF NOT (UPDATE(Name) OR UPDATE(LoginUserName) OR UPDATE(ComputerName) OR UPDATE(ComputerIP)
+                        OR UPDATE(ComputerMAC) OR UPDATE(StartTime) OR UPDATE(Tab))
+                    RETURN;
+                UPDATE target SET ChangeVer = NEXT VALUE FOR dbo.ComputerListChangeVer
+                FROM dbo.ComputerList AS target
+                JOIN inserted AS i ON target.ComputerName = i.ComputerName AND target.Name = i.Name;
+                INSERT INTO dbo.ComputerListDeleted (ComputerName, Name, ChangeVer)
+                SELECT d.ComputerName, d.Name, NEXT VALUE FOR dbo.ComputerListChangeVer
+                FROM deleted AS d
+                WHERE NOT EXISTS (SELECT 1 FROM inserted AS i
+                                  WHERE i.ComputerName = d.ComputerName AND i.Name = d.Name);
+            END
+            """,
+            """
+            CREATE OR ALTER TRIGGER dbo.TR_ComputerList_Delete ON dbo.ComputerList AFTER DELETE
+            AS
+            BEGIN
+                SET NOCOUNT ON;
+                INSERT INTO dbo.ComputerListDeleted (ComputerName, Name, ChangeVer)
+                SELECT ComputerName, Name, NEXT VALUE FOR dbo.ComputerListChangeVer FROM deleted;
+            END
+            """,
+        ],
+        SQLITE: [
+            "CREATE TABLE ChangeVersion (Id INTEGER PRIMARY KEY CHECK (Id = 1), Value INTEGER NOT NULL)",
+            "INSERT INTO ChangeVersion (Id, Value) VALUES (1, 0)",
+            "ALTER TABLE ComputerList ADD COLUMN ChangeVer INTEGER NOT NULL DEFAULT 0",
+            "CREATE INDEX IF NOT EXISTS IX_ComputerList_ChangeVer ON ComputerList (ChangeVer)",
+            "CREATE TABLE ComputerListDeleted "
+            "(ComputerName TEXT NOT NULL, Name TEXT NOT NULL, ChangeVer INTEGER NOT NULL, "
+            "DeletedAt TEXT NOT NULL DEFAULT (datetime('now', 'localtime')))",
+            "CREATE INDEX IF NOT EXISTS IX_ComputerListDeleted_ChangeVer ON ComputerListDeleted (ChangeVer)",
+            """
+            CREATE TRIGGER TR_ComputerList_Insert AFTER INSERT ON ComputerList
+            BEGIN
+                UPDATE ChangeVersion SET Value = Value + 1;
+                UPDATE ComputerList SET ChangeVer = (SELECT Value FROM ChangeVersion)
+                WHERE ComputerName = NEW.ComputerName AND Name = NEW.Name;
+            END
+            """,
+            """
+            CREATE TRIGGER TR_ComputerList_Update
+            AFTER UPDATE OF Name, LoginUserName, ComputerName, ComputerIP, ComputerMAC, StartTime, Tab ON ComputerList
+            BEGIN
+                UPDATE ChangeVersion SET Value = Value + 1;
+                UPDATE ComputerList SET ChangeVer = (SELECT Value FROM ChangeVersion)
+                WHERE ComputerName = NEW.ComputerName AND Name = NEW.Name;
+                INSERT INTO ComputerListDeleted (ComputerName, Name, ChangeVer)
+                SELECT OLD.ComputerName, OLD.Name, Value FROM ChangeVersion
+                WHERE OLD.ComputerName <> NEW.ComputerName OR OLD.Name <> NEW.Name;
+            END
+            """,
+            """
+            CREATE TRIGGER TR_ComputerList_Delete AFTER DELETE ON ComputerList
+            BEGIN
+                UPDATE ChangeVersion SET Value = Value + 1;
+                INSERT INTO ComputerListDeleted (ComputerName, Name, ChangeVer)
+                SELECT OLD.ComputerName, OLD.Name, Value FROM ChangeVersion;
+            END
+            """,
+        ],
+    }),
+    Migration(10, "usp_UpdateComputer 改为按主键 (ComputerName, Name) 修改", {
+        MSSQL: [
+            """
+            CREATE OR ALTER PROCEDURE dbo.usp_UpdateComputer
+                @Name nvarchar(128),
+                @ComputerName nvarchar(128),
+                @ComputerIP varchar(15),
+                @Tab nvarchar(256),
+                @KeyComputerName nvarchar(128),
+                @KeyName nvarchar(128)
+            AS
+            BEGIN
+                UPDATE dbo.ComputerList
+                SET Name = @Name, ComputerName = @ComputerName, ComputerIP = @ComputerIP, Tab = @Tab
+                WHERE ComputerName = @KeyComputerName AND Name = @KeyName;
+            END
+            """,
+        ],
+        SQLITE: [],  # SQLite 没有存储过程
+    }),
+]
+
+SCHEMA_VERSION_TABLE = {
+    MSSQL: """
+        IF OBJECT_ID(N'dbo.SchemaVersion', N'U') IS NULL
+        CREATE TABLE dbo.SchemaVersion (
+            Version int NOT NULL PRIMARY KEY,
+            Description nvarchar(200) NOT NULL,
+            AppliedAt datetime2(0) NOT NULL DEFAULT SYSDATETIME()
+        )
+    """,
+    SQLITE: """
+        CREATE TABLE IF NOT EXISTS SchemaVersion (
+            Version INTEGER PRIMARY KEY,
+            Description TEXT NOT NULL,
+            AppliedAt TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+}
+
+
+def latest_version():
+    return MIGRATIONS[-1].version
+
+
+def current_version(connection, dialect=MSSQL):
+    """数据库当前的结构版本，没有执行过迁移时为 0"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(SCHEMA_VERSION_TABLE[dialect])
+        connection.commit()
+        cursor.execute("SELECT MAX(Version) FROM SchemaVersion")
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    return row[0] or 0
+
+
+def pending_migrations(connection, dialect=MSSQL, target: Optional[int] = None):
+    """尚未执行的迁移"""
+    version = current_version(connection, dialect)
+    target = latest_version() if target is None else target
+    return [migration for migration in MIGRATIONS if version < migration.version <= target]
+
+
+def migrate(connection, dialect=MSSQL, target: Optional[int] = None, log=print):
+    """
+    依次执行尚未执行的迁移，每个版本在一个事务中完成并记录到 SchemaVersion
+
+    :param connection: DB-API 连接（pymssql / sqlite3）
+    :param dialect: 'mssql' 或 'sqlite'
+    :param target: 目标版本，默认为最新版本
+    :return: 执行后的版本
+    """
+    placeholder = "?" if dialect == SQLITE else "%s"
+    version = current_version(connection, dialect)
+    for migration in pending_migrations(connection, dialect, target):
+        log(f"执行迁移 {migration.version}: {migration.description}")
+        cursor = connection.cursor()
+        try:
+            for statement in migration.statements[dialect]:
+                cursor.execute(statement)
+            cursor.execute(f"INSERT INTO SchemaVersion (Version, Description) VALUES ({placeholder}, {placeholder})",
+                           [migration.version, migration.description])
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+        version = migration.version
+    return version
+
+
+def connect(dialect, path=None):
+    """按配置连接 SQL Server，或打开 SQLite 替身数据库"""
+    if dialect == SQLITE:
+        connection = sqlite3.connect(path or "Data/ComputerList.db")
+        connection.isolation_level = None  # 由 migrate 显式控制事务
+        connection.execute("BEGIN")
+        return SqliteConnection(connection)
+    import pymssql
+    return pymssql.connect(**Config.load_config()["database"])
+
+
+class SqliteConnection:
+    """让 sqlite3 的 DDL 也在事务中执行（sqlite3 默认在 DDL 前隐式提交）"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def cursor(self):
+        return self.connection.cursor()
+
+    def commit(self):
+        self.connection.execute("COMMIT")
+        self.connection.execute("BEGIN")
+
+    def rollback(self):
+        self.connection.execute("ROLLBACK")
+        self.connection.execute("BEGIN")
+
+    def close(self):
+        self.connection.execute("ROLLBACK")
+        self.connection.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ComputerList 结构迁移")
+    parser.add_argument("command", choices=["status", "upgrade"], help="查看版本 / 升级到目标版本")
+    parser.add_argument("--dialect", choices=[MSSQL, SQLITE], default=MSSQL,
+                        help="mssql 连接 Data/config.json 中的数据库，sqlite 使用本地替身数据库")
+    parser.add_argument("--path", help="SQLite 替身数据库路径，默认 Data/ComputerList.db")
+    parser.add_argument("--target", type=int, help="目标版本，默认为最新版本")
+    args = parser.parse_args(argv)
+
+    connection = connect(args.dialect, args.path)
+    try:
+        if args.command == "status":
+            version = current_version(connection, args.dialect)
+            print(f"当前版本 {version}，最新版本 {latest_version()}")
+            for migration in pending_migrations(connection, args.dialect, args.target):
+                print(f"  待执行 {migration.version}: {migration.description}")
+        else:
+            version = migrate(connection, args.dialect, args.target)
+            print(f"已升级到版本 {version}")
+    finally:
+        connection.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# 匹配语句中涉及的表名：FROM/JOIN/INTO/UPDATE/MERGE [INTO] 之后的标识符
+TABLE_PATTERN = re.compile(r"\b(?:FROM|JOIN|INTO|UPDATE|MERGE(?:\s+INTO)?)\s+((?:\[?\w+]?\.)*\[?\w+]?)",
+                           re.IGNORECASE)
+
+
+def normalize_sql(sql):
+    """压缩空白字符，使排版不同的相同语句命中同一缓存项"""
+    return " ".join(sql.split())
+
+
+def extract_tables(sql):
+    """提取语句涉及的表名（小写，去掉架构名与方括号）"""
+    tables = set()
+    for name in TABLE_PATTERN.findall(sql):
+        tables.add(name.split(".")[-1].strip("[]").lower())
+    return tables
+
+
+class QueryCache:
+    """
+    查询结果的 LRU 缓存。
+
+    键为规范化后的语句与参数；按条目数与 TTL 淘汰；写语句执行成功后按表名失效。
+    过期后在 stale_ttl 秒内仍可返回旧结果，由调用方在后台重新查询（stale-while-revalidate）。
+
+    :param max_entries: 最多缓存的查询数
+    :param ttl: 结果保持新鲜的秒数
+    :param stale_ttl: 过期后仍可作为旧结果返回的秒数，0 表示不启用
+    :param max_rows: 单个结果最多缓存的行数，超过时不缓存
+    """
+
+    FRESH = "fresh"
+    STALE = "stale"
+
+    def __init__(self, max_entries=128, ttl=30, stale_ttl=0, max_rows=5000, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_rows = max_rows
+        self.clock = clock
+
+        self._entries = OrderedDict()  # 键 -> (结果, 写入时间, 涉及的表)
+        self._generation = 0  # 每次失效加一，防止失效前开始的查询把旧结果写回缓存
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(sql, params=None):
+        return normalize_sql(sql), tuple(params or [])
+
+    def get(self, sql, params=None):
+        """
+        读取缓存
+
+        :return: (结果, FRESH/STALE)，未命中时返回 None
+        """
+        key = self.make_key(sql, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            rows, stored_at, _ = entry
+            age = self.clock() - stored_at
+            if age <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return rows, self.FRESH
+            if age <= self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                return rows, self.STALE
+
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+    def generation(self):
+        """当前失效代数，查询开始前取得，写回缓存时传入"""
+        with self._lock:
+            return self._generation
+
+    def put(self, sql, params, rows, generation=None):
+        """写入缓存，查询期间发生过失效或结果过大时忽略"""
+        if len(rows) > self.max_rows:
+            return
+        key = self.make_key(sql, params)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (rows, self.clock(), extract_tables(sql))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, sql):
+        """写语句执行后，使涉及相同表的缓存失效（无法识别表名的语句与缓存项，如存储过程调用，总是失效）"""
+        tables = extract_tables(sql)
+        with self._lock:
+            self._generation += 1
+            stale_keys = [key for key, (_, _, entry_tables) in self._entries.items()
+                          if not tables or not entry_tables or entry_tables & tables]
+            for key in stale_keys:
+                del self._entries[key]
+            self.invalidations += len(stale_keys)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        """命中统计"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,212 @@
+import ipaddress
+import re
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from Func.ComputerListQuery import COLUMNS, SELECT_COLUMNS
+
+# 搜索词类型
+TEXT = "text"  # 普通文本，七列模糊搜索
+IP = "ip"  # IP 地址或前缀，如 192.168. / 192.168.2 / 192.168.2.15
+CIDR = "cidr"  # 网段，如 192.168.248.0/24
+MAC = "mac"  # MAC 地址或前缀，如 D8:80:83 / d8-80-83-1a-2b-3c
+DATE = "date"  # 日期或月份，如 2025-07-28 / 2025/7
+
+IP_PATTERN = re.compile(r"^\d{1,3}(?:\.\d{1,3}){0,3}\.?$")
+CIDR_PATTERN = re.compile(r"^\d{1,3}(?:\.\d{1,3}){3}/\d{1,2}$")
+MAC_PATTERN = re.compile(r"^[0-9A-Fa-f]{2}(?:[:-][0-9A-Fa-f]{2}){1,5}[:-]?$")
+DATE_PATTERN = re.compile(r"^(\d{4})[-/](\d{1,2})(?:[-/](\d{1,2}))?$")
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 网段展开成前缀条件时最多生成的条件数，超过时退回普通搜索
+MAX_CIDR_TERMS = 128
+
+
+class ParsedQuery:
+    """
+    解析后的搜索条件
+
+    :param kind: 搜索词类型
+    :param where: WHERE 条件，参数占位符为 %s（sqlite 由 DatabaseWorker 转换）
+    :param params: 参数
+    """
+
+    def __init__(self, kind: str, where: str, params: List):
+        self.kind = kind
+        self.where = where
+        self.params = params
+
+    def sql(self) -> Tuple[str, List]:
+        """完整的查询语句与参数"""
+        return f"{SELECT_COLUMNS} WHERE {self.where}", self.params
+
+    def __repr__(self):
+        return f"ParsedQuery({self.kind!r}, {self.where!r}, {self.params!r})"
+
+
+def search_expression(column: str, dialect="mssql") -> str:
+    """
+    模糊搜索时列的文本表达式
+
+    SQL Server 中 StartTime 为 datetime2 时直接 LIKE 会按 'Jul 28 2025 8:00AM' 格式比较，需转换为 120 格式文本
+    （对文本类型的 StartTime 也不影响结果）
+    """
+    if column == "StartTime" and dialect == "mssql":
+        return "CONVERT(varchar(19), StartTime, 120)"
+    return column
+
+
+def generic(term: str, dialect="mssql") -> ParsedQuery:
+    """七列模糊搜索（%term%），无法使用索引"""
+    where = " OR ".join(f"{search_expression(column, dialect)} LIKE %s" for column in COLUMNS)
+    return ParsedQuery(TEXT, where, [f"%{term}%"] * len(COLUMNS))  # 添加通配符 % 实现模糊查询
+
+
+def parse(term: str, ip_number_column: Optional[str] = None, dialect="mssql") -> ParsedQuery:
+    """
+    识别搜索词类型并生成只作用于对应列、可使用索引的条件，无法识别时返回七列模糊搜索
+
+    :param term: 搜索词
+    :param ip_number_column: 整数形式 IP 的计算列名（如 ComputerIPNum），提供时网段搜索使用数值范围
+    :param dialect: 'mssql' 或 'sqlite'
+    """
+    term = term.strip()
+    for parser in (parse_cidr, parse_ip, parse_mac, parse_date):
+        query = parser(term, ip_number_column)
+        if query:
+            return query
+    query = generic(term, dialect)
+    if ip_octets(term):  # 少于三段且没有结尾的点（如 10.1、2.5），可能是 IP 前缀，也可能是版本号等文本
+        return ParsedQuery(TEXT, f"ComputerIP LIKE %s OR {query.where}", [f"{term}%"] + query.params)
+    return query
+
+
+def matcher(term: str, typed=True) -> Callable[[Sequence], bool]:
+    """
+    按与 parse（typed 为 False 时与 generic）相同的规则判断一行查询结果是否符合搜索词，
+    用于把推送的新记录加入当前的搜索结果
+
+    文本比较不区分大小写，与 SQL Server 默认排序规则下的 LIKE 一致
+    """
+    term = term.strip()
+    query = parse(term) if typed else generic(term)
+    index = {column: i for i, column in enumerate(COLUMNS)}
+
+    def text(value):
+        return "" if value is None else str(value)
+
+    if query.kind == CIDR:
+        network = ipaddress.IPv4Network(term, strict=False)
+
+        def in_network(row):
+            try:
+                return ipaddress.IPv4Address(text(row[index["ComputerIP"]])) in network
+            except ValueError:
+                return False
+        return in_network
+
+    if query.kind in (IP, MAC):
+        column = index["ComputerIP" if query.kind == IP else "ComputerMAC"]
+        value = query.params[0].upper()
+        if value.endswith("%"):  # 前缀匹配
+            return lambda row: text(row[column]).upper().startswith(value[:-1])
+        return lambda row: text(row[column]).upper() == value
+
+    if query.kind == DATE:
+        start, end = query.params
+        column = index["StartTime"]
+        return lambda row: start <= text(row[column])[:19] < end
+
+    # 七列包含搜索词即符合，不确定的 IP 前缀条件（ComputerIP 以搜索词开头）已包含在内
+    lowered = term.lower()
+    return lambda row: any(lowered in text(value).lower() for value in row[:len(COLUMNS)])
+
+
+def ip_octets(term: str) -> Optional[List[str]]:
+    """形如 IP 地址或前缀（含点、每段不超过 255）时返回各段，否则返回 None"""
+    if not IP_PATTERN.match(term) or "." not in term:
+        return None
+    octets = [octet for octet in term.split(".") if octet]
+    if any(int(octet) > 255 for octet in octets):
+        return None
+    return octets
+
+
+def parse_ip(term: str, ip_number_column=None) -> Optional[ParsedQuery]:
+    """
+    完整 IP 精确匹配，不完整的 IP 按前缀匹配
+
+    只有以点结尾或至少三段时才确定是 IP，其余（如 10.1）由 parse 同时按 IP 前缀与七列模糊搜索
+    """
+    octets = ip_octets(term)
+    if not octets or (len(octets) < 3 and not term.endswith(".")):
+        return None
+    if len(octets) == 4 and not term.endswith("."):
+        return ParsedQuery(IP, "ComputerIP = %s", [term])
+    return ParsedQuery(IP, "ComputerIP LIKE %s", [f"{term}%"])
+
+
+def parse_cidr(term: str, ip_number_column=None) -> Optional[ParsedQuery]:
+    """
+    网段搜索
+
+    有整数 IP 计算列时使用 BETWEEN；否则按网段边界展开为若干 IP 前缀条件，掩码不在字节边界时最后一段逐个列出
+    """
+    if not CIDR_PATTERN.match(term):
+        return None
+    try:
+        network = ipaddress.IPv4Network(term, strict=False)
+    except ValueError:
+        return None
+
+    if ip_number_column:
+        return ParsedQuery(CIDR, f"{ip_number_column} BETWEEN %s AND %s",
+                           [int(network.network_address), int(network.broadcast_address)])
+
+    if network.prefixlen == 32:
+        return ParsedQuery(CIDR, "ComputerIP = %s", [str(network.network_address)])
+
+    if network.prefixlen > 24:  # 最后一段不完整：逐个列出网段内的地址
+        addresses = [str(address) for address in network]
+        placeholders = ", ".join(["%s"] * len(addresses))
+        return ParsedQuery(CIDR, f"ComputerIP IN ({placeholders})", addresses)
+
+    # 按覆盖网段的完整字节数展开为前缀，如 10.1.0.0/22 -> 10.1.0.% / 10.1.1.% / 10.1.2.% / 10.1.3.%
+    octet_count = -(-network.prefixlen // 8) if network.prefixlen else 1
+    subnets = list(network.subnets(new_prefix=octet_count * 8)) if octet_count * 8 > network.prefixlen else [network]
+    if len(subnets) > MAX_CIDR_TERMS:
+        return None
+    prefixes = [".".join(str(subnet.network_address).split(".")[:octet_count]) + ".%" for subnet in subnets]
+    where = " OR ".join(["ComputerIP LIKE %s"] * len(prefixes))
+    return ParsedQuery(CIDR, f"({where})" if len(prefixes) > 1 else where, prefixes)
+
+
+def parse_mac(term: str, ip_number_column=None) -> Optional[ParsedQuery]:
+    """MAC 地址统一为大写冒号分隔，完整地址精确匹配，否则按前缀匹配"""
+    if not MAC_PATTERN.match(term):
+        return None
+    pairs = re.findall(r"[0-9A-Fa-f]{2}", term)
+    mac = ":".join(pair.upper() for pair in pairs)
+    if len(pairs) == 6:
+        return ParsedQuery(MAC, "ComputerMAC = %s", [mac])
+    return ParsedQuery(MAC, "ComputerMAC LIKE %s", [f"{mac}%"])
+
+
+def parse_date(term: str, ip_number_column=None) -> Optional[ParsedQuery]:
+    """日期或月份转换为 StartTime 的时间范围 [开始, 结束)"""
+    match = DATE_PATTERN.match(term)
+    if not match:
+        return None
+    year, month, day = int(match.group(1)), int(match.group(2)), match.group(3)
+    try:
+        if day:
+            start = datetime(year, month, int(day))
+            end = datetime.fromordinal(start.toordinal() + 1)
+        else:
+            start = datetime(year, month, 1)
+            end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    except ValueError:
+        return None
+    return ParsedQuery(DATE, "StartTime >= %s AND StartTime < %s",
+                       [start.strftime(TIME_FORMAT), end.strftime(TIME_FORMAT)])
@@ -0,0 +1,195 @@
+import re
+from typing import List, Sequence, Tuple
+
+from Func.ComputerListQuery import COLUMNS
+
+# ComputerList 的写语句，参数占位符为 %s
+UPSERT_COMPUTER = """
+MERGE INTO ComputerList AS target
+USING (
+    SELECT
+        %s AS ComputerName,
+        %s AS Name,
+        %s AS LoginUserName,
+        %s AS ComputerMAC,
+        %s AS ComputerIP,
+        %s AS StartTime
+) AS source
+ON target.ComputerName = source.ComputerName AND target.Name = source.Name
+WHEN MATCHED THEN
+    UPDATE SET
+        target.LoginUserName = source.LoginUserName,
+        target.ComputerMAC = source.ComputerMAC,
+        target.ComputerIP = source.ComputerIP,
+        target.StartTime = source.StartTime
+WHEN NOT MATCHED THEN
+    INSERT (ComputerName, Name, LoginUserName, ComputerMAC, ComputerIP, StartTime)
+    VALUES (
+        source.ComputerName,
+        source.Name,
+        source.LoginUserName,
+        source.ComputerMAC,
+        source.ComputerIP,
+        source.StartTime
+    );
+"""
+
+# 按主键 (ComputerName, Name) 修改一条记录，最后两个参数为修改前的主键
+UPDATE_COMPUTER = ("UPDATE ComputerList SET Name = %s, ComputerName = %s, ComputerIP = %s, Tab = %s "
+                   "WHERE ComputerName = %s AND Name = %s")
+
+# 批量写入时每行的列，与 UPSERT_COMPUTER 的参数顺序一致
+UPSERT_COLUMNS = ("ComputerName", "Name", "LoginUserName", "ComputerMAC", "ComputerIP", "StartTime")
+
+# SQL Server 单条语句最多 2100 个参数，批量写入每批的行数上限
+MAX_BULK_ROWS = 2000 // len(UPSERT_COLUMNS)
+
+# 身份信息未变化时只更新最近登录时间，代替完整的 MERGE
+TOUCH_COMPUTER = "UPDATE ComputerList SET StartTime = %s WHERE ComputerName = %s AND Name = %s"
+
+# 同上，并累加 TouchCount（结构迁移版本 7 增加），统计全部计算机省去的完整写入次数
+TOUCH_COMPUTER_COUNTED = ("UPDATE ComputerList SET StartTime = %s, TouchCount = TouchCount + 1 "
+                          "WHERE ComputerName = %s AND Name = %s")
+
+# 删除（或修改了主键）的计算机，ChangeVer 与 ComputerList 共用同一序列（结构迁移版本 9 增加）
+DELETED_COMPUTERS = ("SELECT ChangeVer, ComputerName, Name FROM ComputerListDeleted "
+                     "WHERE ChangeVer > %s ORDER BY ChangeVer")
+
+
+# 当前最大变更版本，开始推送时从此处开始
+MAX_CHANGE_VERSIONS = ("SELECT (SELECT MAX(ChangeVer) FROM ComputerList), "
+                       "(SELECT MAX(ChangeVer) FROM ComputerListDeleted)")
+
+# 全部计算机的完整写入与省去的写入次数
+FLEET_WRITE_STATS = "SELECT COUNT(*), SUM(TouchCount) FROM ComputerList"
+
+# 语句对应的存储过程（由结构迁移安装，usp_UpdateComputer 按主键修改需要迁移版本 10），参数顺序与语句中的占位符一致
+PROCEDURES = {
+    UPSERT_COMPUTER: ("usp_UpsertComputer", 6),
+    UPDATE_COMPUTER: ("usp_UpdateComputer", 6),
+}
+
+# 七列模糊搜索的存储过程，参数为搜索词（不含通配符）
+SEARCH_PROCEDURE = "EXEC dbo.usp_SearchComputers %s"
+
+PLACEHOLDER = re.compile(r"%s")
+
+
+def resolve(sql: str, use_procedures=False) -> str:
+    """启用存储过程时把语句换成对应的存储过程调用"""
+    if use_procedures and sql in PROCEDURES:
+        name, count = PROCEDURES[sql]
+        return f"EXEC dbo.{name} " + ", ".join(["%s"] * count)
+    return sql
+
+
+def bulk_upsert_computers(count: int, dialect="mssql") -> str:
+    """
+    一次写入多台计算机的语句，参数为各行按 UPSERT_COLUMNS 顺序依次排列，占位符为 %s
+
+    SQL Server 使用多行 VALUES 作为 MERGE 的源（pymssql 不支持表值参数），SQLite 使用 INSERT ... ON CONFLICT；
+    同一批中的主键不能重复
+    """
+    row = "(" + ", ".join(["%s"] * len(UPSERT_COLUMNS)) + ")"
+    values = ", ".join([row] * count)
+    columns = ", ".join(UPSERT_COLUMNS)
+    updates = [column for column in UPSERT_COLUMNS if column not in ("ComputerName", "Name")]
+    if dialect == "sqlite":
+        assignments = ", ".join(f"{column} = excluded.{column}" for column in updates)
+        return (f"INSERT INTO ComputerList ({columns}) VALUES {values} "
+                f"ON CONFLICT (ComputerName, Name) DO UPDATE SET {assignments}")
+    assignments = ", ".join(f"target.{column} = source.{column}" for column in updates)
+    source_columns = ", ".join(f"source.{column}" for column in UPSERT_COLUMNS)
+    return (f"MERGE INTO ComputerList WITH (HOLDLOCK) AS target "
+            f"USING (VALUES {values}) AS source ({columns}) "
+            f"ON target.ComputerName = source.ComputerName AND target.Name = source.Name "
+            f"WHEN MATCHED THEN UPDATE SET {assignments} "
+            f"WHEN NOT MATCHED THEN INSERT ({columns}) VALUES ({source_columns});")
+
+
+def changed_computers(limit: int, dialect="mssql") -> str:
+    """变更版本大于 %s 的计算机，按版本排序，第一列为 ChangeVer，其余列与搜索结果相同"""
+    columns = ", ".join(["ChangeVer"] + COLUMNS)
+    if dialect == "sqlite":
+        return f"SELECT {columns} FROM ComputerList WHERE ChangeVer > %s ORDER BY ChangeVer LIMIT {int(limit)}"
+    return f"SELECT TOP ({int(limit)}) {columns} FROM ComputerList WHERE ChangeVer > %s ORDER BY ChangeVer"
+
+
+def online_computers(dialect="mssql") -> str:
+    """
+    最近 %s 秒内有心跳（LastSeen 由采集服务批量更新，结构迁移版本 8 增加）的计算机，时间以数据库服务器为准
+    """
+    if dialect == "sqlite":
+        return ("SELECT ComputerName, Name FROM ComputerList "
+                "WHERE LastSeen >= datetime('now', 'localtime', '-' || %s || ' seconds')")
+    return "SELECT ComputerName, Name FROM ComputerList WHERE LastSeen >= DATEADD(second, 0 - %s, SYSDATETIME())"
+
+
+def purge_deleted_computers(dialect="mssql") -> str:
+    """
+    清理版本不大于 %s、且已保留超过 %s 秒的删除记录
+
+    删除记录除了推送给界面，本地副本的增量同步也要读取，保留一段时间后才清理
+    """
+    if dialect == "sqlite":
+        return ("DELETE FROM ComputerListDeleted WHERE ChangeVer <= %s "
+                "AND DeletedAt < datetime('now', 'localtime', '-' || %s || ' seconds')")
+    return ("DELETE FROM ComputerListDeleted WHERE ChangeVer <= %s "
+            "AND DeletedAt < DATEADD(second, 0 - %s, SYSDATETIME())")
+
+
+def bulk_touch_last_seen(count: int, dialect="mssql") -> str:
+    """
+    把多台计算机的 LastSeen 更新为数据库当前时间，参数为各行的 ComputerName、Name 依次排列，占位符为 %s
+
+    时间取数据库服务器时间，不受各客户端时钟偏差影响
+    """
+    values = ", ".join(["(%s, %s)"] * count)
+    if dialect == "sqlite":
+        return (f"UPDATE ComputerList SET LastSeen = datetime('now', 'localtime') "
+                f"WHERE (ComputerName, Name) IN (VALUES {values})")
+    return (f"UPDATE target SET LastSeen = SYSDATETIME() FROM ComputerList AS target "
+            f"JOIN (VALUES {values}) AS source (ComputerName, Name) "
+            f"ON target.ComputerName = source.ComputerName AND target.Name = source.Name")
+
+
+# varchar 列：与 nvarchar 参数比较时列需要转换，无法直接走索引；StartTime 为 datetime2，参数按文本传入后转换
+VARCHAR_COLUMNS = ("ComputerIP", "ComputerMAC", "StartTime")
+
+# 占位符所比较的列：'列 = %s'、'列 LIKE %s'、'列 BETWEEN %s AND %s'、'列 IN (%s, %s)' 等
+COMPARED_COLUMN = re.compile(r"(\w+)\s*(?:=|<>|>=|<=|>|<|\bLIKE|\bBETWEEN(?:\s+%s\s+AND)?|\bIN\s*\((?:\s*%s\s*,)*)\s*$",
+                             re.IGNORECASE)
+# 占位符作为哪一列的值：'SELECT %s AS 列'
+ALIASED_COLUMN = re.compile(r"\s+AS\s+(\w+)", re.IGNORECASE)
+
+
+def parameter_types(sql: str) -> List[str]:
+    """
+    语句中各占位符的 T-SQL 类型，按占位符对应的列确定，与参数的值无关
+
+    同一语句的参数声明总是相同，SQL Server 只需编译一次；varchar 列用 varchar 参数，比较时仍可走索引，
+    其他列（包括无法确定列的占位符，如批量写入的 VALUES）用 nvarchar，由数据库按需转换
+    """
+    types = []
+    for match in PLACEHOLDER.finditer(sql):
+        compared = COMPARED_COLUMN.search(sql, max(match.start() - 200, 0), match.start())
+        aliased = ALIASED_COLUMN.match(sql, match.end())
+        column = compared.group(1) if compared else aliased.group(1) if aliased else None
+        types.append("varchar(8000)" if column in VARCHAR_COLUMNS else "nvarchar(4000)")
+    return types
+
+
+def prepare(sql: str, params: Sequence) -> Tuple[str, List]:
+    """
+    把使用 %s 占位符的语句包装为 sp_executesql 调用
+
+    pymssql 在客户端把参数拼接进语句文本，每组参数都是不同的即席语句，需要单独编译并占用计划缓存；
+    包装后语句文本固定，SQL Server 可复用执行计划。
+    """
+    if not params or sql.lstrip().upper().startswith("EXEC"):
+        return sql, list(params)
+    names = iter(range(len(params)))
+    inner = PLACEHOLDER.sub(lambda _: f"@p{next(names)}", sql).replace("'", "''")
+    declarations = ", ".join(f"@p{i} {parameter_type}" for i, parameter_type in enumerate(parameter_types(sql)))
+    arguments = ", ".join(["%s"] * len(params))
+    return f"EXEC sp_executesql N'{inner}', N'{declarations}', {arguments}", list(params)
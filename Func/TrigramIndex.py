@@ -0,0 +1,196 @@
+import heapq
+import threading
+from collections import defaultdict
+from typing import Dict, Hashable, List, Sequence, Set
+
+FIELD_SEPARATOR = "\x00"  # 拼接各列时使用的分隔符，保证三元组不会跨列
+
+
+def trigrams(text: str) -> Set[str]:
+    """文本的全部三元组（连续 3 个字符）"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    多列子串搜索的三元组倒排索引。
+
+    每条记录的各列转为小写后建立 三元组 -> 记录键 的倒排表。搜索时取搜索词各三元组倒排表的交集作为候选，
+    再逐条确认确实包含搜索词，结果与 LIKE '%词%' 相同。少于 3 个字符的搜索词退化为逐条扫描。
+    支持增量插入、更新、删除，线程安全。
+    """
+
+    def __init__(self):
+        self.records = {}  # 键 -> 原始行
+        self.texts = {}  # 键 -> 小写的各列文本
+        self.joined = {}  # 键 -> 以分隔符拼接的小写文本，用于快速判断是否包含
+        self.postings: Dict[str, Set[Hashable]] = defaultdict(set)  # 三元组 -> 键集合
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, key: Hashable, row: Sequence, fields: Sequence):
+        """
+        插入或更新一条记录
+
+        :param key: 记录键
+        :param row: 搜索命中时返回的原始行
+        :param fields: 参与搜索的各列值
+        """
+        texts = tuple("" if value is None else str(value).lower() for value in fields)
+        joined = FIELD_SEPARATOR.join(texts)
+        with self.lock:
+            if key in self.texts:
+                if self.texts[key] == texts:
+                    self.records[key] = row
+                    return
+                self._unindex(key)
+            self.records[key] = row
+            self.texts[key] = texts
+            self.joined[key] = joined
+            postings = self.postings
+            for gram in trigrams(joined):
+                postings[gram].add(key)
+
+    def remove(self, key: Hashable):
+        """删除一条记录"""
+        with self.lock:
+            if key in self.texts:
+                self._unindex(key)
+                del self.texts[key]
+                del self.joined[key]
+                del self.records[key]
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+            self.texts.clear()
+            self.joined.clear()
+            self.postings.clear()
+
+    def search(self, term: str, limit=None) -> List:
+        """
+        搜索包含 term 的记录，按匹配程度排序后返回原始行
+
+        排序规则：某列与搜索词完全相同 > 某列以搜索词开头 > 仅包含；同级按命中列的先后
+        """
+        term = term.lower()
+        if not term:
+            return []
+
+        with self.lock:
+            grams = trigrams(term)
+            if grams:
+                candidate_sets = []
+                for gram in grams:
+                    keys = self.postings.get(gram)
+                    if not keys:
+                        return []
+                    candidate_sets.append(keys)
+                candidate_sets.sort(key=len)  # 从最小的倒排表开始求交集
+                candidates = set(candidate_sets[0])
+                for keys in candidate_sets[1:]:
+                    candidates &= keys
+                    if not candidates:
+                        return []
+            else:
+                joined = self.joined
+                candidates = [key for key in joined if term in joined[key]]
+
+            ranked = []
+            for key in candidates:
+                rank = self._rank(self.texts[key], term)
+                if rank is not None:
+                    ranked.append((rank, key))
+
+            if limit is None:
+                ranked.sort(key=lambda item: item[0])
+            else:
+                ranked = heapq.nsmallest(limit, ranked, key=lambda item: item[0])
+            return [self.records[key] for _, key in ranked]
+
+    @staticmethod
+    def _rank(texts, term):
+        """记录与搜索词的匹配等级，不包含时返回 None"""
+        best = None
+        for column, text in enumerate(texts):
+            position = text.find(term)
+            if position < 0:
+                continue
+            if text == term:
+                rank = (0, column)
+            elif position == 0:
+                rank = (1, column)
+            else:
+                rank = (2, column)
+            if best is None or rank < best:
+                best = rank
+        return best
+
+    def _unindex(self, key):
+        for gram in trigrams(self.joined[key]):
+            keys = self.postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.postings[gram]
+
+
+def benchmark(row_count=100000, repeat=5):
+    """对比三元组索引与 SQLite LIKE 全表扫描的搜索耗时"""
+    import random
+    import sqlite3
+    import string
+    import time
+
+    from Func.ComputerListQuery import COLUMNS, row_key
+
+    random.seed(0)
+
+    def random_word(length):
+        return "".join(random.choices(string.ascii_letters, k=length))
+
+    rows = []
+    for i in range(row_count):
+        rows.append((
+            random_word(8),
+            f"user{i:06d}",
+            f"DESKTOP-{random_word(8).upper()}",
+            f"192.168.{i // 254 % 256}.{i % 254 + 1}",
+            ":".join(f"{random.randrange(256):02X}" for _ in range(6)),
+            f"2025-{random.randint(1, 12):02d}-{random.randint(1, 28):02d} 08:00:00",
+            random_word(5),
+        ))
+
+    start = time.perf_counter()
+    index = TrigramIndex()
+    for row in rows:
+        index.add(row_key(row), row, row)
+    build_time = time.perf_counter() - start
+
+    connection = sqlite3.connect(":memory:")
+    connection.execute(f"CREATE TABLE ComputerList ({', '.join(COLUMNS)})")
+    connection.executemany(f"INSERT INTO ComputerList VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+    like_sql = (f"SELECT {', '.join(COLUMNS)} FROM ComputerList WHERE "
+                + " OR ".join(f"{column} LIKE ?" for column in COLUMNS))
+
+    print(f"{row_count} 行，建立索引耗时 {build_time * 1000:.0f} ms")
+    print(f"{'搜索词':<20}{'命中行数':>10}{'索引(ms)':>12}{'LIKE(ms)':>12}")
+    for term in ("user012345", "DESKTOP-AB", "192.168.100.", "2025-07-28", rows[4321][0][:5], "zz"):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            hits = index.search(term)
+        index_time = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            like_hits = connection.execute(like_sql, [f"%{term}%"] * len(COLUMNS)).fetchall()
+        like_time = (time.perf_counter() - start) / repeat
+
+        assert len(hits) == len(like_hits)
+        print(f"{term:<20}{len(hits):>10}{index_time * 1000:>12.2f}{like_time * 1000:>12.2f}")
+
+
+if __name__ == '__main__':
+    benchmark()
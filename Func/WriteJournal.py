@@ -0,0 +1,121 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+class WriteJournal:
+    """
+    写操作的本地日志（追加写入的 JSON Lines 文件）。
+
+    写语句先写入日志再执行，执行完成后追加确认记录；程序重启或数据库恢复连接后按顺序重放未确认的语句。
+    带 key 的语句（如同一台计算机的 MERGE）只保留最新一条，较早的未执行语句直接确认作废。
+    每条记录写入后立即刷新到磁盘；全部确认后清空文件，加载时压缩为只含未确认语句。
+
+    记录格式：
+        {"id": 1, "type": "insert", "sql": "...", "params": [...], "key": [...], "time": "..."}
+        {"ack": 1}
+    """
+
+    def __init__(self, path="Data/write_journal.jsonl"):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.entries: Dict[int, dict] = OrderedDict()  # 未确认的语句，按写入顺序
+        self.next_id = 1
+        self.file = None
+        self.load()
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+    def load(self):
+        """读取日志文件，恢复未确认的语句并压缩文件"""
+        with self.lock:
+            self.entries.clear()
+            if self.path.exists():
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:  # 写入中途断电留下的不完整行
+                            continue
+                        if "ack" in record:
+                            self.entries.pop(record["ack"], None)
+                            self.next_id = max(self.next_id, record["ack"] + 1)
+                        else:
+                            self.entries[record["id"]] = record
+                            self.next_id = max(self.next_id, record["id"] + 1)
+            self._rewrite()
+
+    def append(self, task_type: str, sql: str, params: Sequence,
+               key: Optional[Sequence] = None) -> Tuple[int, List[int]]:
+        """
+        写入一条待执行语句
+
+        :param key: 合并键，未执行的语句中已有相同 key 的语句被新语句取代
+        :return: (语句 ID, 被取代的语句 ID 列表)
+        """
+        key = list(key) if key is not None else None
+        with self.lock:
+            superseded = [entry_id for entry_id, entry in self.entries.items()
+                          if key is not None and entry.get("key") == key]
+            for entry_id in superseded:
+                del self.entries[entry_id]
+                self._write({"ack": entry_id})
+
+            entry = {
+                "id": self.next_id,
+                "type": task_type,
+                "sql": sql,
+                "params": list(params or []),
+                "key": key,
+                "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            self.next_id += 1
+            self.entries[entry["id"]] = entry
+            self._write(entry)
+            return entry["id"], superseded
+
+    def pending(self) -> List[dict]:
+        """按写入顺序返回未确认的语句"""
+        with self.lock:
+            return list(self.entries.values())
+
+    def ack(self, entry_id: int):
+        """确认语句已执行（或已放弃），全部确认后清空文件"""
+        with self.lock:
+            if self.entries.pop(entry_id, None) is None:
+                return
+            if self.entries:
+                self._write({"ack": entry_id})
+            else:
+                self._rewrite()
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+    def _write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def _rewrite(self):
+        """只保留未确认的语句重写文件（先写临时文件再替换，中途断电不丢失）"""
+        if self.file:
+            self.file.close()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self.file = open(self.path, "a", encoding="utf-8")
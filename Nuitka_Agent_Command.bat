@@ -0,0 +1,19 @@
+@echo off
+cd /d "%~dp0%"
+
+E:\Miniconda3\python.exe -m nuitka ^
+  --standalone ^
+  --nofollow-import-to=PySide6,qt_material,Ui ^
+  --output-dir=build ^
+  --remove-output ^
+  --assume-yes-for-downloads ^
+  --lto=yes ^
+  --include-data-file=client_info.json=client_info.json ^
+  --include-module=uuid,logging ^
+  --nofollow-import-to=tkinter,test,unittest,distutils,email,pydoc,xmlrpc,PyQt5,matplotlib,IPython,pygments,docutils,nose,sysconfig,site,lib2to3,ensurepip,venv,tk ^
+  agent.py
+
+REM "打包完成后暂停，等待用户按任意键退出"
+echo.
+echo "打包已完成，按任意键关闭窗口..."
+pause >nul
\ No newline at end of file
@@ -13,7 +13,7 @@ E:\Miniconda3\python.exe -m nuitka ^
   --include-data-file=listStructure.json=listStructure.json ^
   --include-data-file=client_info.json=client_info.json ^
   --include-module=uuid,logging ^
-  --nofollow-import-to=tkinter,test,unittest,distutils,email,pydoc,xmlrpc,sqlite3,PyQt5,matplotlib,IPython,pygments,docutils,nose,sysconfig,site,lib2to3,ensurepip,venv,tk ^
+  --nofollow-import-to=tkinter,test,unittest,distutils,email,pydoc,xmlrpc,PyQt5,matplotlib,IPython,pygments,docutils,nose,sysconfig,site,lib2to3,ensurepip,venv,tk ^
   main.py
 
 REM "打包完成后暂停，等待用户按任意键退出"
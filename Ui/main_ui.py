@@ -20,9 +20,9 @@ from PySide6.QtWidgets import (QAbstractScrollArea, QApplication, QFrame, QGridL
     QHBoxLayout, QHeaderView, QLabel, QLayout,
     QLineEdit, QListView, QListWidget, QListWidgetItem,
     QMainWindow, QPushButton, QSizePolicy, QSplitter,
-    QStackedWidget, QStatusBar, QTabWidget, QTableWidget,
-    QTableWidgetItem, QToolBar, QTreeWidget, QTreeWidgetItem,
-    QVBoxLayout, QWidget)
+    QStackedWidget, QStatusBar, QTabWidget, QTableView,
+    QToolBar, QTreeWidget, QTreeWidgetItem, QVBoxLayout,
+    QWidget)
 
 class Ui_MainWindow(object):
     def setupUi(self, MainWindow):
@@ -438,28 +438,9 @@ class Ui_MainWindow(object):
 
         self.verticalLayout_4.addLayout(self.horizontalLayout_2)
 
-        self.ClientRecordTable = QTableWidget(self.SearchTab)
-        if (self.ClientRecordTable.columnCount() < 8):
-            self.ClientRecordTable.setColumnCount(8)
-        __qtablewidgetitem = QTableWidgetItem()
-        self.ClientRecordTable.setHorizontalHeaderItem(0, __qtablewidgetitem)
-        __qtablewidgetitem1 = QTableWidgetItem()
-        self.ClientRecordTable.setHorizontalHeaderItem(1, __qtablewidgetitem1)
-        __qtablewidgetitem2 = QTableWidgetItem()
-        self.ClientRecordTable.setHorizontalHeaderItem(2, __qtablewidgetitem2)
-        __qtablewidgetitem3 = QTableWidgetItem()
-        self.ClientRecordTable.setHorizontalHeaderItem(3, __qtablewidgetitem3)
-        __qtablewidgetitem4 = QTableWidgetItem()
-        self.ClientRecordTable.setHorizontalHeaderItem(4, __qtablewidgetitem4)
-        __qtablewidgetitem5 = QTableWidgetItem()
-        self.ClientRecordTable.setHorizontalHeaderItem(5, __qtablewidgetitem5)
-        __qtablewidgetitem6 = QTableWidgetItem()
-        self.ClientRecordTable.setHorizontalHeaderItem(6, __qtablewidgetitem6)
-        __qtablewidgetitem7 = QTableWidgetItem()
-        self.ClientRecordTable.setHorizontalHeaderItem(7, __qtablewidgetitem7)
+        self.ClientRecordTable = QTableView(self.SearchTab)
         self.ClientRecordTable.setObjectName(u"ClientRecordTable")
         self.ClientRecordTable.setAlternatingRowColors(True)
-        self.ClientRecordTable.setRowCount(0)
         self.ClientRecordTable.horizontalHeader().setStretchLastSection(False)
         self.ClientRecordTable.verticalHeader().setVisible(False)
         self.ClientRecordTable.verticalHeader().setStretchLastSection(False)
@@ -569,22 +550,6 @@ class Ui_MainWindow(object):
         self.lineEdit.setPlaceholderText(QCoreApplication.translate("MainWindow", u"\u8ba1\u7b97\u673a\u540d/IP\u5730\u5740/MAC\u5730\u5740/\u767b\u9646\u7528\u6237...", None))
         self.pushButton.setText("")
         self.label_2.setText("")
-        ___qtablewidgetitem = self.ClientRecordTable.horizontalHeaderItem(0)
-        ___qtablewidgetitem.setText(QCoreApplication.translate("MainWindow", u"\u59d3\u540d", None));
-        ___qtablewidgetitem1 = self.ClientRecordTable.horizontalHeaderItem(1)
-        ___qtablewidgetitem1.setText(QCoreApplication.translate("MainWindow", u"\u767b\u5f55\u540d", None));
-        ___qtablewidgetitem2 = self.ClientRecordTable.horizontalHeaderItem(2)
-        ___qtablewidgetitem2.setText(QCoreApplication.translate("MainWindow", u"\u8ba1\u7b97\u673a\u540d", None));
-        ___qtablewidgetitem3 = self.ClientRecordTable.horizontalHeaderItem(3)
-        ___qtablewidgetitem3.setText(QCoreApplication.translate("MainWindow", u"IP\u5730\u5740", None));
-        ___qtablewidgetitem4 = self.ClientRecordTable.horizontalHeaderItem(4)
-        ___qtablewidgetitem4.setText(QCoreApplication.translate("MainWindow", u"MAC\u5730\u5740", None));
-        ___qtablewidgetitem5 = self.ClientRecordTable.horizontalHeaderItem(5)
-        ___qtablewidgetitem5.setText(QCoreApplication.translate("MainWindow", u"\u6700\u8fd1\u767b\u9646\u65f6\u95f4", None));
-        ___qtablewidgetitem6 = self.ClientRecordTable.horizontalHeaderItem(6)
-        ___qtablewidgetitem6.setText(QCoreApplication.translate("MainWindow", u"\u5907\u6ce8", None));
-        ___qtablewidgetitem7 = self.ClientRecordTable.horizontalHeaderItem(7)
-        ___qtablewidgetitem7.setText(QCoreApplication.translate("MainWindow", u"\u529f\u80fd", None));
         self.tabWidget.setTabText(self.tabWidget.indexOf(self.SearchTab), QCoreApplication.translate("MainWindow", u"\u641c\u7d22", None))
         self.toolBar.setWindowTitle(QCoreApplication.translate("MainWindow", u"toolBar", None))
         self.toolBar_2.setWindowTitle(QCoreApplication.translate("MainWindow", u"toolBar_2", None))
@@ -0,0 +1,289 @@
+"""
+无界面上报代理：只采集本机信息并上报到 ComputerList，不加载 PySide6/qt_material/界面文件
+
+    python agent.py            按 client_info 配置定期采集，信息变化时上报
+    python agent.py --once     采集并上报一次后退出
+
+与界面程序使用同一份 Data/config.json 与 Data/client_info.json；写操作日志单独存放（agent.journal_path），
+数据库不可达时上报保留在日志中，恢复后按顺序写入。
+配置了采集服务（agent.collector）时通过 UDP 发给采集服务批量写入，不连接数据库；
+启用在线状态（presence.enabled）时还定期向采集服务发送心跳。
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from Func import Checkin, ClientReport, Config, GetClientInfo, Statements
+from Func.ConnectionPool import ConnectionPool, is_connection_error
+from Func.WriteJournal import WriteJournal
+
+logger = logging.getLogger("agent")
+
+
+class ReportAgent:
+    """
+    上报代理
+
+    采集与界面程序相同：基础信息只读取一次，网络信息定期重新采集，Windows 下地址变化时立即采集；
+    身份信息变化时完整写入（MERGE），否则只更新最近登录时间，上报间隔受 min_report_interval 限制
+    """
+
+    def __init__(self, config):
+        self.config = config
+        client_config = config["client_info"]
+        self.interval = client_config["interval"]
+        self.watch = client_config["watch"]
+        self.user_check_interval = client_config["user_check_interval"]
+        self.min_report_interval = client_config["min_report_interval"]
+        self.report_interval = client_config["report_interval"]
+        self.touch_counter = client_config["touch_counter"]
+        self.use_procedures = config["statements"]["use_procedures"]
+        self.prepare_statements = config["statements"]["prepare"]
+
+        self.collector = GetClientInfo.ClientInfoCollector()
+        agent_config = config["agent"]
+        self.collector_address = None
+        if agent_config["collector"]:
+            host, _, port = agent_config["collector"].rpartition(":")
+            self.collector_address = (host, int(port))
+        self.collector_timeout = agent_config["collector_timeout"]
+        self.collector_retries = agent_config["collector_retries"]
+        self.collector_token = config["collector"]["token"]
+        self.report_id = 0
+        self.heartbeat_interval = config["presence"]["heartbeat_interval"] if config["presence"]["enabled"] else 0
+        self.last_heartbeat = None
+
+        self.journal = WriteJournal(agent_config["journal_path"])
+        database = config["database"]
+        # 只需一个连接，空闲时不保持连接，上报时再建立
+        self.pool = ConnectionPool(lambda: self.connect_database(database), max_size=1, min_idle=0, max_idle=1,
+                                   health_check_after=config["pool"]["health_check_after"])
+        self.stop_event = threading.Event()
+        self.last_report_time = None
+        self.report_pending = False  # 信息已变化但受限速推迟的上报
+
+    def run(self, once=False):
+        """主循环，stop() 后退出"""
+        notifier = GetClientInfo.AddressChangeNotifier() if self.watch and not once else None
+        last_user_check = time.monotonic()
+        try:
+            while not self.stop_event.is_set():
+                if self.user_check_interval and time.monotonic() - last_user_check >= self.user_check_interval:
+                    self.collector.refresh_static()
+                    last_user_check = time.monotonic()
+                try:
+                    info, changed = self.collector.sample()
+                except Exception as e:  # 采集失败时等待下次
+                    logger.warning("采集本机信息失败: %s", e)
+                    info, changed = None, False
+
+                if info is not None:
+                    if changed or self.report_due():
+                        self.report_pending = True
+                    if self.report_pending and (once or self.report_allowed()):
+                        self.report(info)
+                    if self.heartbeat_due():
+                        self.send_heartbeat(info)
+                if once:
+                    break
+                self.wait_for_change(notifier)
+        finally:
+            if notifier:
+                notifier.close()
+            self.pool.close()
+            self.journal.close()
+
+    def stop(self):
+        self.stop_event.set()
+
+    @staticmethod
+    def connect_database(database):
+        import pymssql  # 通过采集服务上报时不需要加载数据库驱动
+        return pymssql.connect(**database)
+
+    def report_due(self):
+        """信息未变化时是否到了定期上报的时间"""
+        return self.last_report_time is None or time.monotonic() - self.last_report_time >= self.report_interval
+
+    def report_allowed(self):
+        """距上次上报是否已超过最小间隔"""
+        return (self.last_report_time is None
+                or time.monotonic() - self.last_report_time >= self.min_report_interval)
+
+    def heartbeat_due(self):
+        """通过采集服务上报且启用了在线状态时，是否到了发送心跳的时间"""
+        if not self.collector_address or not self.heartbeat_interval:
+            return False
+        return self.last_heartbeat is None or time.monotonic() - self.last_heartbeat >= self.heartbeat_interval
+
+    def send_heartbeat(self, info):
+        """发送心跳，不等待确认；丢失的心跳由下一次补上"""
+        self.last_heartbeat = time.monotonic()
+        message = Checkin.heartbeat_message((info["ComputerName"], info["Name"]), self.collector_token)
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.sendto(Checkin.encode(message), self.collector_address)
+        except OSError as e:
+            logger.warning("发送心跳失败: %s", e)
+
+    def wait_for_change(self, notifier):
+        """等待到下一次采集：采集间隔已到、推迟的上报可以发出、该发送心跳、收到地址变化通知或停止"""
+        timeout = self.interval
+        if self.report_pending and self.last_report_time is not None:
+            timeout = min(timeout, max(self.min_report_interval - (time.monotonic() - self.last_report_time), 0))
+        if self.heartbeat_interval and self.last_heartbeat is not None:
+            timeout = min(timeout, max(self.heartbeat_interval - (time.monotonic() - self.last_heartbeat), 0))
+        if notifier is None or not notifier.available:
+            self.stop_event.wait(timeout)
+            return
+        deadline = time.monotonic() + timeout
+        while not self.stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or notifier.wait(min(remaining, 0.5)):  # 分段等待，停止时及时退出
+                return
+
+    def report(self, info):
+        """上报本机信息：身份信息与上次写入的不同时完整写入，否则只更新最近登录时间"""
+        self.report_pending = False
+        self.last_report_time = time.monotonic()
+        path = ClientReport.CLIENT_INFO_PATH
+        new_data = {**info, "StartTime": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        old_data = ClientReport.load_client_info(path)
+        counters = ClientReport.load_counters(old_data)
+
+        if self.collector_address:
+            if self.send_to_collector(new_data):
+                self.last_heartbeat = time.monotonic()  # 上报同时也是一次心跳
+                ClientReport.save_client_info(path, new_data, {**counters, "upserts": counters["upserts"] + 1})
+                logger.info("采集服务已确认上报: %s %s", new_data["ComputerName"], new_data["ComputerIP"])
+            else:
+                self.report_pending = True  # 下一次允许上报时重发
+            return
+
+        self.replay_journal()  # 先写入之前未送达的上报，保持顺序
+        if not ClientReport.needs_upsert(new_data, old_data):
+            sql, params = ClientReport.touch_statement(new_data, self.touch_counter)
+            try:
+                if self.execute_write(sql, params):
+                    ClientReport.save_client_info(path, new_data, {**counters, "touches": counters["touches"] + 1})
+                    logger.info("身份信息未变化，已更新登录时间")
+                    return
+            except Exception as e:  # 未执行结构迁移、连接断开等，改为完整写入
+                logger.warning("更新登录时间失败: %s", e)
+
+        sql, params, key = ClientReport.upsert_statement(new_data, self.use_procedures)
+        entry_id, _ = self.journal.append("insert", sql, params, key)
+        if entry_id in self.replay_journal():
+            ClientReport.save_client_info(path, new_data, {**counters, "upserts": counters["upserts"] + 1})
+            logger.info("已写入本机信息: %s %s", new_data["ComputerName"], new_data["ComputerIP"])
+        else:
+            self.report_pending = True  # 下一次允许上报时重试，不必等到信息变化或定期上报
+            logger.info("数据库不可达，上报已保存到日志，恢复连接后写入")
+
+    def send_to_collector(self, new_data):
+        """
+        发给采集服务并等待写入确认，未收到确认时重发
+
+        :return: 采集服务是否已写入
+        """
+        self.report_id += 1
+        message = Checkin.encode(Checkin.report_message(self.report_id, new_data, self.collector_token))
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            for _ in range(self.collector_retries):
+                sock.sendto(message, self.collector_address)
+                deadline = time.monotonic() + self.collector_timeout
+                while not self.stop_event.is_set():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    sock.settimeout(remaining)
+                    try:
+                        data, _ = sock.recvfrom(Checkin.MAX_DATAGRAM)
+                    except socket.timeout:
+                        break
+                    except OSError as e:  # 采集服务未运行时 Windows 会报告连接被重置
+                        logger.warning("采集服务不可达: %s", e)
+                        return False
+                    reply = Checkin.decode(data)
+                    if not reply or reply.get("id") != self.report_id:  # 之前重发的上报的确认
+                        continue
+                    if reply["type"] == Checkin.ACK:
+                        return True
+                    logger.warning("采集服务写入失败: %s", reply.get("error"))
+                    return False
+        logger.warning("采集服务未确认上报")
+        return False
+
+    def replay_journal(self):
+        """
+        按顺序写入日志中的语句；连接断开时停止，剩余语句留待下次
+
+        :return: 本次成功写入的语句 ID
+        """
+        written = set()
+        for entry in self.journal.pending():
+            try:
+                rows_affected = self.execute_write(entry["sql"], entry["params"])
+            except Exception as e:
+                if is_connection_error(e):
+                    break
+                logger.error("写入失败，已放弃: %s", e)
+                self.journal.ack(entry["id"])
+                continue
+            self.journal.ack(entry["id"])
+            if rows_affected:
+                written.add(entry["id"])
+        return written
+
+    def execute_write(self, sql, params):
+        """执行并提交一条写语句，返回受影响的行数"""
+        params = [f"{param}" for param in params or []]
+        if self.prepare_statements:
+            sql, params = Statements.prepare(sql, params)
+        connection = self.pool.acquire()
+        reusable = True
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(sql, params)
+                connection.commit()
+                return cursor.rowcount
+            finally:
+                cursor.close()
+        except Exception as e:
+            reusable = not is_connection_error(e)
+            raise
+        finally:
+            if reusable:
+                self.pool.release(connection)
+            else:
+                self.pool.discard(connection)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LanRemoteManager 无界面上报代理")
+    parser.add_argument("--once", action="store_true", help="采集并上报一次后退出")
+    args = parser.parse_args()
+
+    # 作为服务运行时工作目录通常不是程序目录，Data/ 下的文件按程序目录定位
+    os.chdir(Path(sys.argv[0]).resolve().parent)
+    config = Config.load_config()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s",
+                        filename=config["agent"]["log_path"] or None)
+
+    agent = ReportAgent(config)
+    for name in ("SIGINT", "SIGTERM", "SIGBREAK"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), lambda signum, frame: agent.stop())
+    agent.run(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,471 @@
+"""
+上报采集服务：客户端（agent.py）通过 UDP 发送本机信息，服务合并同一台计算机的上报后批量写入 ComputerList
+
+    python collector.py                         写入 Data/config.json 中的 SQL Server
+    python collector.py --sqlite Data/ComputerList.db   写入本地 SQLite 替身数据库（测试用，启动时执行结构迁移）
+
+客户端不再各自连接数据库，登录高峰时数据库只承受少量连接上的批量写入。
+启用在线状态（presence.enabled）时客户端定期发送心跳，服务在内存中记录，每隔 presence.flush_interval 秒
+批量更新一次 LastSeen，心跳本身不写数据库。
+启用变更推送（live.enabled）时服务每隔 live.poll_interval 秒按 ChangeVer 读取一次 ComputerList 的变更，
+推送给订阅的界面；无论打开多少个界面，数据库上只有这一个轮询。
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import sqlite3
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from Func import Checkin, Config, Migrations, Statements
+from Func.ConnectionPool import ConnectionPool, is_connection_error
+
+logger = logging.getLogger("collector")
+
+RECEIVE_BUFFER = 4 * 1024 * 1024  # UDP 接收缓冲区字节数
+PURGE_INTERVAL = 300  # 清理删除记录的间隔（秒）
+
+
+class PendingReport:
+    """等待写入的一台计算机的上报，同一台计算机的新上报取代旧上报，等待确认的客户端一并保留"""
+
+    def __init__(self, row, sent, received):
+        self.row = row
+        self.sent = sent
+        self.received = received
+        self.waiters = []  # (客户端地址, 上报 ID)
+
+
+class CollectorProtocol(asyncio.DatagramProtocol):
+    def __init__(self, service):
+        self.service = service
+
+    def connection_made(self, transport):
+        self.service.transport = transport
+        sock = transport.get_extra_info("socket")
+        try:  # 登录高峰时大量数据报同时到达，加大接收缓冲区减少丢包（丢失的上报由客户端重发）
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+        except OSError:
+            pass
+
+    def datagram_received(self, data, addr):
+        self.service.receive(data, addr)
+
+
+class CollectorService:
+    """
+    采集服务
+
+    收到的上报按主键 (ComputerName, Name) 合并，每隔 flush_interval 秒或积累到 max_batch 台时
+    在连接池上批量写入，写入完成后向客户端确认；写入在线程池中执行，不阻塞接收。
+
+    :param config: 配置字典
+    :param connect: 创建数据库连接的无参函数
+    :param dialect: 'mssql' 或 'sqlite'
+    """
+
+    def __init__(self, config, connect, dialect="mssql"):
+        collector_config = config["collector"]
+        self.host = collector_config["host"]
+        self.port = collector_config["port"]
+        self.token = collector_config["token"]
+        self.flush_interval = collector_config["flush_interval"]
+        self.max_batch = min(collector_config["max_batch"], Statements.MAX_BULK_ROWS)
+        self.metrics_interval = collector_config["metrics_interval"]
+        self.dialect = dialect
+        self.prepare_statements = dialect == "mssql" and config["statements"]["prepare"]
+
+        pool_size = collector_config["pool_size"]
+        self.pool = ConnectionPool(connect, max_size=pool_size, min_idle=1, max_idle=pool_size,
+                                   health_check_after=config["pool"]["health_check_after"])
+        self.executor = ThreadPoolExecutor(pool_size, thread_name_prefix="collector-writer")
+        self.writers = None  # 同时进行的批量写入数上限，与连接数相同
+        self.pool_size = pool_size
+        self.metrics = Checkin.Metrics()
+        presence_config = config["presence"]
+        self.presence_enabled = presence_config["enabled"]
+        self.presence_flush_interval = presence_config["flush_interval"]
+        self.presence = Checkin.PresenceMap(presence_config["ttl"])
+        live_config = config["live"]
+        self.live_enabled = live_config["enabled"]
+        self.live_poll_interval = live_config["poll_interval"]
+        self.live_batch_rows = live_config["batch_rows"]
+        self.subscription_ttl = live_config["subscription_ttl"]
+        self.subscribers = {}  # 界面地址 -> 订阅到期时间（time.monotonic）
+        self.delta_seq = 0  # 最近一次推送的序号
+        self.reread_window = live_config["reread_window"]
+        self.row_version = 0  # 已推送的最大 ComputerList.ChangeVer
+        self.deleted_version = 0  # 已推送的最大 ComputerListDeleted.ChangeVer
+        self.version_history = deque()  # 每次轮询后的 (时间, row_version, deleted_version)，用于确定重新读取的起点
+        self.sent_rows = set()  # 重新读取窗口内已推送的 ComputerList.ChangeVer
+        self.sent_deleted = set()  # 重新读取窗口内已推送的 ComputerListDeleted.ChangeVer
+        self.tombstone_retention = live_config["tombstone_retention"]
+        self.last_purge = time.monotonic()  # 上次清理删除记录的时间
+        self.pending = OrderedDict()  # 主键 -> PendingReport，按首次收到的顺序
+        self.transport = None
+        self.flush_event = None
+        self.stop_event = None
+
+    async def serve(self):
+        """运行服务直到 stop()"""
+        loop = asyncio.get_running_loop()
+        self.flush_event = asyncio.Event()
+        self.stop_event = asyncio.Event()
+        self.writers = asyncio.Semaphore(self.pool_size)
+        await loop.run_in_executor(self.executor, self.pool.fill)
+        transport, _ = await loop.create_datagram_endpoint(lambda: CollectorProtocol(self),
+                                                           local_addr=(self.host, self.port))
+        logger.info("采集服务已启动: %s:%s (%s)", self.host, self.port, self.dialect)
+        tasks = [asyncio.create_task(self.flush_loop()), asyncio.create_task(self.metrics_loop()),
+                 asyncio.create_task(self.presence_loop()), asyncio.create_task(self.live_loop())]
+        try:
+            await self.stop_event.wait()
+        finally:
+            transport.close()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.flush()  # 写入剩余的上报
+            await self.flush_presence()
+            self.executor.shutdown(wait=True)
+            self.pool.close()
+            logger.info("采集服务已停止: %s", self.metrics.snapshot())
+
+    def stop(self):
+        if self.stop_event:
+            self.stop_event.set()
+
+    def receive(self, data, addr):
+        """处理一个数据报（事件循环线程）"""
+        message = Checkin.decode(data)
+        if message is None or (self.token and message.get("token") != self.token):
+            self.metrics.record_rejected()
+            return
+        if message["type"] == Checkin.STATS:
+            self.send({"type": Checkin.STATS, "metrics": {**self.metrics.snapshot(), "online": len(self.presence)}},
+                      addr)
+            return
+        if message["type"] == Checkin.HEARTBEAT:
+            key = message.get("key")
+            if not isinstance(key, list) or len(key) != 2 or not all(isinstance(item, str) for item in key):
+                self.metrics.record_rejected()
+                return
+            self.presence.seen(tuple(key))
+            self.metrics.record_heartbeat()
+            return
+        if message["type"] == Checkin.SUBSCRIBE:
+            if not self.live_enabled:
+                self.send({"type": Checkin.ERROR, "error": "采集服务未启用变更推送"}, addr)
+                return
+            self.subscribers[addr] = time.monotonic() + self.subscription_ttl
+            self.send({"type": Checkin.SUBSCRIBED, "seq": self.delta_seq}, addr)
+            return
+        if message["type"] != Checkin.REPORT:
+            self.metrics.record_rejected()
+            return
+        try:
+            info = message["info"]
+            row = [info[column] for column in Statements.UPSERT_COLUMNS]
+        except (KeyError, TypeError):
+            self.metrics.record_rejected()
+            return
+
+        key = (info["ComputerName"], info["Name"])
+        self.presence.seen(key)  # 上报同时也是一次心跳
+        now = time.monotonic()
+        sent = message.get("sent") or time.time()
+        report = self.pending.get(key)
+        if report is None:
+            report = self.pending[key] = PendingReport(row, sent, now)
+        else:  # 尚未写入时又收到同一台计算机的上报，只写入最新的
+            report.row, report.sent = row, sent
+        report.waiters.append((addr, message.get("id")))
+        self.metrics.record_received(coalesced=len(report.waiters) > 1)
+        if len(self.pending) >= self.max_batch:
+            self.flush_event.set()
+
+    def send(self, message, addr):
+        if self.transport:
+            self.transport.sendto(Checkin.encode(message), addr)
+
+    async def flush_loop(self):
+        """定时或积累到一批时写入"""
+        while True:
+            try:
+                await asyncio.wait_for(self.flush_event.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.flush_event.clear()
+            await self.flush()
+
+    async def flush(self):
+        """把等待中的上报分批写入，各批在不同连接上并行"""
+        batches = []
+        while self.pending:
+            count = min(len(self.pending), self.max_batch)
+            batches.append([self.pending.popitem(last=False)[1] for _ in range(count)])
+        if batches:
+            await asyncio.gather(*(self.write_batch(batch) for batch in batches))
+
+    async def write_batch(self, batch):
+        """写入一批上报并向等待的客户端确认，失败时通知客户端稍后重发"""
+        loop = asyncio.get_running_loop()
+        async with self.writers:
+            try:
+                await loop.run_in_executor(self.executor, self.write_rows, [report.row for report in batch])
+            except Exception as e:
+                self.metrics.record_failure()
+                logger.error("批量写入 %s 行失败: %s", len(batch), e)
+                for report in batch:
+                    for addr, report_id in report.waiters:
+                        self.send({"type": Checkin.ERROR, "id": report_id, "error": str(e)}, addr)
+                return
+
+        now_wall, now = time.time(), time.monotonic()
+        self.metrics.record_batch(len(batch), [max(now_wall - report.sent, 0) for report in batch],
+                                  [now - report.received for report in batch])
+        for report in batch:
+            for addr, report_id in report.waiters:
+                self.send({"type": Checkin.ACK, "id": report_id}, addr)
+
+    def write_rows(self, rows):
+        """在一个事务中写入一批行（执行线程）"""
+        sql = Statements.bulk_upsert_computers(len(rows), self.dialect)
+        self.execute_write(sql, [value for row in rows for value in row])
+
+    def statement(self, sql, params):
+        """按数据库类型转换占位符，SQL Server 上按配置包装为 sp_executesql"""
+        if self.dialect == "sqlite":
+            return sql.replace("%s", "?"), params
+        if self.prepare_statements:
+            return Statements.prepare(sql, params)
+        return sql, params
+
+    def execute_write(self, sql, params):
+        """在一个事务中执行一条写语句"""
+        self.execute(sql, [f"{value}" for value in params])
+
+    def execute(self, sql, params, fetch=False):
+        """在一个事务中执行一条语句，fetch 为 True 时返回结果行"""
+        sql, params = self.statement(sql, params)
+        connection = self.pool.acquire()
+        reusable = True
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall() if fetch else None
+                connection.commit()
+                return rows
+            finally:
+                cursor.close()
+        except Exception as e:
+            reusable = not is_connection_error(e)
+            try:
+                connection.rollback()
+            except Exception:
+                reusable = False
+            raise
+        finally:
+            if reusable:
+                self.pool.release(connection)
+            else:
+                self.pool.discard(connection)
+
+    async def presence_loop(self):
+        """定期移除超时的计算机，并批量写入有心跳的计算机的 LastSeen"""
+        if not self.presence_enabled:
+            return
+        while True:
+            await asyncio.sleep(self.presence_flush_interval)
+            self.presence.expire()
+            await self.flush()  # 先写入等待中的上报，新计算机的行存在后才能更新 LastSeen
+            await self.flush_presence()
+
+    async def flush_presence(self):
+        """批量写入 LastSeen，失败的留待下次"""
+        if not self.presence_enabled:
+            return
+        keys = self.presence.take_dirty()
+        batch_size = Statements.MAX_BULK_ROWS * len(Statements.UPSERT_COLUMNS) // 2  # 每行两个参数
+        loop = asyncio.get_running_loop()
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start:start + batch_size]
+            async with self.writers:
+                try:
+                    await loop.run_in_executor(self.executor, self.write_presence, batch)
+                except Exception as e:
+                    logger.error("写入 LastSeen 失败: %s", e)
+                    self.presence.restore_dirty(keys[start:])
+                    return
+            self.metrics.record_presence(len(batch))
+
+    def write_presence(self, keys):
+        """更新一批计算机的 LastSeen（执行线程）"""
+        sql = Statements.bulk_touch_last_seen(len(keys), self.dialect)
+        self.execute_write(sql, [value for key in keys for value in key])
+
+    async def live_loop(self):
+        """
+        定期读取 ComputerList 的变更并推送给订阅的界面
+
+        ChangeVer 在语句执行时分配、在事务提交后才可见，并行的事务可能晚于更大的版本提交；
+        因此每次都从 reread_window 秒前的版本开始重新读取，跳过已推送的版本，窗口内晚提交的变更仍能推送。
+        推送之后才推进版本，读取失败时下次从原处重新读取
+        """
+        if not self.live_enabled:
+            return
+        loop = asyncio.get_running_loop()
+        while True:  # 从当前版本开始推送，之前的变更由界面自己查询得到
+            try:
+                row_version, deleted_version = (await loop.run_in_executor(
+                    self.executor, self.execute, Statements.MAX_CHANGE_VERSIONS, [], True))[0]
+                break
+            except Exception as e:  # 未执行结构迁移或数据库不可达，稍后重试
+                logger.error("读取变更版本失败: %s", e)
+                await asyncio.sleep(self.live_poll_interval * 5)
+        self.row_version, self.deleted_version = row_version or 0, deleted_version or 0
+        self.version_history.append((time.monotonic(), self.row_version, self.deleted_version))
+
+        while True:
+            await asyncio.sleep(self.live_poll_interval)
+            now = time.monotonic()
+            for addr in [addr for addr, expiry in self.subscribers.items() if expiry < now]:
+                del self.subscribers[addr]
+            row_floor, deleted_floor = self.reread_floor(now)
+            try:
+                rows, deleted = await loop.run_in_executor(self.executor, self.read_changes, row_floor, deleted_floor)
+            except Exception as e:
+                logger.error("读取变更失败: %s", e)
+                continue
+            self.broadcast(*self.resolve_changes(rows, deleted))
+            self.version_history.append((now, self.row_version, self.deleted_version))
+            self.sent_rows = {version for version in self.sent_rows if version > row_floor}
+            self.sent_deleted = {version for version in self.sent_deleted if version > deleted_floor}
+            if now - self.last_purge >= PURGE_INTERVAL:  # 窗口之前且超过保留时间的删除记录不会再被读取
+                self.last_purge = now
+                try:
+                    await loop.run_in_executor(self.executor, self.execute_write,
+                                               Statements.purge_deleted_computers(self.dialect),
+                                               [deleted_floor, self.tombstone_retention])
+                except Exception as e:
+                    logger.error("清理删除记录失败: %s", e)
+
+    def reread_floor(self, now):
+        """重新读取的起点：reread_window 秒前（没有那么早的记录时为最早一次）轮询后的版本"""
+        deadline = now - self.reread_window
+        while len(self.version_history) > 1 and self.version_history[1][0] <= deadline:
+            self.version_history.popleft()
+        _, row_floor, deleted_floor = self.version_history[0]
+        return row_floor, deleted_floor
+
+    def read_changes(self, row_version, deleted_version):
+        """
+        读取版本大于给定版本的行与删除记录（执行线程），只读，不修改推送状态
+
+        :return: (变更的行, 删除记录)，行的第一列与删除记录的第一列为 ChangeVer
+        """
+        rows = []
+        while True:
+            batch = self.execute(Statements.changed_computers(self.live_batch_rows, self.dialect),
+                                 [row_version], fetch=True)
+            rows.extend(batch)
+            if len(batch) < self.live_batch_rows:
+                break
+            row_version = batch[-1][0]
+        deleted = self.execute(Statements.DELETED_COMPUTERS, [deleted_version], fetch=True)
+        return rows, deleted
+
+    def resolve_changes(self, rows, deleted):
+        """
+        去掉已推送的版本并记录新推送的版本，推进已推送的最大版本
+
+        :return: (变更的行, 删除的主键)；同一主键既有变更又有删除时只保留版本较新的一项
+        """
+        changed = {}  # 主键 -> (版本, 行)
+        for row in rows:
+            if row[0] not in self.sent_rows:
+                self.sent_rows.add(row[0])
+                self.row_version = max(self.row_version, row[0])
+                changed[(row[3], row[1])] = (row[0], list(row[1:]))
+        deleted_keys = {}
+        for version, computer_name, name in deleted:
+            if version not in self.sent_deleted:
+                self.sent_deleted.add(version)
+                self.deleted_version = max(self.deleted_version, version)
+                deleted_keys[(computer_name, name)] = version
+
+        for key in set(changed) & set(deleted_keys):
+            if deleted_keys[key] > changed[key][0]:
+                del changed[key]
+            else:
+                del deleted_keys[key]
+        return [row for _, row in changed.values()], [list(key) for key in deleted_keys]
+
+    def broadcast(self, rows, deleted):
+        """把变更分为若干数据报推送给未过期的订阅方，序号逐条加一"""
+        if not (rows or deleted):
+            return
+        messages = 0
+        for chunk_rows, chunk_deleted in Checkin.delta_chunks(rows, deleted):
+            self.delta_seq += 1
+            message = {"type": Checkin.DELTA, "seq": self.delta_seq, "rows": chunk_rows, "deleted": chunk_deleted}
+            for addr in self.subscribers:
+                self.send(message, addr)
+                messages += 1
+        self.metrics.record_delta(messages, len(rows) + len(deleted))
+
+    async def metrics_loop(self):
+        """定期输出运行指标"""
+        if not self.metrics_interval:
+            return
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            logger.info("运行指标: %s", self.metrics.snapshot())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LanRemoteManager 上报采集服务")
+    parser.add_argument("--sqlite", metavar="PATH", help="写入 SQLite 替身数据库而不是 SQL Server")
+    args = parser.parse_args()
+
+    os.chdir(Path(sys.argv[0]).resolve().parent)
+    config = Config.load_config()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s",
+                        filename=config["collector"]["log_path"] or None)
+
+    if args.sqlite:
+        connection = Migrations.connect(Migrations.SQLITE, args.sqlite)
+        try:
+            Migrations.migrate(connection, Migrations.SQLITE, log=logger.info)
+        finally:
+            connection.close()
+        service = CollectorService(config, lambda: sqlite3.connect(args.sqlite, check_same_thread=False), "sqlite")
+    else:
+        import pymssql
+        database = config["database"]
+        service = CollectorService(config, lambda: pymssql.connect(**database))
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        for name in ("SIGINT", "SIGTERM"):
+            try:
+                loop.add_signal_handler(getattr(signal, name), service.stop)
+            except (NotImplementedError, AttributeError):  # Windows 的事件循环不支持，由 KeyboardInterrupt 结束
+                pass
+        await service.serve()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
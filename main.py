@@ -1,135 +1,986 @@
 import sys
+import queue
+import itertools
+import socket
+import threading
+import time
 import pymssql
 import json
-from pathlib import Path
-
-from Func import GetClientInfo, ServiceInstallAndRun as Service
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from Func import Checkin, GetClientInfo, ClientReport, Config, LocalReplica, QueryParser, Statements, \
+    ServiceInstallAndRun as Service
+from Func.ConnectionPool import ConnectionPool, is_connection_error
+from Func.Endpoints import Endpoint, EndpointSelector, load_endpoints, load_sites, PRIMARY, SITE
+from Func.QueryCache import QueryCache
+from Func.WriteJournal import WriteJournal
+from Func.ComputerListQuery import KeysetPager, primary_key, row_key
 from qt_material import QtStyleTools, apply_stylesheet
 from Ui.main_ui import Ui_MainWindow
 from Ui.EditDialog_ui import Ui_EditDialog
 from Ui.EditTreeWidgetItem_ui import Ui_Dialog
-from PySide6.QtWidgets import QApplication, QMainWindow, QLabel, QTableWidgetItem, QDialog, QMessageBox, \
-    QListWidgetItem, QTreeWidgetItem, QMenu, QTreeWidget
-from PySide6.QtCore import QTimer, QDateTime, Qt, QThread, Signal, Slot, QProcess
-from PySide6.QtGui import QIcon, QFont, QAction, QFontDatabase
-
+from PySide6.QtWidgets import QApplication, QMainWindow, QLabel, QDialog, QMessageBox, QListWidgetItem, \
+    QTreeWidgetItem, QMenu, QTreeWidget, QPushButton, QCheckBox, QStyledItemDelegate, QStyleOptionViewItem, QStyle, \
+    QHeaderView
+from PySide6.QtCore import QTimer, QDateTime, Qt, QThread, Signal, Slot, QProcess, QAbstractTableModel, \
+    QModelIndex, QRect, QEvent
+from PySide6.QtGui import QIcon, QFont, QAction, QFontDatabase, QColor
+
+
+class DatabaseTask:
+    """
+    数据库任务句柄，每次提交任务返回一个独立的句柄。
+
+    结果与错误回调只属于本任务，均在主线程中执行；任务可取消，也可设置超时。
+    """
+
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    def __init__(self, task_id, task_type, sql, params=None, max_pending_batches=2):
+        self.task_id = task_id  # 关联 ID，用于把执行结果分发回本句柄
+        self.type = task_type
+        self.sql = sql
+        self.params = params or []
+        self.state = self.PENDING
+        self.result = None
+        self.error = None
+        self.result_callbacks = []
+        self.error_callbacks = []
+        self.batch_callbacks = []
+        self.batch_slots = threading.Semaphore(max_pending_batches)  # 流式查询中已发出但主线程尚未处理的批次上限
+        self.cache_generation = None  # 提交时的缓存失效代数，查询结果据此决定能否写回缓存
+        self.interrupt = None  # 执行期间由执行线程设置，取消时调用以中断正在执行的语句
+        self.batches_sent = 0  # 流式查询已发出的批次数，已有结果交给主线程后连接断开时不再重试
+        self.endpoint = None  # 指定执行的服务器名称（如联合搜索的站点），为 None 时按任务类型选择
+        self.interrupt_lock = threading.Lock()
+
+    def on_result(self, callback):
+        """注册成功回调，任务已完成时立即调用"""
+        if self.state == self.DONE:
+            callback(self.result)
+        elif self.state == self.PENDING:
+            self.result_callbacks.append(callback)
+        return self
+
+    def on_batch(self, callback):
+        """注册流式查询的分批结果回调"""
+        if self.state == self.PENDING:
+            self.batch_callbacks.append(callback)
+        return self
+
+    def on_error(self, callback):
+        """注册失败回调，任务已失败时立即调用"""
+        if self.state == self.FAILED:
+            callback(self.error)
+        elif self.state == self.PENDING:
+            self.error_callbacks.append(callback)
+        return self
+
+    def cancel(self):
+        """取消任务，尚未执行的任务不再执行，执行中的任务结果被丢弃"""
+        if self.state != self.PENDING:
+            return False
+        self.state = self.CANCELLED
+        self.release_callbacks()
+        with self.interrupt_lock:
+            if self.interrupt:
+                self.interrupt()
+        return True
+
+    def set_interrupt(self, interrupt):
+        """设置/清除中断正在执行语句的函数（执行线程调用）"""
+        with self.interrupt_lock:
+            self.interrupt = interrupt
+
+    def is_cancelled(self):
+        return self.state == self.CANCELLED
+
+    def add_batch(self, rows):
+        """收到流式查询的一批结果（主线程调用）"""
+        if self.state != self.PENDING:
+            return
+        for callback in self.batch_callbacks:
+            callback(rows)
 
-class DatabaseWorker(QThread):
-    # 查询相关信号
-    query_result = Signal(list)  # 查询结果
-    query_error = Signal(str)  # 查询错误
+    def finish(self, result):
+        """任务成功（主线程调用）"""
+        if self.state != self.PENDING:
+            return
+        self.state = self.DONE
+        self.result = result
+        callbacks = self.result_callbacks
+        self.release_callbacks()
+        for callback in callbacks:
+            callback(result)
+
+    def fail(self, error):
+        """任务失败（主线程调用），返回是否有错误回调处理了该错误"""
+        if self.state != self.PENDING:
+            return True
+        self.state = self.FAILED
+        self.error = error
+        callbacks = self.error_callbacks
+        self.release_callbacks()
+        for callback in callbacks:
+            callback(error)
+        return bool(callbacks)
 
-    # 更新相关信号
-    update_result = Signal(int)  # 更新成功，返回受影响行数
-    update_error = Signal(str)  # 更新失败
+    def release_callbacks(self):
+        """任务结束后释放回调，避免持有界面对象"""
+        self.result_callbacks = []
+        self.error_callbacks = []
+        self.batch_callbacks = []
 
-    # 插入相关信号
-    insert_result = Signal(int)
-    insert_error = Signal(str)
 
-    def __init__(self):
+class DatabaseWorker(QThread):
+    # 执行线程通过以下信号把结果交回主线程，再按任务 ID 分发给对应句柄
+    task_finished = Signal(int, object)  # 任务 ID，查询结果或受影响行数
+    task_failed = Signal(int, str)  # 任务 ID，错误信息
+    task_batch = Signal(int, object)  # 任务 ID，流式查询的一批结果
+
+    # 未注册错误回调的任务失败、数据库连接失败时发出
+    task_error = Signal(str)
+
+    # 主库连接状态变化：连接断开（执行任务或保活检查时发现）为 False，恢复后为 True
+    connection_changed = Signal(bool)
+
+    # 写操作日志：语句 ID 与执行结果，以及未写入的语句数
+    journal_entry_done = Signal(int, object)  # 语句 ID，受影响行数
+    journal_entry_failed = Signal(int, str)  # 语句 ID，错误信息
+    journal_changed = Signal(int)  # 未写入的语句数
+
+    # 任务优先级（数值越小越优先）：交互查询 > 编辑更新 > 后台上报
+    PRIORITY_STOP = -1
+    PRIORITY_QUERY = 0
+    PRIORITY_UPDATE = 1
+    PRIORITY_INSERT = 2
+
+    TASK_PRIORITY = {
+        "query": PRIORITY_QUERY,
+        "stream": PRIORITY_QUERY,
+        "search": PRIORITY_QUERY,
+        "update": PRIORITY_UPDATE,
+        "journal": PRIORITY_UPDATE,
+        "insert": PRIORITY_INSERT,
+    }
+
+    TASK_NAME = {"query": "查询", "stream": "查询", "search": "搜索", "update": "更新", "insert": "插入"}
+
+    # 连接断开后可以重新执行的任务类型（只读）
+    IDEMPOTENT_TASKS = ("query", "stream")
+
+    def __init__(self, config=None, connect=None, dialect="mssql", search_index=None, journal=None):
+        """
+        :param config: 配置字典，默认读取 Data/config.json
+        :param connect: 创建数据库连接的无参函数，默认按配置（database/endpoints）连接 SQL Server，
+                        可替换为本地替身（如 sqlite3）
+        :param dialect: 'mssql' 或 'sqlite'，为 sqlite 时语句中的 %s 占位符在执行前替换为 ?
+        :param search_index: 提供 search(term, limit) 的全文索引（如 LocalReplica），用于 'search' 任务
+        :param journal: WriteJournal 写操作日志，send_journaled 提交的写操作先写入日志，数据库不可达时不会丢失
+        """
         super().__init__()
-        self.task_queue = []  # 任务队列，统一处理查询和更新
+        self.config = config or Config.load_config()
+        self.dialect = dialect
+        self.search_index = search_index
+        self.journal = journal
+        self.journal_tasks = {}  # 日志语句 ID -> 任务句柄，仅在主线程中访问
+        self.journal_replay = None  # 正在进行的日志重放任务
+        self.journal_lock = threading.Lock()  # 同一时间只有一个执行线程重放日志，保证按顺序写入
+        self.prepare_statements = dialect == "mssql" and self.config["statements"]["prepare"]
+        self.task_queue = queue.PriorityQueue()  # 线程安全的阻塞优先级队列，元素为 (优先级, 序号, 任务句柄)
+        self.task_counter = itertools.count()  # 同一优先级内按提交顺序先进先出
+        self.task_ids = itertools.count(1)
+        self.pending_tasks = {}  # 任务 ID -> 任务句柄，仅在主线程中访问
         self.is_running = True  # 线程运行标志
-        self.connection = None  # 数据库连接
+        self.stop_event = threading.Event()  # 停止时唤醒重连等待与保活线程
+        self.online = True  # 最近一次访问数据库是否成功
+        self.online_lock = threading.Lock()
+
+        self.task_finished.connect(self.dispatch_result)
+        self.task_failed.connect(self.dispatch_error)
+        self.task_batch.connect(self.dispatch_batch)
+        self.journal_entry_done.connect(self.dispatch_journal_result)
+        self.journal_entry_failed.connect(self.dispatch_journal_error)
+
+        # 每台服务器一个连接池：查询使用延迟最低的可用服务器，写操作使用主库（self.pool）；
+        # 联合搜索的各站点也各有一个连接池，只执行指定了站点的任务
+        if connect:
+            self.endpoints = EndpointSelector([Endpoint("local", {}, PRIMARY)])
+        else:
+            sites = load_sites(self.config) if self.config["federation"]["enabled"] else []
+            self.endpoints = EndpointSelector(load_endpoints(self.config) + sites)
+        self.pools = {endpoint.name: self.create_pool(connect or self.endpoint_factory(endpoint))
+                      for endpoint in self.endpoints.endpoints}
+        self.pool = self.pools[self.endpoints.primary.name]
+        # 执行线程数：主库连接数，每个站点再加一个，联合搜索时各站点可同时执行
+        self.executor_count = self.pool.max_size + sum(
+            1 for endpoint in self.endpoints.endpoints if endpoint.role == SITE)
+
+        # 查询结果缓存，写操作成功后按表失效
+        cache_config = self.config["cache"]
+        self.cache = QueryCache(
+            max_entries=cache_config["max_entries"],
+            ttl=cache_config["ttl"],
+            stale_ttl=cache_config["stale_while_revalidate"],
+            max_rows=cache_config["max_rows"]
+        ) if cache_config["enabled"] else None
+
+    def create_pool(self, factory):
+        """创建连接池，连接数即并行执行任务的线程数"""
+        pool_config = self.config["pool"]
+        return ConnectionPool(
+            factory,
+            max_size=pool_config["max_size"],
+            min_idle=pool_config["min_idle"],
+            max_idle=pool_config["max_idle"],
+            health_check_after=pool_config["health_check_after"]
+        )
+
+    @staticmethod
+    def endpoint_factory(endpoint):
+        return lambda: pymssql.connect(**endpoint.params)
 
     def run(self):
-        """线程主循环，持续监听任务请求"""
+        """线程主循环，建立连接池后启动多个执行线程并行处理任务"""
+        retries = 0
         while self.is_running:
-            try:
-                # 建立数据库连接
-                self.connection = pymssql.connect(
-                    server="192.168.248.236",
-                    port=1433,
-                    database="LanRemoteMaster",
-                    user="sa",
-                    password="yuan@5419"
-                )
+            error = self.fill_pools()
+            if error is None:
                 break
-            except pymssql.DatabaseError as e:
-                self.query_error.emit(f"数据库连接失败: {str(e)}")
-                self.sleep(5)
+            self.task_error.emit(f"数据库连接失败: {str(error)}")
+            self.stop_event.wait(self.backoff_delay(retries))  # 按指数退避重连
+            retries += 1
+
+        executors = [threading.Thread(target=self.process_tasks, daemon=True) for _ in range(self.executor_count)]
+        for executor in executors:
+            executor.start()
+        keepalive = threading.Thread(target=self.keep_alive, daemon=True)
+        keepalive.start()
+        for executor in executors:
+            executor.join()
+        keepalive.join()
 
-        while self.is_running:
-            if self.task_queue:
-                task = self.task_queue.pop(0)  # 取出任务
-                sql = task.get("sql", "")
-                task_type = task.get("type", "query")  # 默认为查询
-                params = task.get("params", [])  # 可选参数
+        # 关闭数据库连接
+        for pool in self.pools.values():
+            pool.close()
 
-                try:
-                    with self.connection.cursor() as cursor:
-                        # 构建模糊查询参数（%param%）
-                        formatted_params = [f"{param}" for param in params]
-
-                        # 执行 SQL 查询或更新
-                        cursor.execute(sql, formatted_params)
-
-                        if task_type == "query":
-                            results = cursor.fetchall()
-                            self.query_result.emit(results)
-                        elif task_type == "update":
-                            self.connection.commit()
-                            rows_affected = cursor.rowcount
-                            if rows_affected == 0:
-                                self.update_error.emit("更新失败: 受影响的记录数为0")
-                            else:
-                                self.update_result.emit(rows_affected)
-                        elif task_type == "insert":
-                            self.connection.commit()
-                            rows_affected = cursor.rowcount
-                            if rows_affected == 0:
-                                self.insert_error.emit("插入失败: 受影响的记录数为0")
-                            else:
-                                self.insert_result.emit(rows_affected)
-                except pymssql.DatabaseError as e:
-                    if task_type == "query":
-                        self.query_error.emit(f"查询失败: {str(e)}")
-                    elif task_type == "update":
-                        self.update_error.emit(f"更新失败: {str(e)}")
-                except Exception as e:
-                    if task_type == "query":
-                        self.query_error.emit(f"查询异常: {str(e)}")
-                    elif task_type == "update":
-                        self.update_error.emit(f"更新异常: {str(e)}")
+    def fill_pools(self):
+        """
+        并行为各服务器预先建立连接，主库或任意一台副本可用时立即返回，其余服务器在后台继续连接
+
+        :return: 主库与副本全部连接失败时的第一个错误，否则为 None
+        """
+        executor = ThreadPoolExecutor(len(self.endpoints.endpoints), thread_name_prefix="pool-fill")
+        futures = {executor.submit(self.fill_pool, endpoint): endpoint for endpoint in self.endpoints.endpoints}
+        executor.shutdown(wait=False)
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None and futures[future].role != SITE:
+                    return None
+                error = error or future.exception()
+            if all(futures[future].role == SITE for future in pending):  # 只剩站点时不再等待
+                break
+        return error or ConnectionError("没有可用的服务器")
+
+    def fill_pool(self, endpoint):
+        """为一台服务器建立连接并更新其状态，主库的结果同时更新连接状态"""
+        try:
+            self.pools[endpoint.name].fill()
+        except Exception:
+            self.connection_lost(endpoint)
+            raise
+        self.endpoints.mark_up(endpoint)
+        if endpoint is self.endpoints.primary:
+            self.set_online(True)
+
+    def process_tasks(self):
+        """执行线程循环，从任务队列取出任务并借用连接执行"""
+        while True:
+            _, _, task = self.task_queue.get()  # 阻塞等待任务，空闲时不占用 CPU
+            if task is None:  # 停止信号
+                break
+            if task.state != DatabaseTask.PENDING:  # 排队期间已被取消或超时，通知主线程释放句柄
+                self.task_finished.emit(task.task_id, None)
+                continue
+            if task.type == "search":
+                self.execute_search(task)
+            elif task.type == "journal":
+                self.execute_journal(task)
             else:
-                self.msleep(100)  # 避免 CPU 空转
+                self.execute_task(task)
 
-        # 关闭数据库连接
-        if self.connection:
-            self.connection.close()
+    def execute_search(self, task):
+        """在全文索引中执行搜索，不占用数据库连接"""
+        try:
+            limit = task.params[0] if task.params else None
+            self.task_finished.emit(task.task_id, self.search_index.search(task.sql, limit))
+        except Exception as e:
+            self.task_failed.emit(task.task_id, f"搜索异常: {str(e)}")
+
+    def execute_journal(self, task):
+        """
+        按顺序重放写操作日志中未写入的语句，每条语句单独提交并确认
+
+        连接断开时停止，剩余语句留在日志中等待下次重放；语句本身出错时放弃该语句并报告错误。
+        任务结果为是否因连接断开而中止。
+        """
+        with self.journal_lock:
+            try:
+                connection = self.pool.acquire()
+            except Exception as e:
+                if is_connection_error(e):
+                    self.connection_lost(self.endpoints.primary)
+                self.task_finished.emit(task.task_id, True)
+                return
+
+            interrupted = False
+            try:
+                while not interrupted:
+                    entries = self.journal.pending()  # 重放期间新写入的语句在下一轮处理
+                    if not entries:
+                        break
+                    for entry in entries:
+                        if self.stop_event.is_set():
+                            interrupted = True
+                            break
+                        try:
+                            rows_affected = self.execute_write(connection, entry["sql"], entry["params"])
+                        except Exception as e:
+                            if is_connection_error(e):
+                                self.connection_lost(self.endpoints.primary)
+                                self.pool.discard(connection)
+                                connection = None
+                                interrupted = True
+                                break
+                            self.journal.ack(entry["id"])
+                            self.journal_entry_failed.emit(
+                                entry["id"], f"{self.TASK_NAME.get(entry['type'], '任务')}失败: {str(e)}")
+                            continue
+                        self.journal.ack(entry["id"])
+                        self.set_online(True)
+                        if self.cache:
+                            self.cache.invalidate(entry["sql"])
+                        if rows_affected == 0:
+                            self.journal_entry_failed.emit(
+                                entry["id"], f"{self.TASK_NAME.get(entry['type'], '任务')}失败: 受影响的记录数为0")
+                        else:
+                            self.journal_entry_done.emit(entry["id"], rows_affected)
+                    self.journal_changed.emit(len(self.journal))
+            finally:
+                if connection is not None:
+                    self.pool.release(connection)
+            self.task_finished.emit(task.task_id, interrupted)
+
+    def execute_write(self, connection, sql, params):
+        """执行并提交一条写语句，返回受影响的行数"""
+        cursor = connection.cursor()
+        try:
+            sql, params = self.prepare_statement(sql, params)
+            cursor.execute(sql, params)
+            connection.commit()
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+    def prepare_statement(self, sql, params):
+        """按数据库方言转换占位符，SQL Server 包装为可复用执行计划的语句"""
+        formatted_params = [f"{param}" for param in params or []]
+        if self.dialect == "sqlite":
+            return sql.replace("%s", "?"), formatted_params
+        if self.prepare_statements:  # 语句文本固定，服务器复用执行计划
+            return Statements.prepare(sql, formatted_params)
+        return sql, formatted_params
+
+    def keep_alive(self):
+        """
+        保活线程：定期探测各服务器的延迟，检查空闲连接，丢弃失效连接并补足连接，同时更新连接状态
+
+        各服务器并行探测，不可达的服务器不会推迟其他服务器的状态更新
+        """
+        interval = self.config["pool"]["keepalive_interval"]
+        if not interval:
+            return
+        executor = ThreadPoolExecutor(len(self.endpoints.endpoints), thread_name_prefix="probe")
+        try:
+            while not self.stop_event.wait(interval):
+                wait([executor.submit(self.probe, endpoint, interval) for endpoint in self.endpoints.endpoints])
+        finally:
+            executor.shutdown(wait=False)
+
+    def probe(self, endpoint, idle_time):
+        """探测一台服务器：保活空闲连接，并测量一次健康检查语句的往返延迟"""
+        pool = self.pools[endpoint.name]
+        try:
+            pool.keepalive(idle_time)
+            connection = pool.acquire(timeout=5)
+        except Exception:
+            self.connection_lost(endpoint)
+            return
+        start = time.monotonic()
+        if pool.is_healthy(connection):
+            self.endpoints.record_latency(endpoint, time.monotonic() - start)
+            pool.release(connection)
+            if endpoint is self.endpoints.primary:
+                self.set_online(True)
+        else:
+            self.connection_lost(endpoint)
+            pool.discard(connection)
+
+    def set_online(self, online):
+        """记录连接状态，状态变化时发出 connection_changed"""
+        with self.online_lock:
+            if self.online == online:
+                return
+            self.online = online
+        self.connection_changed.emit(online)
+
+    def backoff_delay(self, retries):
+        """第 retries 次重连前等待的秒数（指数退避）"""
+        pool_config = self.config["pool"]
+        return min(pool_config["retry_backoff"] * 2 ** retries, pool_config["retry_backoff_max"])
+
+    def wait_retry(self, task, retries):
+        """
+        重试前按指数退避等待
+
+        :return: 是否应当重试：任务为只读、未超过重试次数、流式查询尚未交出结果、等待期间未被取消且线程未停止
+        """
+        if (task.type not in self.IDEMPOTENT_TASKS or task.batches_sent
+                or retries >= self.config["pool"]["max_retries"]):
+            return False
+        deadline = time.monotonic() + self.backoff_delay(retries)
+        while not self.stop_event.is_set() and task.state == DatabaseTask.PENDING:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            self.stop_event.wait(min(remaining, 0.2))
+        return False
+
+    def execute_task(self, task):
+        """
+        执行单个任务，结果通过信号交回主线程
+
+        查询在延迟最低的可用服务器执行，写操作在主库执行，指定了服务器的任务（联合搜索）只在该服务器执行；
+        连接断开时把服务器标记为不可用，重新连接（查询换到下一台服务器）后重试只读任务
+        """
+        retries = 0
+        while True:
+            if task.endpoint:
+                endpoint = self.endpoints.get(task.endpoint)
+            elif task.type in self.IDEMPOTENT_TASKS:
+                endpoint = self.endpoints.read_endpoint()
+            else:
+                endpoint = self.endpoints.primary
+            pool = self.pools[endpoint.name]
+            try:
+                connection = pool.acquire()
+            except Exception as e:
+                if is_connection_error(e):
+                    self.connection_lost(endpoint)
+                    if self.wait_retry(task, retries):
+                        retries += 1
+                        continue
+                self.task_failed.emit(task.task_id, f"数据库连接失败: {str(e)}")
+                return
+
+            reusable = True  # 流式查询中途取消或连接断开时，连接不能再复用
+            try:
+                reusable = self.run_statement(task, connection)
+                self.endpoints.mark_up(endpoint)
+                if endpoint is self.endpoints.primary:
+                    self.set_online(True)
+                return
+            except Exception as e:
+                if is_connection_error(e):
+                    reusable = False
+                    self.connection_lost(endpoint)
+                    if self.wait_retry(task, retries):
+                        retries += 1
+                        continue
+                if isinstance(e, pymssql.DatabaseError):
+                    self.task_failed.emit(task.task_id, f"{self.TASK_NAME.get(task.type, '任务')}失败: {str(e)}")
+                else:
+                    self.task_failed.emit(task.task_id, f"{self.TASK_NAME.get(task.type, '任务')}异常: {str(e)}")
+                return
+            finally:
+                task.set_interrupt(None)
+                if reusable:
+                    pool.release(connection)
+                else:
+                    pool.discard(connection)
+
+    def connection_lost(self, endpoint):
+        """服务器连接断开，标记为不可用；主库断开时连接状态变为断开"""
+        self.endpoints.mark_down(endpoint)
+        if endpoint is self.endpoints.primary:
+            self.set_online(False)
+
+    def run_statement(self, task, connection):
+        """
+        在给定连接上执行任务的语句
+
+        :return: 连接能否继续复用
+        """
+        reusable = True
+        cursor = connection.cursor()
+        try:
+            # 执行 SQL 查询或更新
+            sql, formatted_params = self.prepare_statement(task.sql, task.params)
+            if self.dialect == "sqlite" and task.type in ("query", "stream"):
+                task.set_interrupt(connection.interrupt)  # sqlite3 允许从其他线程中断正在执行的查询
+            cursor.execute(sql, formatted_params)
+
+            if task.type == "query":
+                results = cursor.fetchall()
+                if self.cache and not task.endpoint:
+                    self.cache.put(task.sql, task.params, results, task.cache_generation)
+                self.task_finished.emit(task.task_id, results)
+            elif task.type == "stream":
+                reusable = self.stream_results(task, cursor)
+            elif task.type == "update":
+                connection.commit()
+                if self.cache:
+                    self.cache.invalidate(task.sql)
+                rows_affected = cursor.rowcount
+                if rows_affected == 0:
+                    self.task_failed.emit(task.task_id, "更新失败: 受影响的记录数为0")
+                else:
+                    self.task_finished.emit(task.task_id, rows_affected)
+            elif task.type == "insert":
+                connection.commit()
+                if self.cache:
+                    self.cache.invalidate(task.sql)
+                rows_affected = cursor.rowcount
+                if rows_affected == 0:
+                    self.task_failed.emit(task.task_id, "插入失败: 受影响的记录数为0")
+                else:
+                    self.task_finished.emit(task.task_id, rows_affected)
+        finally:
+            cursor.close()
+        return reusable
+
+    def stream_results(self, task, cursor):
+        """
+        分块读取查询结果并逐批交给主线程，内存占用只与块大小有关
+
+        :return: 结果集是否已读完，中途取消时返回 False
+        """
+        chunk_size = self.config["stream"]["chunk_size"]
+        total = 0
+        cached_rows = [] if self.cache and not task.endpoint else None  # 结果不超过缓存行数上限时顺便写入缓存
+        while True:
+            if task.state != DatabaseTask.PENDING:
+                self.task_finished.emit(task.task_id, None)  # 中途取消或超时，通知主线程释放句柄
+                return False
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            # 主线程尚未处理完之前的批次时在此等待，防止结果堆积在事件队列中
+            while not task.batch_slots.acquire(timeout=0.2):
+                if task.state != DatabaseTask.PENDING:
+                    self.task_finished.emit(task.task_id, None)
+                    return False
+            total += len(rows)
+            task.batches_sent += 1
+            if cached_rows is not None:
+                cached_rows.extend(rows)
+                if len(cached_rows) > self.cache.max_rows:
+                    cached_rows = None
+            self.task_batch.emit(task.task_id, rows)
+        if cached_rows is not None:
+            self.cache.put(task.sql, task.params, cached_rows, task.cache_generation)
+        self.task_finished.emit(task.task_id, total)
+        return True
+
+    @Slot(int, object)
+    def dispatch_result(self, task_id, result):
+        """把执行结果分发给对应的任务句柄（主线程）"""
+        task = self.pending_tasks.pop(task_id, None)
+        if task:
+            task.finish(result)
+
+    @Slot(int, object)
+    def dispatch_batch(self, task_id, rows):
+        """把流式查询的一批结果分发给对应的任务句柄（主线程）"""
+        task = self.pending_tasks.get(task_id)
+        if task:
+            task.add_batch(rows)
+            task.batch_slots.release()
+
+    @Slot(int, str)
+    def dispatch_error(self, task_id, error):
+        """把错误分发给对应的任务句柄，无人处理时发出 task_error（主线程）"""
+        task = self.pending_tasks.pop(task_id, None)
+        if task and not task.fail(error):
+            self.task_error.emit(error)
+
+    @Slot(int, object)
+    def dispatch_journal_result(self, entry_id, result):
+        """日志语句写入成功，分发给提交时的任务句柄（主线程）"""
+        task = self.journal_tasks.pop(entry_id, None)
+        if task:
+            self.dispatch_result(task.task_id, result)
+
+    @Slot(int, str)
+    def dispatch_journal_error(self, entry_id, error):
+        """日志语句写入失败（已放弃），分发给提交时的任务句柄，重启后重放的语句直接报告（主线程）"""
+        task = self.journal_tasks.pop(entry_id, None)
+        if task:
+            self.dispatch_error(task.task_id, error)
+        else:
+            self.task_error.emit(error)
+
+    def expire_task(self, task_id):
+        """任务超时"""
+        task = self.pending_tasks.get(task_id)
+        if task and task.state == DatabaseTask.PENDING:
+            self.dispatch_error(task_id, f"{self.TASK_NAME.get(task.type, '任务')}超时")  # 执行线程随后跳过或丢弃其结果
 
     def stop(self):
         """安全停止线程"""
         self.is_running = False
-        self.terminate()
-        self.wait()
+        self.stop_event.set()
+        for _ in range(self.executor_count):  # 每个执行线程一个停止信号，唤醒阻塞中的线程
+            self.task_queue.put((self.PRIORITY_STOP, next(self.task_counter), None))
+        if not self.wait(3000):  # 仍卡在连接数据库等阻塞调用时强制结束
+            self.terminate()
+            self.wait()
+
+    def submit(self, task_type, sql, params=None, timeout=None, priority=None, use_cache=True, endpoint=None):
+        """
+        提交任务并返回任务句柄（主线程调用）
+
+        :param task_type: 'query'/'stream'/'search'/'update'/'insert'
+        :param timeout: 超时时间（毫秒），超时后任务以错误结束
+        :param priority: 任务优先级，默认按任务类型确定
+        :param use_cache: 查询是否可以直接使用缓存结果，为 False 时总是查询数据库（结果仍写入缓存）
+        :param endpoint: 只在指定名称的服务器执行（联合搜索的站点），不使用缓存，失败时不换服务器
+        """
+        task = DatabaseTask(next(self.task_ids), task_type, sql, params,
+                            max_pending_batches=self.config["stream"]["max_pending_batches"])
+        task.endpoint = endpoint
+        self.pending_tasks[task.task_id] = task
+
+        if self.cache and task_type in ("query", "stream") and not endpoint:
+            cached = self.cache.get(sql, params) if use_cache else None
+            if cached:
+                rows, freshness = cached
+                QTimer.singleShot(0, lambda: self.deliver_cached(task, rows))  # 异步返回，调用方先注册回调
+                if freshness == QueryCache.STALE:  # 先返回旧结果，再在后台刷新缓存
+                    self.submit("query", sql, params, priority=self.PRIORITY_INSERT, use_cache=False).on_error(
+                        lambda error: None)
+                return task
+            task.cache_generation = self.cache.generation()
+
+        if timeout:
+            QTimer.singleShot(timeout, lambda: self.expire_task(task.task_id))
+        if priority is None:
+            priority = self.TASK_PRIORITY.get(task_type, self.PRIORITY_INSERT)
+        self.task_queue.put((priority, next(self.task_counter), task))
+        return task
+
+    def deliver_cached(self, task, rows):
+        """以缓存结果完成任务（主线程）"""
+        if task.type == "stream":
+            task.add_batch(rows)
+            self.dispatch_result(task.task_id, len(rows))
+        else:
+            self.dispatch_result(task.task_id, rows)
+
+    def send_journaled(self, task_type, sql, params=None, key=None):
+        """
+        提交写操作，先写入日志再按顺序执行，数据库不可达时保留在日志中，恢复连接后重放（主线程调用）
+
+        :param task_type: 'update'/'insert'
+        :param key: 合并键，日志中尚未写入的相同 key 的语句被本语句取代
+        :return: 任务句柄，语句写入数据库后完成
+        """
+        if self.journal is None:
+            return self.submit(task_type, sql, params)
+        entry_id, superseded = self.journal.append(task_type, sql, params, key)
+        for superseded_id in superseded:  # 被取代的语句不再执行，其句柄直接取消
+            old_task = self.journal_tasks.pop(superseded_id, None)
+            if old_task:
+                self.pending_tasks.pop(old_task.task_id, None)
+                old_task.cancel()
+
+        task = DatabaseTask(next(self.task_ids), task_type, sql, params)
+        self.pending_tasks[task.task_id] = task
+        self.journal_tasks[entry_id] = task
+        self.journal_changed.emit(len(self.journal))
+        self.replay_journal()
+        return task
+
+    def replay_journal(self):
+        """重放日志中未写入的语句，已在重放时不重复提交（主线程调用）"""
+        if self.journal is None or self.journal_replay or not len(self.journal):
+            return
+        self.journal_replay = self.submit("journal", None)
+        self.journal_replay.on_result(self.journal_replayed).on_error(self.journal_replay_failed)
+
+    def journal_replayed(self, interrupted):
+        """重放结束；未因断开连接中止而期间又有新语句写入时继续重放"""
+        self.journal_replay = None
+        self.journal_changed.emit(len(self.journal))
+        if not interrupted:
+            self.replay_journal()
 
-    @Slot(dict)
-    def receive_task(self, task):
-        """接收主线程的任务请求，格式：{'type': 'query'/'update', 'sql': '...', 'params': [...]}"""
-        self.task_queue.append(task)
+    def journal_replay_failed(self, error):
+        self.journal_replay = None
+        self.task_error.emit(error)
 
     # 便捷方法：发送查询任务
-    def send_query(self, sql, params=None):
-        task = {"type": "query", "sql": sql}
-        if params:
-            task["params"] = params
-        self.receive_task(task)
+    def send_query(self, sql, params=None, timeout=None, priority=None, use_cache=True):
+        return self.submit("query", sql, params, timeout, priority, use_cache)
+
+    # 便捷方法：发送流式查询任务，结果通过 on_batch 分批返回，on_result 返回总行数
+    def send_stream(self, sql, params=None, timeout=None, use_cache=True, endpoint=None):
+        return self.submit("stream", sql, params, timeout, use_cache=use_cache, endpoint=endpoint)
+
+    def site_names(self):
+        """联合搜索的站点名称"""
+        return [endpoint.name for endpoint in self.endpoints.endpoints if endpoint.role == SITE]
+
+    # 便捷方法：发送全文索引搜索任务，结果按匹配程度排序
+    def send_search(self, term, limit=None, timeout=None):
+        return self.submit("search", term, [limit] if limit else None, timeout)
 
     # 便捷方法：发送更新任务
-    def send_update(self, sql, params=None):
-        task = {"type": "update", "sql": sql}
-        if params:
-            task["params"] = params
-        self.receive_task(task)
+    def send_update(self, sql, params=None, timeout=None):
+        return self.submit("update", sql, params, timeout)
 
     # 便捷方法：发送插入任务
-    def send_insert(self, sql, params=None):
-        task = {"type": "insert", "sql": sql}
-        if params:
-            task["params"] = params
-        self.receive_task(task)
+    def send_insert(self, sql, params=None, timeout=None):
+        return self.submit("insert", sql, params, timeout)
+
+
+class ClientInfoWorker(QThread):
+    """
+    本机信息采集线程，定期重新读取网络信息，只在信息变化时通知界面
+
+    开启地址变化监视时（Windows），IP 地址变化后立即重新采集，不必等到下一次定时采集
+    """
+
+    info_changed = Signal(dict)  # 本机信息（首次采集或变化后）
+
+    def __init__(self, config):
+        """
+        :param config: 配置中的 client_info 项
+        """
+        super().__init__()
+        self.collector = GetClientInfo.ClientInfoCollector()
+        self.interval = config["interval"]
+        self.watch = config["watch"]
+        self.user_check_interval = config["user_check_interval"]
+        self.stop_event = threading.Event()
+
+    def run(self):
+        notifier = GetClientInfo.AddressChangeNotifier() if self.watch else None
+        last_user_check = time.monotonic()
+        try:
+            while not self.stop_event.is_set():
+                if self.user_check_interval and time.monotonic() - last_user_check >= self.user_check_interval:
+                    self.collector.refresh_static()  # 定期重新读取登录用户，发现切换用户
+                    last_user_check = time.monotonic()
+                try:
+                    info, changed = self.collector.sample()
+                    if changed:
+                        self.info_changed.emit(info)
+                except Exception:  # 采集失败时保留界面上的旧信息，下次再试
+                    pass
+                self.wait_for_change(notifier)
+        finally:
+            if notifier:
+                notifier.close()
+
+    def wait_for_change(self, notifier):
+        """等待到下一次采集：采集间隔已到、收到地址变化通知或线程停止"""
+        if notifier is None or not notifier.available:
+            self.stop_event.wait(self.interval)
+            return
+        deadline = time.monotonic() + self.interval
+        while not self.stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or notifier.wait(min(remaining, 0.5)):  # 分段等待，停止时及时退出
+                return
+
+    def stop(self):
+        """安全停止线程"""
+        self.stop_event.set()
+        self.wait()
+
+
+class LiveUpdateWorker(QThread):
+    """
+    变更推送接收线程：向采集服务订阅 ComputerList 的变更，收到后通知界面增量更新
+
+    订阅定期续订；推送序号不连续（推送丢失）或采集服务重启后通知界面重新查询一次
+    """
+
+    delta_received = Signal(list, list)  # 变更的行，删除的主键 [ComputerName, Name]
+    resync_needed = Signal()
+
+    def __init__(self, config):
+        """
+        :param config: 配置字典，采集服务地址为 agent.collector
+        """
+        super().__init__()
+        host, _, port = config["agent"]["collector"].rpartition(":")
+        self.address = (host, int(port))
+        self.token = config["collector"]["token"]
+        self.renew_interval = config["live"]["renew_interval"]
+        self.seq = None  # 最近一次收到的推送序号，订阅成功前为 None
+        self.stop_event = threading.Event()
+
+    def run(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.settimeout(0.5)  # 分段等待，停止时及时退出
+            subscribe = Checkin.encode({"type": Checkin.SUBSCRIBE, "token": self.token})
+            last_renew = None
+            while not self.stop_event.is_set():
+                if last_renew is None or time.monotonic() - last_renew >= self.renew_interval:
+                    last_renew = time.monotonic()
+                    try:
+                        sock.sendto(subscribe, self.address)
+                    except OSError:
+                        pass
+                try:
+                    data, _ = sock.recvfrom(Checkin.MAX_DATAGRAM)
+                except OSError:  # 超时，或采集服务未运行时 Windows 报告连接被重置
+                    continue
+                message = Checkin.decode(data)
+                if message:
+                    self.handle(message)
+
+    def handle(self, message):
+        """处理采集服务的回复与推送"""
+        if message["type"] == Checkin.SUBSCRIBED:
+            if self.seq is not None and message["seq"] != self.seq:  # 期间有推送丢失，或采集服务已重启
+                self.resync_needed.emit()
+            self.seq = message["seq"]
+        elif message["type"] == Checkin.DELTA and self.seq is not None:
+            if message["seq"] != self.seq + 1:
+                self.resync_needed.emit()
+            else:
+                self.delta_received.emit(message["rows"], message["deleted"])
+            self.seq = message["seq"]
+
+    def stop(self):
+        """安全停止线程"""
+        self.stop_event.set()
+        self.wait()
+
+
+class ReplicaSyncWorker(QThread):
+    """
+    本地副本同步线程，定期从 SQL Server 增量拉取 ComputerList，并定期全量同步
+
+    服务器有变更版本（迁移版本 9）时按 ChangeVer 增量同步，修改、删除与主键变化都能同步；
+    否则按 StartTime 水位线增量同步，已删除的行由全量同步清除
+    """
+
+    synced = Signal(int)  # 同步成功，返回本次同步的行数
+    sync_error = Signal(str)  # 同步失败（服务器不可达等）
+
+    def __init__(self, replica, pool, config):
+        """
+        :param replica: LocalReplica 本地副本
+        :param pool: SQL Server 连接池
+        :param config: 配置中的 replica 项
+        """
+        super().__init__()
+        self.replica = replica
+        self.pool = pool
+        self.interval = config["sync_interval"]
+        self.full_sync_interval = config["full_sync_interval"]
+        self.chunk_size = config["chunk_size"]
+        self.stop_event = threading.Event()
+
+    def run(self):
+        try:
+            self.replica.build_index()  # 建立索引前本地搜索使用 LIKE
+        except Exception as e:
+            self.sync_error.emit(f"本地副本索引建立失败: {str(e)}")
+
+        # 副本为空时先做一次全量同步，否则从变更版本或水位线继续增量同步
+        last_full_sync = time.monotonic() if self.resumable() else None
+        while not self.stop_event.is_set():
+            try:
+                # 没有水位线（上次全量同步时服务器上还没有数据）时增量同步无从比较，继续全量同步
+                full = (last_full_sync is None or not self.resumable()
+                        or time.monotonic() - last_full_sync >= self.full_sync_interval)
+                self.synced.emit(self.sync_once(full))
+                if full:
+                    last_full_sync = time.monotonic()
+            except Exception as e:
+                self.sync_error.emit(f"本地副本同步失败: {str(e)}")
+            self.stop_event.wait(self.interval)
+
+    def resumable(self):
+        """副本记录了变更版本或水位线，可以继续增量同步"""
+        return self.replica.change_versions() is not None or self.replica.watermark() is not None
+
+    def sync_once(self, full):
+        """执行一次全量或增量同步，返回同步的行数"""
+        with self.pool.connection() as connection:
+            cursor = connection.cursor()
+            try:
+                if full:
+                    # 先读取变更版本，全量读取期间的变更由之后的增量同步重读
+                    change_versions = self.read_change_versions(cursor)
+                    cursor.execute(LocalReplica.FULL_SYNC_SQL)
+                    return self.replica.replace_all(iter(lambda: cursor.fetchmany(self.chunk_size), []),
+                                                    change_versions)
+                if self.replica.change_versions() is not None:
+                    return self.sync_changes(cursor)
+                cursor.execute(LocalReplica.DELTA_SYNC_SQL, [self.replica.watermark()])
+                count = 0
+                for rows in iter(lambda: cursor.fetchmany(self.chunk_size), []):
+                    count += self.replica.apply_rows(rows)
+                return count
+            finally:
+                cursor.close()
+
+    @staticmethod
+    def read_change_versions(cursor):
+        """服务器上当前的 (行版本, 删除记录版本)，服务器没有变更版本时返回 None"""
+        try:
+            cursor.execute(Statements.MAX_CHANGE_VERSIONS)
+            row = cursor.fetchone()
+        except Exception:
+            return None
+        return tuple(version or 0 for version in row)
+
+    def sync_changes(self, cursor):
+        """按变更版本增量同步，应用修改与删除记录，返回处理的行数"""
+        change_versions = self.read_change_versions(cursor)
+        if change_versions is None:  # 服务器回退到了没有变更版本的结构
+            cursor.execute(LocalReplica.DELTA_SYNC_SQL, [self.replica.watermark()])
+            return sum(self.replica.apply_rows(rows) for rows in iter(lambda: cursor.fetchmany(self.chunk_size), []))
+
+        row_version, deleted_version = self.replica.reread_versions()
+        rows = []
+        while True:
+            cursor.execute(Statements.changed_computers(self.chunk_size), [row_version])
+            batch = cursor.fetchall()
+            rows.extend(batch)
+            if len(batch) < self.chunk_size:
+                break
+            row_version = batch[-1][0]
+        cursor.execute(Statements.DELETED_COMPUTERS, [deleted_version])
+        deleted = cursor.fetchall()
+        return self.replica.apply_changes(rows, deleted, change_versions)
+
+    def stop(self):
+        """安全停止线程"""
+        self.stop_event.set()
+        self.wait()
 
 
 class Worker(QThread):
@@ -161,10 +1012,12 @@ class Worker(QThread):
 class EditDialog(QDialog, Ui_EditDialog):
     """编辑/更新记录窗口"""
 
-    def __init__(self, table, db):
+    def __init__(self, model, row, db):
         super(EditDialog, self).__init__()
         self.setupUi(self)
-        self.clientRecordTable = table
+        self.clientRecordModel = model
+        self.record = model.record(row)  # 正在编辑的记录
+        self.key = primary_key(self.record)  # 记录主键 (ComputerName, Name)，用于修改语句并在表格刷新后重新定位
         self.db_worker = db
 
         # 填充QLineEdit控件
@@ -185,32 +1038,37 @@ class EditDialog(QDialog, Ui_EditDialog):
         if new_record == self.get_edit_info():  # 新记录是否与原记录相同
             QMessageBox.information(self, "信息", "未对记录做出修改，无需更新", QMessageBox.Ok)
         else:
-            new_record.extend(self.get_primary())  # 增加主键信息
-            update_sentence = (f"UPDATE ComputerList SET Name = '{new_record[0]}', ComputerName = '{new_record[1]}', "
-                               f"ComputerIP = '{new_record[2]}', Tab = '{new_record[3]}' WHERE LoginUserName = "
-                               f"'{new_record[4]}' AND ComputerName = '{new_record[5]}'")  # SQL更新语句
-            self.db_worker.update_result.connect(lambda: self.update_local_record(new_record))  # 数据库更新成功后再更新本地记录
-            self.db_worker.send_update(update_sentence)
+            params = new_record + self.get_primary()  # 增加主键信息
+            update_sentence = Statements.resolve(Statements.UPDATE_COMPUTER,
+                                                 self.db_worker.config["statements"]["use_procedures"])  # SQL更新语句
+            self.db_worker.send_journaled("update", update_sentence, params).on_result(
+                lambda rows: self.update_finished(rows, new_record))  # 数据库更新成功后再更新本地记录
 
     def get_edit_info(self):
         """获取当前记录信息"""
-        name = self.clientRecordTable.item(self.clientRecordTable.currentRow(), 0).text()
-        computer_name = self.clientRecordTable.item(self.clientRecordTable.currentRow(), 2).text()
-        ip = self.clientRecordTable.item(self.clientRecordTable.currentRow(), 3).text()
-        note = self.clientRecordTable.item(self.clientRecordTable.currentRow(), 6).text()
-        return [name, computer_name, ip, note]
+        return ["" if self.record[column] is None else str(self.record[column]) for column in (0, 2, 3, 6)]
 
     def get_primary(self):
-        """获取当前记录的主键信息"""
-        return [self.clientRecordTable.item(self.clientRecordTable.currentRow(), 1).text(),
-                self.clientRecordTable.item(self.clientRecordTable.currentRow(), 2).text()]
+        """获取当前记录的主键信息 (ComputerName, Name)"""
+        return list(self.key)
+
+    def update_finished(self, rows_affected, new_record):
+        """数据库更新成功"""
+        self.update_local_record(new_record)
+        QMessageBox.information(self, "信息", f"已成功更新{rows_affected}条记录", QMessageBox.Ok)
 
     def update_local_record(self, new_record):
         """更新当前记录"""
-        self.clientRecordTable.item(self.clientRecordTable.currentRow(), 0).setText(new_record[0])
-        self.clientRecordTable.item(self.clientRecordTable.currentRow(), 2).setText(new_record[1])
-        self.clientRecordTable.item(self.clientRecordTable.currentRow(), 3).setText(new_record[2])
-        self.clientRecordTable.item(self.clientRecordTable.currentRow(), 6).setText(new_record[3])
+        values = {0: new_record[0], 2: new_record[1], 3: new_record[2], 6: new_record[3]}
+        record = list(self.record)
+        for column, value in values.items():
+            record[column] = value
+        self.record = tuple(record)
+
+        row = self.clientRecordModel.find_row(self.key)
+        self.key = primary_key(self.record)
+        if row >= 0:  # 记录仍在当前结果中
+            self.clientRecordModel.update_row(row, values)
 
 
 class EditTreeWidgetItemDialog(QDialog, Ui_Dialog):
@@ -382,84 +1240,259 @@ class EditTreeWidgetItemDialog(QDialog, Ui_Dialog):
             json.dump(root_data, f, ensure_ascii=False, indent=2)
 
 
-class FuncQLabel(QLabel):
-    """QLabel的链接功能"""
-
-    def __init__(self, table, db, his_list):
-        super().__init__()
-        self.ClientRecordTable = table
-        self.db_worker = db
-        self.listWidget = his_list
-        self.setText(
-            "<a href='Link'><font color=blue>连接</font></a> | <a href='Edit'><font color=blue>编辑</font></a>")
-        self.setAlignment(Qt.AlignCenter)
-        self.linkActivated.connect(self.click_link)
-
-    def click_link(self, key):
-        """调用UltraVNC外部程序"""
-        full_name = self.ClientRecordTable.item(self.ClientRecordTable.currentRow(), 0).text()
-        login_user_name = self.ClientRecordTable.item(self.ClientRecordTable.currentRow(), 1).text()
-        computer_name = self.ClientRecordTable.item(self.ClientRecordTable.currentRow(), 2).text()
-        ip = self.ClientRecordTable.item(self.ClientRecordTable.currentRow(), 3).text()
-
-        attributes = {
-            "full_name": full_name,
-            "login_user_name": login_user_name,
-            "computer_name": computer_name,
-            "ip": ip,
-        }
-
-        if key == "Link":
-            vnc_process = QProcess()
-            vnc_path = r".\x64\vncviewer.exe"
-            args = [
-                f"{ip}",
-                "-password",
-                "111111"
-            ]
-            vnc_process.setProgram(vnc_path)
-            vnc_process.setArguments(args)
-            vnc_process.startDetached()
-
-            if self.insert_history_record(attributes):  # 向历史列表添加连接记录
-                self.save_listWidget()
-            return
-        if key == "Edit":
-            edit_dialog = EditDialog(self.ClientRecordTable, self.db_worker)  # 传入主窗口表格控件与数据库工作线程
-            edit_dialog.exec()
-            return
-
-    def insert_history_record(self, item_attributes):
-        """插入历史列表"""
-        if self.item_exists(item_attributes):
-            return False
-
-        if self.listWidget.count() < 16:
-            self.listWidget.insertItem(0, HisListWidgetItem(item_attributes))
+class ClientRecordModel(QAbstractTableModel):
+    """搜索结果表格的数据模型，每行以元组保存，界面只绘制可见行"""
+
+    HEADERS = ["姓名", "登录名", "计算机名", "IP地址", "MAC地址", "最近登陆时间", "备注", "功能", "来源", "在线"]
+    LINK_COLUMN = 7  # 连接/编辑链接所在列，由 LinkDelegate 绘制
+    SOURCE_COLUMN = 8  # 联合搜索时记录所在的站点，普通查询的行没有此列
+    ONLINE_COLUMN = 9  # 在线状态，按在线计算机集合计算，不保存在行中
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+        self.online_keys = None  # 在线计算机的 (ComputerName, Name) 集合，未启用在线状态时为 None
+        self.offline_text = "离线"  # 不在集合中的计算机显示的文本
+        self.online_tooltip = None  # 在线列标题的提示
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.column() == self.LINK_COLUMN:
+            return None
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return self.text(index.row(), index.column())
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        if orientation == Qt.Horizontal and role == Qt.ToolTipRole and section == self.ONLINE_COLUMN:
+            return self.online_tooltip
+        return None
+
+    def text(self, row, column):
+        """指定单元格的显示文本"""
+        if column == self.ONLINE_COLUMN:
+            if self.online_keys is None:
+                return ""
+            return "在线" if self.is_online(row) else self.offline_text
+        record = self.rows[row]
+        value = record[column] if column < len(record) else None
+        return "" if value is None else str(value)
+
+    def record(self, row):
+        """指定行的原始数据"""
+        return self.rows[row]
+
+    def is_online(self, row):
+        """指定行的计算机是否在线，未启用在线状态时视为在线"""
+        if self.online_keys is None:
             return True
+        record = self.rows[row]
+        return (record[2], record[0]) in self.online_keys
+
+    def set_online_keys(self, keys):
+        """更新在线计算机集合并刷新在线列"""
+        self.online_keys = keys
+        if self.rows:
+            self.dataChanged.emit(self.index(0, self.ONLINE_COLUMN), self.index(len(self.rows) - 1, self.ONLINE_COLUMN))
+
+    def clear(self):
+        self.beginResetModel()
+        self.rows = []
+        self.endResetModel()
+
+    def set_rows(self, rows):
+        """替换全部数据"""
+        self.beginResetModel()
+        self.rows = [tuple(row) for row in rows]
+        self.endResetModel()
+
+    def append_rows(self, rows):
+        """追加数据"""
+        if not rows:
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.rows.extend(tuple(row) for row in rows)
+        self.endInsertRows()
+
+    def find_row(self, key):
+        """按主键 (ComputerName, Name) 查找行号，不存在时返回 -1"""
+        for row, record in enumerate(self.rows):
+            if primary_key(record) == key:
+                return row
+        return -1
+
+    def apply_diff(self, new_rows, ordered=False):
+        """
+        与重新查询的结果按主键比较，只删除、修改、追加有变化的行，保留选中项与滚动位置
 
-        if self.listWidget.count() == 16:
-            self.listWidget.insertItem(0, HisListWidgetItem(item_attributes))
-            last_item = self.listWidget.takeItem(self.listWidget.count() - 1)  # 移除历史连接记录列表最后一行
-            del last_item  # 显式删除
-            return True
+        :param ordered: 新增行是否按在查询结果中的位置插入（浏览分页的结果有序），否则追加到末尾
+        :return: (新增行数, 删除行数, 修改行数)
+        """
+        new_records = {}
+        for row in new_rows:
+            new_records[primary_key(row)] = tuple(row)
+
+        # 标记要保留的行：主键仍存在且不重复
+        keep = []
+        seen = set()
+        for record in self.rows:
+            key = primary_key(record)
+            keep.append(key in new_records and key not in seen)
+            seen.add(key)
+
+        # 从后往前删除其余的行，连续的行合并为一次删除
+        removed = 0
+        row = len(self.rows) - 1
+        while row >= 0:
+            if keep[row]:
+                row -= 1
+                continue
+            last = row
+            while row >= 0 and not keep[row]:
+                row -= 1
+            self.beginRemoveRows(QModelIndex(), row + 1, last)
+            del self.rows[row + 1:last + 1]
+            self.endRemoveRows()
+            removed += last - row
+
+        # 更新内容有变化的行，连续的行合并为一次 dataChanged
+        changed = 0
+        first_changed = None
+        for row, record in enumerate(self.rows):
+            new_record = new_records.pop(primary_key(record))
+            if new_record != record:
+                self.rows[row] = new_record
+                changed += 1
+                if first_changed is None:
+                    first_changed = row
+                continue
+            if first_changed is not None:
+                self.dataChanged.emit(self.index(first_changed, 0), self.index(row - 1, self.columnCount() - 1))
+                first_changed = None
+        if first_changed is not None:
+            self.dataChanged.emit(self.index(first_changed, 0),
+                                  self.index(len(self.rows) - 1, self.columnCount() - 1))
+
+        # 剩余的为新增行：有序结果中保留的行与查询结果顺序一致，按查询结果中的位置依次插入
+        inserted = len(new_records)
+        if ordered:
+            for position, row in enumerate(new_rows):
+                record = new_records.pop(primary_key(row), None)
+                if record is not None:
+                    self.beginInsertRows(QModelIndex(), position, position)
+                    self.rows.insert(position, record)
+                    self.endInsertRows()
+        else:
+            self.append_rows(list(new_records.values()))
+        return inserted, removed, changed
 
-    def item_exists(self, attributes):
-        """判断历史列表中是否存在该连接记录"""
-        for i in range(self.listWidget.count()):
-            item = self.listWidget.item(i)
-            if item.attributes == attributes:
-                return True
-        return False
+    def apply_changes(self, rows, deleted, match=None):
+        """
+        按主键 (ComputerName, Name) 合并推送的变更：已有的行更新或删除，不再符合 match 的行删除；
+        match 不为 None 时追加符合条件的新行（浏览分页时不追加）
 
-    def save_listWidget(self):
-        """保存历史列表结构"""
-        attributes_list = []
-        with open("Data/listStructure.json", "w", encoding="utf-8") as f:
-            for i in range(self.listWidget.count()):
-                item = self.listWidget.item(i)
-                attributes_list.append(item.attributes)
-            json.dump(attributes_list, f, ensure_ascii=False, indent=2)
+        :return: (新增行数, 删除行数, 修改行数)
+        """
+        positions = {primary_key(record): row for row, record in enumerate(self.rows)}
+        remove = {positions[tuple(key)] for key in deleted if tuple(key) in positions}
+        new_rows = []
+        changed = 0
+        for values in rows:
+            record = tuple(values)
+            row = positions.get(primary_key(record))
+            if match is not None and not match(record):
+                if row is not None:
+                    remove.add(row)
+                continue
+            if row is None:
+                if match is not None:
+                    new_rows.append(record)
+                continue
+            record += self.rows[row][len(record):]  # 保留来源等附加列
+            if record != self.rows[row]:
+                self.rows[row] = record
+                changed += 1
+                self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+        for row in sorted(remove, reverse=True):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.rows[row]
+            self.endRemoveRows()
+        self.append_rows(new_rows)
+        return len(new_rows), len(remove), changed
+
+    def update_row(self, row, values):
+        """更新一行中的部分列，values 为 {列号: 新值}"""
+        record = list(self.rows[row])
+        for column, value in values.items():
+            record[column] = value
+        self.rows[row] = tuple(record)
+        self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+
+class LinkDelegate(QStyledItemDelegate):
+    """在单元格中绘制“连接 | 编辑”链接，代替为每一行创建 QLabel 控件"""
+
+    link_activated = Signal(str, int)  # 链接类型 'Link'/'Edit'，行号
+
+    LINKS = (("Link", "连接"), ("Edit", "编辑"))
+    SEPARATOR = " | "
+
+    def link_rects(self, option):
+        """计算各链接文本的绘制区域，整体居中"""
+        metrics = option.fontMetrics
+        widths = [metrics.horizontalAdvance(text) for _, text in self.LINKS]
+        separator_width = metrics.horizontalAdvance(self.SEPARATOR)
+        x = option.rect.center().x() - (sum(widths) + separator_width) // 2
+
+        rects = []
+        for (key, text), width in zip(self.LINKS, widths):
+            rects.append((key, text, QRect(x, option.rect.top(), width, option.rect.height())))
+            x += width + separator_width
+        separator_rect = QRect(rects[0][2].right() + 1, option.rect.top(), separator_width, option.rect.height())
+        return rects, separator_rect
+
+    def paint(self, painter, option, index):
+        # 先绘制背景（选中、交替行颜色等）
+        style_option = QStyleOptionViewItem(option)
+        self.initStyleOption(style_option, index)
+        style = style_option.widget.style() if style_option.widget else QApplication.style()
+        style.drawControl(QStyle.CE_ItemViewItem, style_option, painter, style_option.widget)
+
+        rects, separator_rect = self.link_rects(option)
+        painter.save()
+        painter.drawText(separator_rect, Qt.AlignCenter, self.SEPARATOR)
+        font = QFont(option.font)
+        font.setUnderline(True)
+        painter.setFont(font)
+        painter.setPen(QColor("blue"))
+        for _, text, rect in rects:
+            painter.drawText(rect, Qt.AlignCenter, text)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        size = super().sizeHint(option, index)
+        text = self.SEPARATOR.join(text for _, text in self.LINKS)
+        size.setWidth(option.fontMetrics.horizontalAdvance(text) + 20)
+        return size
+
+    def editorEvent(self, event, model, option, index):
+        """点击链接文本时发出 link_activated"""
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            rects, _ = self.link_rects(option)
+            for key, _, rect in rects:
+                if rect.contains(event.position().toPoint()):
+                    self.link_activated.emit(key, index.row())
+                    return True
+        return super().editorEvent(event, model, option, index)
 
 
 class HisListWidgetItem(QListWidgetItem):
@@ -605,37 +1638,174 @@ class MainWindow(QMainWindow, Ui_MainWindow, QtStyleTools):
         self.setupUi(self)
         self.load_treeWidget("Data/treeStructure.json")
         self.load_listWidget("Data/listStructure.json")
+        self.config = Config.load_config()
         self.db_worker = None
         self.service_worker = None
+        self.query_task = None  # 当前正在进行的流式查询
+        self.fallback_query = None  # 按类型搜索无结果时改用的七列模糊搜索 (查询语句, 参数)
+        self.query_row_count = 0  # 当前查询已加载的行数
+
+        # 联合搜索：同一搜索发往本站与各站点数据库，结果按主键合并去重并标注来源
+        federation_config = self.config["federation"]
+        self.federation_enabled = federation_config["enabled"] and bool(federation_config["sites"])
+        self.local_site_name = federation_config["local_name"]
+        self.federated_tasks = {}  # 站点名称 -> 尚未完成的流式查询
+        self.federated_rows = {}  # 主键 -> 行号，站点结果到达时据此去重
+        self.federated_status = {}  # 站点名称 -> 完成情况（行数或错误）
+
+        # 空搜索时按页浏览
+        browse_config = self.config["browse"]
+        self.pager = KeysetPager(browse_config["page_size"])
+        self.prefetch_enabled = browse_config["prefetch"]
+        self.prefetched_page = None  # 后台预取的下一页 (起始键, 查询结果)
+        self.browsing = False  # 当前结果是否为浏览分页的一页
+        self.prefetch_task = None
+
+        # 自动刷新：定时重新执行当前查询，并与表格中的结果按主键比较后增量更新
+        self.refresh_query = None  # 当前结果对应的 (任务类型, 查询语句或搜索词, 参数)
+        self.refresh_task = None
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(int(self.config["refresh"]["interval"] * 1000))
+
+        # 查询进度与取消按钮
+        self.cancelQueryButton = QPushButton("停止", self.SearchTab)
+        self.cancelQueryButton.setVisible(False)
+        self.horizontalLayout_2.insertWidget(self.horizontalLayout_2.indexOf(self.label_2), self.cancelQueryButton)
+
+        # 搜索结果表格：数据模型 + 链接委托，行高固定以免逐行计算
+        self.clientRecordModel = ClientRecordModel(self)
+        self.linkDelegate = LinkDelegate(self.ClientRecordTable)
+        self.ClientRecordTable.setModel(self.clientRecordModel)
+        self.ClientRecordTable.setItemDelegateForColumn(ClientRecordModel.LINK_COLUMN, self.linkDelegate)
+        self.ClientRecordTable.setColumnHidden(ClientRecordModel.SOURCE_COLUMN, True)
+        self.ClientRecordTable.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+
+        # 浏览模式翻页按钮
+        self.previousPageButton = QPushButton("上一页", self.SearchTab)
+        self.nextPageButton = QPushButton("下一页", self.SearchTab)
+        self.pageLabel = QLabel(self.SearchTab)
+        for widget in (self.previousPageButton, self.pageLabel, self.nextPageButton):
+            widget.setVisible(False)
+            self.horizontalLayout_2.addWidget(widget)
+
+        self.autoRefreshCheckBox = QCheckBox("自动刷新", self.SearchTab)
+        self.horizontalLayout_2.addWidget(self.autoRefreshCheckBox)
+
+        # 在线状态：定期读取最近有心跳的计算机，据此显示在线列并筛选
+        presence_config = self.config["presence"]
+        self.presence_enabled = presence_config["enabled"]
+        self.presence_ttl = presence_config["ttl"]
+        self.presence_task = None
+        self.online_filtered = False  # 是否按“仅显示在线”隐藏过行，取消勾选后需要逐行恢复
+        self.presence_timer = QTimer(self)
+        self.presence_timer.setInterval(int(presence_config["refresh_interval"] * 1000))
+        self.onlineOnlyCheckBox = QCheckBox("仅显示在线", self.SearchTab)
+        self.onlineOnlyCheckBox.setVisible(self.presence_enabled)
+        self.horizontalLayout_2.addWidget(self.onlineOnlyCheckBox)
+        self.ClientRecordTable.setColumnHidden(ClientRecordModel.ONLINE_COLUMN, not self.presence_enabled)
+        self.ClientRecordTable.horizontalHeader().moveSection(ClientRecordModel.ONLINE_COLUMN, 0)  # 在线列显示在最前
+
+        # 心跳只经采集服务写入 LastSeen：配置了 agent.collector 时界面也定期发送本机心跳；
+        # 否则只运行界面的计算机没有心跳，无法判断是否离线，显示为“无心跳”而不是“离线”
+        self.heartbeat_address = None
+        self.heartbeat_timer = QTimer(self)
+        self.heartbeat_timer.setInterval(int(presence_config["heartbeat_interval"] * 1000))
+        self.heartbeat_timer.timeout.connect(self.send_heartbeat)
+        if self.presence_enabled and self.config["agent"]["collector"]:
+            host, _, port = self.config["agent"]["collector"].rpartition(":")
+            self.heartbeat_address = (host, int(port))
+            self.heartbeat_timer.start()
+        elif self.presence_enabled:
+            self.clientRecordModel.offline_text = "无心跳"
+            self.clientRecordModel.online_tooltip = ("在线状态来自经采集服务（agent.collector）上报的心跳，"
+                                                     "只运行界面或直接连接数据库的计算机没有心跳，显示为“无心跳”")
+
+        # 变更推送：采集服务推送 ComputerList 的变更，直接合并到当前结果，不必等待自动刷新
+        self.live_term = None  # 当前结果的搜索词
+        self.live_match = None  # 当前结果的匹配条件，推送的新记录符合时追加；浏览分页时为 None
+        self.live_pending = []  # 查询进行中收到的变更 (行, 删除的主键)，查询完成后合并
+        self.live_worker = None
+        if self.config["live"]["enabled"] and self.config["agent"]["collector"]:
+            self.live_worker = LiveUpdateWorker(self.config)
+            self.live_worker.delta_received.connect(self.apply_live_delta)
+            self.live_worker.resync_needed.connect(self.refresh_results)
+            self.live_worker.start()
+
+        # 边输入边搜索：停止输入一段时间后才查询，新的搜索取代尚未完成的旧搜索
+        search_config = self.config["search"]
+        self.live_search_min_chars = search_config["min_chars"]
+        self.live_search_term = None  # 最近一次边输入边搜索的搜索词，相同时不再查询
+        self.liveSearchCheckBox = QCheckBox("边输入边搜索", self.SearchTab)
+        self.liveSearchCheckBox.setChecked(search_config["live"])
+        self.horizontalLayout_2.addWidget(self.liveSearchCheckBox)
+        self.live_search_timer = QTimer(self)
+        self.live_search_timer.setSingleShot(True)
+        self.live_search_timer.setInterval(search_config["debounce_ms"])
 
         # 创建时间更新定时器
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_time)
         self.timer.start(1000)  # 每1000毫秒（1秒）触发一次
 
-        # 创建客户端信息显示刷新定时器
-        self.dis_client_info_timer = QTimer(self)
-        self.dis_client_info_timer.timeout.connect(self.display_client_info)
-        self.dis_client_info_timer.start(10000)
+        # 客户端信息在后台线程采集，只在变化时刷新显示并上报
+        client_info_config = self.config["client_info"]
+        self.client_info = None  # 最近一次采集的本机信息
+        self.client_info_worker = ClientInfoWorker(client_info_config)
+        self.client_info_worker.info_changed.connect(self.client_info_changed)
+
+        # 信息变化后的上报限速：距上次上报不足最小间隔时推迟到间隔结束，期间的多次变化只上报一次
+        self.min_report_interval = client_info_config["min_report_interval"]
+        self.last_report_time = None
+        self.report_timer = QTimer(self)
+        self.report_timer.setSingleShot(True)
+        self.report_timer.timeout.connect(self.send_insert_to_worker)
 
-        # 创建客户端信息更新定时器
+        # 创建客户端信息更新定时器：信息未变化时也定期上报一次
         self.update_client_info_timer = QTimer(self)
         self.update_client_info_timer.timeout.connect(self.send_insert_to_worker)
-        self.update_client_info_timer.start(9000000)
+        self.update_client_info_timer.start(int(client_info_config["report_interval"] * 1000))
+
+        # 写操作日志：数据库不可达时写操作保留在本地，恢复连接后重放
+        journal_config = self.config["journal"]
+        self.journal = WriteJournal(journal_config["path"]) if journal_config["enabled"] else None
+        self.journalLabel = QLabel(self)
+        self.statusbar.addPermanentWidget(self.journalLabel)
 
         # 创建持久数据库查询线程
-        self.db_worker = DatabaseWorker()
-        self.db_worker.query_result.connect(self.update_table)
-        self.db_worker.query_error.connect(self.show_message)
-        self.db_worker.update_result.connect(
-            lambda x: QMessageBox.information(self, "信息", f"已成功更新{x}条记录", QMessageBox.Ok))
-        self.db_worker.update_error.connect(self.show_message)
+        self.db_worker = DatabaseWorker(self.config, journal=self.journal)
+        self.db_worker.task_error.connect(self.show_message)
+        self.db_worker.connection_changed.connect(self.db_connection_changed)
+        self.db_worker.journal_changed.connect(self.journal_changed)
         self.db_worker.start()
-
-        # 立即运行定时器任务
+        self.journal_changed(len(self.journal) if self.journal else 0)
+        self.db_worker.replay_journal()  # 重放上次退出前未写入的语句
+        if self.presence_enabled:
+            self.presence_timer.start()
+            self.refresh_presence()
+
+        # 全部计算机的上报统计（TouchCount 由 touch_counter 累加），与本机上报次数一起显示在计算机名的提示中
+        self.report_counters_text = ""
+        self.fleet_stats_text = ""
+        self.fleet_stats_task = None
+        self.fleet_stats_timer = QTimer(self)
+        self.fleet_stats_timer.setInterval(int(self.config["client_info"]["fleet_stats_interval"] * 1000))
+        self.fleet_stats_timer.timeout.connect(self.refresh_fleet_stats)
+        if self.config["client_info"]["touch_counter"]:
+            self.fleet_stats_timer.start()
+            self.refresh_fleet_stats()
+        self.query_worker = self.db_worker  # 当前结果所用的数据库线程（服务器或本地副本）
+
+        # 本地副本：在后台同步，搜索在本地执行，服务器不可达时仍可搜索
+        self.db_online = True
+        self.replica = None
+        self.replica_worker = None
+        self.replica_sync = None
+        if self.config["replica"]["enabled"]:
+            self.start_replica()
+
+        # 立即运行定时器任务，首次采集到本机信息后上报
         self.update_time()
-        self.display_client_info()
-        self.send_insert_to_worker()
+        self.client_info_worker.start()
 
         # 信号绑定
         self.treeWidget.customContextMenuRequested.connect(self.show_context_menu)  # 绑定treeWidget控件右键菜单
@@ -648,6 +1818,16 @@ class MainWindow(QMainWindow, Ui_MainWindow, QtStyleTools):
         self.LeftSearchEdit.textEdited.connect(self.switch_page)
         self.pushButton.clicked.connect(self.send_query_to_worker)
         self.lineEdit.returnPressed.connect(self.send_query_to_worker)
+        self.lineEdit.textEdited.connect(self.schedule_live_search)
+        self.live_search_timer.timeout.connect(self.live_search)
+        self.cancelQueryButton.clicked.connect(self.cancel_query)
+        self.linkDelegate.link_activated.connect(self.click_link)
+        self.previousPageButton.clicked.connect(self.browse_previous_page)
+        self.nextPageButton.clicked.connect(self.browse_next_page)
+        self.autoRefreshCheckBox.toggled.connect(self.switch_auto_refresh)
+        self.onlineOnlyCheckBox.toggled.connect(lambda checked: self.apply_online_filter())
+        self.presence_timer.timeout.connect(self.refresh_presence)
+        self.refresh_timer.timeout.connect(self.refresh_results)
         self.listWidget.itemDoubleClicked.connect(self.item_double_clicked)
         self.treeWidget.itemDoubleClicked.connect(self.item_double_clicked)
         self.treeWidget_2.itemDoubleClicked.connect(self.item_double_clicked)
@@ -668,7 +1848,66 @@ class MainWindow(QMainWindow, Ui_MainWindow, QtStyleTools):
 
     def closeEvent(self, event):
         """安全停止数据库服务线程"""
+        self.client_info_worker.stop()
+        if self.live_worker:
+            self.live_worker.stop()
         self.db_worker.stop()
+        if self.journal:
+            self.journal.close()
+        if self.replica:
+            self.replica_sync.stop()
+            self.replica_worker.stop()
+            self.replica.close()
+
+    def start_replica(self):
+        """打开本地副本并启动同步线程与本地查询线程"""
+        replica_config = self.config["replica"]
+        self.replica = LocalReplica.LocalReplica(replica_config["path"], replica_config["trigram_index"])
+
+        # 本地查询不使用查询缓存，连接数较少即可
+        local_config = Config.merge_config(self.config, {
+            "pool": {"max_size": 2, "min_idle": 1, "max_idle": 2},
+            "cache": {"enabled": False},
+        })
+        self.replica_worker = DatabaseWorker(local_config, connect=self.replica.connect, dialect="sqlite",
+                                             search_index=self.replica)
+        self.replica_worker.task_error.connect(self.show_message)
+        self.replica_worker.start()
+
+        self.replica_sync = ReplicaSyncWorker(self.replica, self.db_worker.pool, replica_config)
+        self.replica_sync.synced.connect(self.replica_synced)
+        self.replica_sync.sync_error.connect(self.replica_sync_failed)
+        self.replica_sync.start()
+
+    def db_connection_changed(self, online):
+        """数据库连接断开/恢复，断开期间启用本地副本时改用本地副本搜索"""
+        self.db_online = online
+        if online:
+            self.show_message("数据库连接已恢复")
+            self.db_worker.replay_journal()
+        else:
+            self.show_message("数据库连接已断开，正在重新连接...")
+
+    def journal_changed(self, backlog):
+        """显示写操作日志中尚未写入数据库的语句数"""
+        self.journalLabel.setText(f"待写入 {backlog} 条" if backlog else "")
+
+    def replica_synced(self, count):
+        """本地副本同步成功，说明服务器可达"""
+        self.db_online = True
+        if count:
+            self.show_message(f"本地副本已同步 {count} 条记录")
+
+    def replica_sync_failed(self, error):
+        """本地副本同步失败，改用本地副本搜索"""
+        self.db_online = False
+        self.show_message(f"{error}，使用本地副本搜索")
+
+    def search_worker(self):
+        """选择执行搜索的数据库线程：启用本地副本且配置为本地搜索或服务器不可达时使用本地副本"""
+        if self.replica_worker and (self.config["replica"]["serve_searches"] or not self.db_online):
+            return self.replica_worker
+        return self.db_worker
 
     def service_install(self):
         """安装UltraVNC服务 并确保通过防火墙"""
@@ -683,9 +1922,42 @@ class MainWindow(QMainWindow, Ui_MainWindow, QtStyleTools):
         time_str = current_time.toString("yyyy-MM-dd HH:mm:ss")
         self.TimeLabel.setText(time_str)
 
-    def display_client_info(self):
-        """获取客户端信息"""
-        client_info = GetClientInfo.get_system_info()
+    def client_info_changed(self, client_info):
+        """本机信息（IP、MAC、登录用户等）首次采集到或发生变化，刷新显示并限速上报到数据库"""
+        first = self.client_info is None
+        self.client_info = client_info
+        self.display_client_info(client_info)
+        self.schedule_client_report()
+        if first:
+            self.send_heartbeat()  # 首次采集到本机信息时立即发送心跳，之后按心跳间隔发送
+
+    def send_heartbeat(self):
+        """向采集服务发送本机心跳（UDP，不等待确认，丢失由下一次心跳弥补）"""
+        if self.heartbeat_address is None or self.client_info is None:
+            return
+        key = (self.client_info["ComputerName"], self.client_info["Name"])
+        message = Checkin.heartbeat_message(key, self.config["collector"]["token"])
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.sendto(Checkin.encode(message), self.heartbeat_address)
+        except OSError:  # 地址无法解析等，下一次心跳再试
+            pass
+
+    def schedule_client_report(self):
+        """距上次上报已超过最小间隔时立即上报，否则推迟到间隔结束（已在等待时不重复计时）"""
+        if self.report_timer.isActive():
+            return
+        if self.last_report_time is None:
+            self.send_insert_to_worker()
+            return
+        remaining = self.min_report_interval - (time.monotonic() - self.last_report_time)
+        if remaining <= 0:
+            self.send_insert_to_worker()
+        else:
+            self.report_timer.start(int(remaining * 1000))
+
+    def display_client_info(self, client_info):
+        """显示客户端信息"""
         self.FullNameLabel.setText(client_info["Name"])
         self.IpLabel.setText(client_info['ComputerIP'])
         self.MacLabel.setText(client_info['ComputerMAC'])
@@ -745,103 +2017,475 @@ class MainWindow(QMainWindow, Ui_MainWindow, QtStyleTools):
             self.treeWidget_2.addTopLevelItem(item_clone)
 
     def send_insert_to_worker(self):
-        """构造插入语句"""
-        path = Path("Data/client_info.json")
-        new_data = GetClientInfo.get_system_info()
-        old_data = self.load_client_info(path)
-        if self.compare_client_info(new_data, old_data):
-            insert_sentence = """
-            MERGE INTO ComputerList AS target
-            USING (
-                SELECT 
-                    %s AS ComputerName,
-                    %s AS Name,
-                    %s AS LoginUserName,
-                    %s AS ComputerMAC,
-                    %s AS ComputerIP,
-                    %s AS StartTime
-            ) AS source
-            ON target.ComputerName = source.ComputerName AND target.Name = source.Name
-            WHEN MATCHED THEN
-                UPDATE SET
-                    target.LoginUserName = source.LoginUserName,
-                    target.ComputerMAC = source.ComputerMAC,
-                    target.ComputerIP = source.ComputerIP,
-                    target.StartTime = source.StartTime
-            WHEN NOT MATCHED THEN
-                INSERT (ComputerName, Name, LoginUserName, ComputerMAC, ComputerIP, StartTime)
-                VALUES (
-                    source.ComputerName,
-                    source.Name,
-                    source.LoginUserName,
-                    source.ComputerMAC,
-                    source.ComputerIP,
-                    source.StartTime
-                );
-            """
-            params = [
-                new_data['ComputerName'],
-                new_data['Name'],
-                new_data['LoginUserName'],
-                new_data['ComputerMAC'],
-                new_data['ComputerIP'],
-                new_data['StartTime']
-            ]
-            self.db_worker.send_insert(insert_sentence, params)
-            self.db_worker.insert_result.connect(lambda: self.save_client_info(path, new_data))
-            # self.db_worker.insert_result.connect(lambda x: QMessageBox.information(self, '提示', f"成功插入{x}条数据"))
+        """上报本机信息：身份信息与上次写入的不同时完整写入（MERGE），否则只更新最近登录时间"""
+        if self.client_info is None:  # 尚未采集到本机信息
+            return
+        self.report_timer.stop()
+        self.last_report_time = time.monotonic()
+        path = ClientReport.CLIENT_INFO_PATH
+        new_data = {**self.client_info, "StartTime": QDateTime.currentDateTime().toString("yyyy-MM-dd HH:mm:ss")}
+        old_data = ClientReport.load_client_info(path)
+        counters = ClientReport.load_counters(old_data)
+        if ClientReport.needs_upsert(new_data, old_data):
+            self.upsert_client_info(path, new_data, counters)
+        else:
+            self.touch_client_info(path, new_data, counters)
+
+    def upsert_client_info(self, path, new_data, counters):
+        """完整写入本机信息"""
+        insert_sentence, params, key = ClientReport.upsert_statement(new_data,
+                                                                     self.config["statements"]["use_procedures"])
+        self.db_worker.send_journaled("insert", insert_sentence, params, key).on_result(
+            lambda rows: self.client_info_saved(path, new_data, {**counters, "upserts": counters["upserts"] + 1}))
+
+    def touch_client_info(self, path, new_data, counters):
+        """
+        身份信息未变化，只更新最近登录时间
+
+        不写入日志：失败（服务器上没有该记录、未执行结构迁移或连接断开）时改为完整写入，由写操作日志保证送达
+        """
+        touch_sentence, params = ClientReport.touch_statement(new_data, self.config["client_info"]["touch_counter"])
+        self.db_worker.send_update(touch_sentence, params).on_result(
+            lambda rows: self.client_info_saved(path, new_data, {**counters, "touches": counters["touches"] + 1})
+        ).on_error(lambda error: self.upsert_client_info(path, new_data, counters))
+
+    def client_info_saved(self, path, new_data, counters):
+        """上报成功，记录本次写入的信息与上报次数"""
+        ClientReport.save_client_info(path, new_data, counters)
+        self.show_report_counters(counters)
 
     def send_query_to_worker(self):
-        """构造查询语句"""
-        query_str = [self.lineEdit.text()] * 7
-        if query_str[0]:
-            query_sentence = ("SELECT Name, LoginUserName, ComputerName, ComputerIP, "
-                              "ComputerMAC, StartTime, Tab FROM ComputerList "
-                              f"WHERE Name LIKE %s OR LoginUserName LIKE %s "
-                              f"OR ComputerName LIKE %s OR ComputerIP LIKE %s "
-                              f"OR ComputerMAC LIKE %s OR StartTime LIKE %s OR Tab LIKE %s")
+        """按搜索框内容查询（点击按钮或回车）"""
+        self.live_search_timer.stop()
+        self.live_search_term = None
+        term = self.lineEdit.text()
+        if term:
             self.lineEdit.clear()
-            self.db_worker.send_query(query_sentence, [f"%{s}%" for s in query_str])  # 添加通配符 % 实现模糊查询
+            self.search_term(term)
+        else:
+            self.start_browse()  # 空搜索不再全表查询，改为分页浏览
+
+    def search_term(self, term):
+        """构造查询语句：IP、网段、MAC、日期只查询对应列，其他搜索词七列模糊搜索"""
+        search_config = self.config["search"]
+        worker = self.search_worker()
+        if search_config["typed"]:
+            # 本地副本没有整数 IP 计算列
+            ip_number_column = search_config["ip_number_column"] if worker is self.db_worker else None
+            query = QueryParser.parse(term, ip_number_column, worker.dialect)
         else:
-            query_sentence = ("SELECT Name, LoginUserName, ComputerName, ComputerIP, "
-                              "ComputerMAC, StartTime, Tab FROM ComputerList")
-            self.db_worker.send_query(query_sentence)
+            query = QueryParser.generic(term, worker.dialect)
+
+        if self.federation_enabled and worker is self.db_worker:
+            sql, params = query.sql()
+            self.start_federated_query(sql, params)
+        elif query.kind != QueryParser.TEXT:
+            sql, params = query.sql()
+            self.start_query(sql, params, fallback=QueryParser.generic(term, worker.dialect).sql())
+        elif self.index_search_available():
+            self.start_search(term)
+        elif worker is self.db_worker and self.config["statements"]["use_procedures"]:
+            self.start_query(Statements.SEARCH_PROCEDURE, [term])
+        else:
+            sql, params = query.sql()
+            self.start_query(sql, params)
+        self.live_term = term
+        self.live_match = QueryParser.matcher(term, search_config["typed"])
+
+    def schedule_live_search(self):
+        """输入变化时重新计时，连续输入期间不发出查询"""
+        if self.liveSearchCheckBox.isChecked():
+            self.live_search_timer.start()
+
+    def live_search(self):
+        """停止输入后搜索，保留搜索框内容"""
+        term = self.lineEdit.text().strip()
+        if term == self.live_search_term:
+            return
+        self.live_search_term = term
+        if len(term) < self.live_search_min_chars:
+            self.cancel_pending_queries()  # 搜索词过短：只取消尚未完成的搜索
+            self.cancelQueryButton.setVisible(False)
+            self.label_2.setText("")
+            return
+        self.search_term(term)
 
-    @staticmethod
-    def compare_client_info(new_data, old_data):
-        """比较当前计算机信息与历史记录是否相同"""
-        if old_data:
-            return True
+    def start_query(self, sql, params=None, fallback=None):
+        """
+        以流式查询方式执行，结果分批追加到表格
 
-        # 比较两个 json 数据是否相同
-        if old_data == new_data:
-            return False
+        :param fallback: 没有结果时改为执行的 (查询语句, 参数)
+        """
+        self.cancel_pending_queries()
+        self.set_browse_controls_visible(False)
+        self.fallback_query = fallback
+
+        self.clientRecordModel.clear()
+        self.ClientRecordTable.setColumnHidden(ClientRecordModel.SOURCE_COLUMN, True)
+        self.query_row_count = 0
+        self.refresh_query = ("query", sql, params)
+        self.query_worker = self.search_worker()
+        self.query_task = self.query_worker.send_stream(sql, params)
+        self.query_task.on_batch(self.append_table_rows).on_result(self.query_finished).on_error(self.query_failed)
+        self.label_2.setText("正在查询...")
+        self.cancelQueryButton.setVisible(True)
+
+    def start_federated_query(self, sql, params):
+        """
+        联合搜索：同一查询同时发往本站与各站点，每个站点的结果到达后立即合并显示
+
+        相同主键的记录只保留最先到达的一行，来源列列出所有包含该记录的站点；
+        单个站点失败不影响其他站点。结果来自多个数据库，不参与自动刷新
+        """
+        self.cancel_pending_queries()
+        self.set_browse_controls_visible(False)
+        self.fallback_query = None
+
+        self.clientRecordModel.clear()
+        self.ClientRecordTable.setColumnHidden(ClientRecordModel.SOURCE_COLUMN, False)
+        self.query_row_count = 0
+        self.query_worker = self.db_worker
+        self.federated_rows = {}
+        self.federated_status = {}
+
+        sites = self.db_worker.site_names()
+        if self.config["federation"]["include_local"]:
+            sites.insert(0, None)
+        for site in sites:
+            name = site or self.local_site_name
+            task = self.db_worker.send_stream(sql, params, endpoint=site)
+            task.on_batch(lambda rows, name=name: self.append_federated_rows(name, rows))
+            task.on_result(lambda total, name=name: self.federated_site_finished(name, total))
+            task.on_error(lambda error, name=name: self.federated_site_failed(name, error))
+            self.federated_tasks[name] = task
+        self.label_2.setText("正在查询...")
+        self.cancelQueryButton.setVisible(True)
+
+    def append_federated_rows(self, site, rows):
+        """合并一个站点的一批结果：新记录追加并标注来源，已有的记录只补充来源"""
+        new_rows = []
+        for row in rows:
+            key = row_key(row)
+            existing = self.federated_rows.get(key)
+            if existing is None:
+                self.federated_rows[key] = self.clientRecordModel.rowCount() + len(new_rows)
+                new_rows.append(tuple(row) + (None, site))
+            elif existing < self.clientRecordModel.rowCount():
+                sources = self.clientRecordModel.text(existing, ClientRecordModel.SOURCE_COLUMN)
+                if site not in sources.split("、"):
+                    self.clientRecordModel.update_row(existing,
+                                                      {ClientRecordModel.SOURCE_COLUMN: f"{sources}、{site}"})
+            else:  # 同一批结果中的重复记录
+                index = existing - self.clientRecordModel.rowCount()
+                sources = new_rows[index][ClientRecordModel.SOURCE_COLUMN]
+                if site not in sources.split("、"):
+                    new_rows[index] = new_rows[index][:ClientRecordModel.SOURCE_COLUMN] + (f"{sources}、{site}",)
+        self.append_table_rows(new_rows)
+        if self.federated_tasks:
+            self.federated_query_progress()
+
+    def federated_site_finished(self, site, total):
+        self.federated_tasks.pop(site, None)
+        self.federated_status[site] = f"{total} 条"
+        self.federated_query_progress()
+
+    def federated_site_failed(self, site, error):
+        self.federated_tasks.pop(site, None)
+        self.federated_status[site] = f"失败：{error}"
+        self.show_message(f"站点 {site} {error}")
+        self.federated_query_progress()
+
+    def federated_query_progress(self):
+        """显示联合搜索进度；全部站点结束后显示合并后的行数与各站点情况"""
+        if self.federated_tasks:
+            self.label_2.setText(f"正在查询... 已加载 {self.query_row_count} 条"
+                                 f"（{len(self.federated_status)}/"
+                                 f"{len(self.federated_status) + len(self.federated_tasks)} 个站点已完成）")
+            return
+        failed = sum(1 for status in self.federated_status.values() if status.startswith("失败"))
+        self.label_2.setText(f"共 {self.query_row_count} 条" + (f"，{failed} 个站点失败" if failed else ""))
+        self.label_2.setToolTip("\n".join(f"{site}：{status}" for site, status in self.federated_status.items()))
+        self.cancelQueryButton.setVisible(False)
+        self.ClientRecordTable.resizeColumnsToContents()
+
+    def index_search_available(self):
+        """搜索在本地副本执行且三元组索引已建立"""
+        worker = self.search_worker()
+        return worker.search_index is not None and worker.search_index.index_ready.is_set()
+
+    def start_search(self, term):
+        """在本地副本的三元组索引中搜索，结果按匹配程度排序"""
+        self.cancel_pending_queries()
+        self.set_browse_controls_visible(False)
+        self.fallback_query = None
+
+        self.clientRecordModel.clear()
+        self.ClientRecordTable.setColumnHidden(ClientRecordModel.SOURCE_COLUMN, True)
+        self.query_row_count = 0
+        self.query_worker = self.search_worker()
+        limit = self.config["replica"]["search_limit"] or None
+        self.refresh_query = ("search", term, [limit] if limit else None)
+        self.query_task = self.query_worker.send_search(term, limit)
+        self.query_task.on_result(self.search_finished).on_error(self.query_failed)
+        self.label_2.setText("正在查询...")
+        self.cancelQueryButton.setVisible(True)
+
+    def search_finished(self, rows):
+        """索引搜索完成"""
+        self.append_table_rows(rows)
+        self.query_finished(len(rows))
+
+    def cancel_pending_queries(self):
+        """新查询取代尚未完成的旧查询与预取"""
+        if self.query_task:
+            self.query_task.cancel()
+            self.query_task = None
+        for task in self.federated_tasks.values():
+            task.cancel()
+        self.federated_tasks = {}
+        if self.prefetch_task:
+            self.prefetch_task.cancel()
+            self.prefetch_task = None
+        if self.refresh_task:
+            self.refresh_task.cancel()
+            self.refresh_task = None
+        self.prefetched_page = None
+        self.refresh_query = None
+        self.live_pending = []  # 之前收到的变更在新查询开始前已提交，新查询会读到
+
+    def start_browse(self):
+        """进入分页浏览模式，加载第一页"""
+        self.live_match = None
+        self.query_worker = self.search_worker()
+        self.pager.dialect = self.query_worker.dialect
+        sql, params, direction = self.pager.first_page()
+        self.load_page(sql, params, direction, restart=True)
+
+    def browse_next_page(self):
+        """下一页，已预取时直接显示"""
+        if not self.pager.has_next:
+            return
+        if self.prefetched_page and self.prefetched_page[0] == self.pager.last_key:
+            rows = self.prefetched_page[1]
+            self.cancel_pending_queries()
+            self.show_page(rows, KeysetPager.FORWARD, False)
+            return
+        sql, params, direction = self.pager.next_page()
+        self.load_page(sql, params, direction)
+
+    def browse_previous_page(self):
+        """上一页"""
+        if not self.pager.has_previous():
+            return
+        sql, params, direction = self.pager.previous_page()
+        self.load_page(sql, params, direction)
+
+    def load_page(self, sql, params, direction, restart=False):
+        """查询一页数据"""
+        self.cancel_pending_queries()
+        self.query_task = self.query_worker.send_query(sql, params)
+        self.query_task.on_result(lambda rows: self.show_page(rows, direction, restart)).on_error(self.query_failed)
+        self.label_2.setText("正在查询...")
+
+    def show_page(self, rows, direction, restart):
+        """显示一页数据并预取下一页"""
+        self.query_task = None
+        rows = self.pager.accept(rows, direction, restart)
+        self.clientRecordModel.clear()
+        self.ClientRecordTable.setColumnHidden(ClientRecordModel.SOURCE_COLUMN, True)
+        self.query_row_count = 0
+        self.append_table_rows(rows)
+        self.ClientRecordTable.resizeColumnsToContents()
+
+        self.refresh_query = ("query", *self.pager.current_page())
+        self.label_2.setText("")
+        self.pageLabel.setText(f"第 {self.pager.page_index + 1} 页")
+        self.set_browse_controls_visible(True)
+        self.previousPageButton.setEnabled(self.pager.has_previous())
+        self.nextPageButton.setEnabled(self.pager.has_next)
+
+        if self.prefetch_enabled and self.pager.has_next:
+            self.prefetch_next_page()
+        self.apply_pending_live_deltas()
+
+    def prefetch_next_page(self):
+        """以后台优先级预取下一页，不影响交互查询"""
+        after_key = self.pager.last_key
+        sql, params, _ = self.pager.next_page(after_key)
+        self.prefetch_task = self.query_worker.send_query(sql, params, priority=DatabaseWorker.PRIORITY_INSERT)
+        self.prefetch_task.on_result(lambda rows: self.prefetch_finished(after_key, rows)).on_error(
+            lambda error: None)  # 预取失败时翻页照常查询，不提示
+
+    def prefetch_finished(self, after_key, rows):
+        self.prefetch_task = None
+        self.prefetched_page = (after_key, rows)
+
+    def set_browse_controls_visible(self, visible):
+        self.browsing = visible
+        for widget in (self.previousPageButton, self.pageLabel, self.nextPageButton):
+            widget.setVisible(visible)
+
+    def switch_auto_refresh(self, checked):
+        """开启/关闭自动刷新"""
+        if checked:
+            self.refresh_timer.start()
         else:
-            return True
+            self.refresh_timer.stop()
 
-    @staticmethod
-    def load_client_info(path):
-        """读取客户端信息文件"""
-        if not path.exists():
-            # 文件不存在，创建文件返回空字典
-            with open(path, 'w', encoding='utf-8'):
-                return {}
-
-        # 文件存在，读取旧数据
-        with open(path, 'r', encoding='utf-8') as f:
-            try:
-                data = json.load(f)
-                return data
-            except json.JSONDecodeError:
-                # 如果文件内容不是合法的 json（如空文件），可以选择覆盖
-                with open(path, 'w', encoding='utf-8'):
-                    return {}
+    def refresh_results(self):
+        """重新执行当前查询，结果与表格增量合并"""
+        if self.query_task or self.refresh_task or not self.refresh_query:  # 查询进行中时跳过本次刷新
+            return
+        refresh_query = self.refresh_query
+        task_type, sql, params = refresh_query
+        self.refresh_task = self.query_worker.submit(task_type, sql, params, use_cache=False)
+        self.refresh_task.on_result(lambda rows: self.apply_refresh(refresh_query, rows)).on_error(
+            self.refresh_failed)
+
+    def apply_refresh(self, refresh_query, rows):
+        """把刷新结果按主键合并到表格"""
+        self.refresh_task = None
+        if refresh_query is not self.refresh_query:  # 期间已发起新的查询
+            return
+        inserted, removed, changed = self.clientRecordModel.apply_diff(rows, ordered=self.browsing)
+        if self.browsing and rows:  # 本页的行有变化，下一页从刷新后的最后一行之后开始
+            self.pager.last_key = row_key(rows[-1])
+        self.query_row_count = self.clientRecordModel.rowCount()
+        self.apply_online_filter()
+        if inserted or removed or changed:
+            self.show_message(f"已刷新：新增 {inserted} 条，删除 {removed} 条，修改 {changed} 条")
+
+    def apply_live_delta(self, rows, deleted):
+        """
+        把推送的变更合并到当前结果；查询进行中时先保留，查询完成后合并（已加载的行可能是变更前读取的）。
+        联合搜索或已取消的结果（不自动刷新的结果）不合并
+        """
+        if not self.refresh_query:
+            return
+        if self.query_task:
+            self.live_pending.append((rows, deleted))
+            return
+        inserted, removed, changed = self.clientRecordModel.apply_changes(rows, deleted, self.live_match)
+        if not (inserted or removed or changed):
+            return
+        self.query_row_count = self.clientRecordModel.rowCount()
+        self.apply_online_filter()
+        if self.live_match is not None:
+            self.label_2.setText(f"共 {self.query_row_count} 条")
+
+    def apply_pending_live_deltas(self):
+        """合并查询进行中收到的变更"""
+        pending, self.live_pending = self.live_pending, []
+        for rows, deleted in pending:
+            self.apply_live_delta(rows, deleted)
+
+    def refresh_presence(self):
+        """以后台优先级读取在线计算机（总是查询数据库，不使用缓存结果）"""
+        if self.presence_task:
+            return
+        self.presence_task = self.db_worker.send_query(Statements.online_computers(self.db_worker.dialect),
+                                                       [self.presence_ttl],
+                                                       priority=DatabaseWorker.PRIORITY_INSERT, use_cache=False)
+        self.presence_task.on_result(self.presence_updated).on_error(self.presence_failed)
+
+    def presence_updated(self, rows):
+        """更新在线列，并按“仅显示在线”重新筛选"""
+        self.presence_task = None
+        self.clientRecordModel.set_online_keys({(row[0], row[1]) for row in rows})
+        self.onlineOnlyCheckBox.setToolTip(f"在线 {len(rows)} 台")
+        self.apply_online_filter()
+
+    def presence_failed(self, error):
+        """读取失败（如数据库不可达）时保留上次的在线状态，下次再试"""
+        self.presence_task = None
+
+    def apply_online_filter(self, first_row=0):
+        """
+        勾选“仅显示在线”时隐藏离线计算机所在的行，first_row 之前的行不变（追加结果时使用）
 
-    @staticmethod
-    def save_client_info(path, client_info):
-        """保存客户端信息"""
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(client_info, f, ensure_ascii=False, indent=4)
+        未勾选且没有隐藏过行时不逐行处理；逐行处理时只更新显示状态有变化的行
+        """
+        only_online = self.presence_enabled and self.onlineOnlyCheckBox.isChecked()
+        if not only_online and not self.online_filtered:  # 未筛选时所有行本来就是显示的
+            return
+        for row in range(first_row, self.clientRecordModel.rowCount()):
+            hidden = only_online and not self.clientRecordModel.is_online(row)
+            if self.ClientRecordTable.isRowHidden(row) != hidden:
+                self.ClientRecordTable.setRowHidden(row, hidden)
+        if only_online or first_row == 0:
+            self.online_filtered = only_online
+
+    def refresh_failed(self, error):
+        self.refresh_task = None
+        self.show_message(error)
+
+    def cancel_query(self):
+        """取消当前查询，已加载的结果保留"""
+        cancelled = [task.cancel() for task in self.federated_tasks.values()]
+        if (self.query_task and self.query_task.cancel()) or any(cancelled):
+            self.label_2.setText(f"已取消，已加载 {self.query_row_count} 条")
+        self.query_task = None
+        self.federated_tasks = {}
+        self.refresh_query = None  # 结果不完整，不再自动刷新
+        self.cancelQueryButton.setVisible(False)
+
+    def query_finished(self, total):
+        """查询完成"""
+        self.query_task = None
+        if not total and self.fallback_query:  # 按类型搜索没有结果，改为七列模糊搜索
+            sql, params = self.fallback_query
+            self.start_query(sql, params)
+            self.live_match = QueryParser.matcher(self.live_term, typed=False)
+            return
+        self.label_2.setText(f"共 {total} 条")
+        tooltip = [f"{endpoint['name']}：" + ("不可用" if not endpoint["healthy"] else
+                                              "未探测" if endpoint["latency_ms"] is None else
+                                              f"{endpoint['latency_ms']} ms")
+                   for endpoint in self.query_worker.endpoints.stats()]
+        if self.query_worker.cache:
+            stats = self.query_worker.cache.stats()
+            tooltip.append(f"查询缓存：命中 {stats['hits']} 次，旧结果命中 {stats['stale_hits']} 次，"
+                           f"未命中 {stats['misses']} 次")
+        self.label_2.setToolTip("\n".join(tooltip))
+        self.cancelQueryButton.setVisible(False)
+        self.ClientRecordTable.resizeColumnsToContents()  # 根据内容自适应列宽
+        self.apply_pending_live_deltas()
+
+    def query_failed(self, error):
+        """查询失败"""
+        self.query_task = None
+        self.live_pending = []
+        self.label_2.setText("")
+        self.cancelQueryButton.setVisible(False)
+        self.show_message(error)
+
+    def show_report_counters(self, counters):
+        """在计算机名的提示中显示本机上报次数"""
+        self.report_counters_text = (f"本机上报：完整写入 {counters['upserts']} 次，"
+                                     f"仅更新登录时间 {counters['touches']} 次")
+        self.update_client_tooltip()
+
+    def refresh_fleet_stats(self):
+        """以后台优先级读取全部计算机的上报统计（总是查询数据库，不使用缓存结果）"""
+        if self.fleet_stats_task:
+            return
+        self.fleet_stats_task = self.db_worker.send_query(Statements.FLEET_WRITE_STATS,
+                                                          priority=DatabaseWorker.PRIORITY_INSERT, use_cache=False)
+        self.fleet_stats_task.on_result(self.fleet_stats_updated).on_error(self.fleet_stats_failed)
+
+    def fleet_stats_updated(self, rows):
+        self.fleet_stats_task = None
+        computers, touches = rows[0] if rows else (0, 0)
+        self.fleet_stats_text = f"全部 {computers} 台计算机：仅更新登录时间 {touches or 0} 次"
+        self.update_client_tooltip()
+
+    def fleet_stats_failed(self, error):
+        """读取失败（如数据库不可达或未执行结构迁移版本 7）时保留上次的统计，下次再试"""
+        self.fleet_stats_task = None
+
+    def update_client_tooltip(self):
+        self.ClientNameLabel.setToolTip("\n".join(text for text in (self.report_counters_text, self.fleet_stats_text)
+                                                   if text))
 
     def load_treeWidget(self, file_path):
         """从文件递归加载树结构"""
@@ -891,16 +2535,85 @@ class MainWindow(QMainWindow, Ui_MainWindow, QtStyleTools):
         except FileNotFoundError:
             pass
 
-    def update_table(self, results):
-        """更新表格数据"""
-        self.ClientRecordTable.setRowCount(len(results))
-        for row, data in enumerate(results):
-            for col, value in enumerate(data):
-                self.ClientRecordTable.setItem(row, col, QTableWidgetItem(value))
-            self.ClientRecordTable.setCellWidget(row, 7,
-                                                 FuncQLabel(self.ClientRecordTable, self.db_worker,
-                                                            self.listWidget))  # 添加自定义控件
-        self.ClientRecordTable.resizeColumnsToContents()  # 根据内容自适应列宽
+    def append_table_rows(self, results):
+        """向表格追加一批查询结果"""
+        first_row = self.clientRecordModel.rowCount()
+        self.clientRecordModel.append_rows(results)
+        self.apply_online_filter(first_row)
+        if first_row == 0:
+            self.ClientRecordTable.resizeColumnsToContents()  # 首批结果到达时按内容调整列宽
+
+        self.query_row_count += len(results)
+        self.label_2.setText(f"正在查询... 已加载 {self.query_row_count} 条")
+
+    def click_link(self, key, row):
+        """点击搜索结果中的连接/编辑链接"""
+        full_name, login_user_name, computer_name, ip = [self.clientRecordModel.text(row, column)
+                                                          for column in range(4)]
+
+        attributes = {
+            "full_name": full_name,
+            "login_user_name": login_user_name,
+            "computer_name": computer_name,
+            "ip": ip,
+        }
+
+        if key == "Link":
+            # 调用UltraVNC外部程序
+            vnc_process = QProcess()
+            vnc_path = r".\x64\vncviewer.exe"
+            args = [
+                f"{ip}",
+                "-password",
+                "111111"
+            ]
+            vnc_process.setProgram(vnc_path)
+            vnc_process.setArguments(args)
+            vnc_process.startDetached()
+
+            if self.insert_history_record(attributes):  # 向历史列表添加连接记录
+                self.save_listWidget()
+            return
+        if key == "Edit":
+            source = self.clientRecordModel.text(row, ClientRecordModel.SOURCE_COLUMN)
+            if source and self.local_site_name not in source.split("、"):  # 联合搜索中只在其他站点存在的记录
+                self.show_message(f"该记录来自站点 {source}，请在该站点修改")
+                return
+            edit_dialog = EditDialog(self.clientRecordModel, row, self.db_worker)  # 传入表格数据模型、行号与数据库工作线程
+            edit_dialog.exec()
+            return
+
+    def insert_history_record(self, item_attributes):
+        """插入历史列表"""
+        if self.item_exists(item_attributes):
+            return False
+
+        if self.listWidget.count() < 16:
+            self.listWidget.insertItem(0, HisListWidgetItem(item_attributes))
+            return True
+
+        if self.listWidget.count() == 16:
+            self.listWidget.insertItem(0, HisListWidgetItem(item_attributes))
+            last_item = self.listWidget.takeItem(self.listWidget.count() - 1)  # 移除历史连接记录列表最后一行
+            del last_item  # 显式删除
+            return True
+
+    def item_exists(self, attributes):
+        """判断历史列表中是否存在该连接记录"""
+        for i in range(self.listWidget.count()):
+            item = self.listWidget.item(i)
+            if item.attributes == attributes:
+                return True
+        return False
+
+    def save_listWidget(self):
+        """保存历史列表结构"""
+        attributes_list = []
+        with open("Data/listStructure.json", "w", encoding="utf-8") as f:
+            for i in range(self.listWidget.count()):
+                item = self.listWidget.item(i)
+                attributes_list.append(item.attributes)
+            json.dump(attributes_list, f, ensure_ascii=False, indent=2)
 
     @staticmethod
     def item_double_clicked(item):
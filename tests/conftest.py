@@ -0,0 +1,31 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+# 测试直接导入仓库根目录下的模块（Func、collector）
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from Func import Migrations  # noqa: E402
+
+
+@pytest.fixture
+def sqlite_path(tmp_path):
+    """执行了全部结构迁移的 SQLite 替身数据库文件"""
+    path = tmp_path / "ComputerList.db"
+    connection = Migrations.connect(Migrations.SQLITE, str(path))
+    try:
+        Migrations.migrate(connection, Migrations.SQLITE, log=lambda message: None)
+    finally:
+        connection.close()
+    return path
+
+
+@pytest.fixture
+def sqlite_db(sqlite_path):
+    connection = sqlite3.connect(str(sqlite_path), check_same_thread=False)
+    yield connection
+    connection.close()
@@ -0,0 +1,62 @@
+import copy
+import sqlite3
+
+import pytest
+
+from collector import CollectorService
+from Func import Config
+
+
+def row(version, computer_name, name):
+    """changed_computers 的结果行：ChangeVer 之后为搜索结果的七列"""
+    return (version, name, "user", computer_name, "10.0.0.1", None, None, None)
+
+
+@pytest.fixture
+def service(sqlite_path):
+    config = copy.deepcopy(Config.DEFAULT_CONFIG)
+    config["live"]["reread_window"] = 30
+    service = CollectorService(config, lambda: sqlite3.connect(str(sqlite_path), check_same_thread=False), "sqlite")
+    yield service
+    service.executor.shutdown()
+
+
+def test_resolve_skips_versions_already_sent(service):
+    rows, deleted = service.resolve_changes([row(1, "pc1", "a"), row(2, "pc2", "b")], [(3, "pc9", "z")])
+    assert [r[2] for r in rows] == ["pc1", "pc2"]
+    assert deleted == [["pc9", "z"]]
+    assert (service.row_version, service.deleted_version) == (2, 3)
+
+    # 重新读取窗口内再次读到的版本不重复推送，晚提交的较小版本仍然推送
+    rows, deleted = service.resolve_changes([row(1, "pc1", "a"), row(2, "pc2", "b"), row(4, "pc3", "c")],
+                                            [(3, "pc9", "z"), (1, "pc8", "y")])
+    assert [r[2] for r in rows] == ["pc3"]
+    assert deleted == [["pc8", "y"]]
+    assert (service.row_version, service.deleted_version) == (4, 3)
+
+
+def test_resolve_keeps_newer_of_change_and_delete(service):
+    rows, deleted = service.resolve_changes([row(5, "pc1", "a"), row(6, "pc2", "b")],
+                                            [(7, "pc1", "a"), (4, "pc2", "b")])
+    assert [r[2] for r in rows] == ["pc2"]
+    assert deleted == [["pc1", "a"]]
+
+
+def test_reread_floor_follows_window(service):
+    service.version_history.extend([(0, 1, 1), (10, 5, 2), (25, 8, 3), (45, 9, 4)])
+    assert service.reread_floor(35) == (1, 1)  # 30 秒前（5 秒）之后才有的记录，保留最早一次
+    assert service.reread_floor(42) == (5, 2)
+    assert service.reread_floor(100) == (9, 4)
+    assert len(service.version_history) == 1
+
+
+def test_read_changes_from_sqlite(service, sqlite_db):
+    sqlite_db.execute("INSERT INTO ComputerList (ComputerName, Name, LoginUserName) VALUES ('pc1', 'a', 'u')")
+    sqlite_db.execute("INSERT INTO ComputerList (ComputerName, Name, LoginUserName) VALUES ('pc2', 'b', 'u')")
+    sqlite_db.execute("DELETE FROM ComputerList WHERE ComputerName = 'pc1'")
+    sqlite_db.commit()
+
+    rows, deleted = service.read_changes(0, 0)
+    assert [(r[0], r[3]) for r in rows] == [(2, "pc2")]
+    assert [tuple(d) for d in deleted] == [(3, "pc1", "a")]
+    assert service.read_changes(2, 3) == ([], [])
@@ -0,0 +1,57 @@
+from Func.ComputerListQuery import COLUMNS, KeysetPager, primary_key, row_key
+
+ROWS = sorted((f"name{i}", f"user{i // 3}", f"pc{i:02d}", f"10.0.0.{i}", None, None, None) for i in range(10))
+ROWS.sort(key=row_key)
+
+
+def run(pager, sql, params, direction, restart=False):
+    """按语句的条件在内存中取一页，模拟数据库执行分页语句"""
+    if direction == KeysetPager.BACKWARD:
+        candidates = [row for row in reversed(ROWS) if not params or row_key(row) < (params[0], params[2])]
+    elif not params:
+        candidates = ROWS
+    elif ">= %s)" in sql:
+        candidates = [row for row in ROWS if row_key(row) >= (params[0], params[2])]
+    else:
+        candidates = [row for row in ROWS if row_key(row) > (params[0], params[2])]
+    return pager.accept(candidates[:pager.page_size + 1], direction, restart)
+
+
+def test_keys():
+    row = ("name", "user", "pc", "ip", "mac", "time", "tab")
+    assert len(row) == len(COLUMNS)
+    assert row_key(row) == ("user", "pc")
+    assert primary_key(row) == ("pc", "name")
+
+
+def test_pages_forward_and_back():
+    pager = KeysetPager(page_size=4, dialect="sqlite")
+    sql, params, direction = pager.first_page()
+    assert sql.endswith("ORDER BY LoginUserName, ComputerName LIMIT 5")
+    assert run(pager, sql, params, direction, restart=True) == ROWS[:4]
+    assert pager.has_next and not pager.has_previous()
+
+    assert run(pager, *pager.next_page()) == ROWS[4:8]
+    assert run(pager, *pager.next_page()) == ROWS[8:]
+    assert not pager.has_next and pager.page_index == 2
+
+    sql, params, direction = pager.previous_page()
+    assert "ORDER BY LoginUserName DESC, ComputerName DESC" in sql
+    assert run(pager, sql, params, direction) == ROWS[4:8]
+    assert pager.has_next and pager.page_index == 1
+    assert run(pager, *pager.previous_page()) == ROWS[:4]
+    assert pager.page_index == 0
+
+
+def test_current_page_restarts_at_first_key():
+    pager = KeysetPager(page_size=4, dialect="sqlite")
+    run(pager, *pager.first_page(), restart=True)
+    run(pager, *pager.next_page())
+    sql, params = pager.current_page()
+    assert params == [ROWS[4][1], ROWS[4][1], ROWS[4][2]]
+    assert "LIMIT 4" in sql
+
+
+def test_mssql_uses_top():
+    sql, _, _ = KeysetPager(page_size=100).first_page()
+    assert sql.startswith("SELECT TOP (101) ")
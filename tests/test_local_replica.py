@@ -0,0 +1,40 @@
+from Func.LocalReplica import LocalReplica
+
+
+def record(computer_name, name, ip="10.0.0.1", start_time="2024-01-01 08:00:00"):
+    return (name, "user", computer_name, ip, None, start_time, None)
+
+
+def keys(replica):
+    return sorted(replica.connection.execute("SELECT ComputerName, Name FROM ComputerList").fetchall())
+
+
+def test_rows_differing_only_in_name_are_kept(tmp_path):
+    replica = LocalReplica(tmp_path / "replica.db")
+    replica.replace_all([[record("pc", "a"), record("pc", "b")]])
+    replica.apply_rows([record("pc", "a", ip="10.0.0.2", start_time="2024-02-01 08:00:00")])
+    assert keys(replica) == [("pc", "a"), ("pc", "b")]
+    assert replica.watermark() == "2024-02-01 08:00:00"
+    assert replica.change_versions() is None
+    replica.close()
+
+
+def test_apply_changes_by_version(tmp_path):
+    replica = LocalReplica(tmp_path / "replica.db")
+    replica.build_index()
+    replica.replace_all([[record("pc1", "a"), record("pc2", "b")]], (2, 0))
+    assert replica.change_versions() == (2, 0)
+
+    # pc1 改名为 pc3（新行与旧主键的删除记录），pc2 删除后又以较新的版本重新写入
+    rows = [(3,) + record("pc3", "a"), (6,) + record("pc2", "b", ip="10.0.0.9")]
+    deleted = [(3, "pc1", "a"), (5, "pc2", "b")]
+    assert replica.apply_changes(rows, deleted, (6, 5)) == 3
+    assert keys(replica) == [("pc2", "b"), ("pc3", "a")]
+    assert replica.change_versions() == (6, 5)
+    assert replica.reread_versions() == (2, 0)  # 下次从本次同步前的版本重读
+    assert sorted(replica.index.records) == keys(replica)
+
+    replica.apply_changes([], [(7, "pc3", "a")], (6, 7))
+    assert keys(replica) == [("pc2", "b")]
+    assert sorted(replica.index.records) == [("pc2", "b")]
+    replica.close()
@@ -0,0 +1,85 @@
+import sqlite3
+
+from Func import Migrations, Statements
+from Func.ComputerListQuery import COLUMNS
+
+
+def migrate(path, target=None):
+    connection = Migrations.connect(Migrations.SQLITE, str(path))
+    try:
+        return Migrations.migrate(connection, Migrations.SQLITE, target, log=lambda message: None)
+    finally:
+        connection.close()
+
+
+def insert(db, **values):
+    db.execute(f"INSERT INTO ComputerList ({', '.join(values)}) VALUES ({', '.join('?' * len(values))})",
+               list(values.values()))
+    db.commit()
+
+
+def sqlite(sql):
+    return sql.replace("%s", "?")
+
+
+def test_upgrade_to_latest_is_idempotent(tmp_path):
+    path = tmp_path / "ComputerList.db"
+    assert migrate(path) == Migrations.latest_version()
+    assert migrate(path) == Migrations.latest_version()
+    connection = Migrations.connect(Migrations.SQLITE, str(path))
+    try:
+        assert Migrations.pending_migrations(connection, Migrations.SQLITE) == []
+    finally:
+        connection.close()
+
+
+def test_upgrade_keeps_newest_duplicate(tmp_path):
+    path = tmp_path / "ComputerList.db"
+    migrate(path, target=1)  # 原有结构：没有主键，允许空值
+    db = sqlite3.connect(str(path))
+    insert(db, Name="a", ComputerName="pc", ComputerIP="10.0.0.1", StartTime="2024-01-01 08:00:00")
+    insert(db, Name="a", ComputerName="pc", ComputerIP="10.0.0.2", StartTime="2024-03-01 08:00:00")
+    insert(db, Name=None, ComputerName="pc2", StartTime="2024-01-01 08:00:00")
+    db.close()
+
+    migrate(path)
+    db = sqlite3.connect(str(path))
+    rows = db.execute("SELECT ComputerName, Name, ComputerIP, ComputerIPNum FROM ComputerList "
+                      "ORDER BY ComputerName").fetchall()
+    db.close()
+    assert rows == [("pc", "a", "10.0.0.2", 167772162), ("pc2", "", None, None)]
+
+
+def test_change_versions_and_tombstones(sqlite_db):
+    insert(sqlite_db, Name="a", ComputerName="pc1", LoginUserName="u")
+    insert(sqlite_db, Name="b", ComputerName="pc2", LoginUserName="u")
+    sqlite_db.execute("UPDATE ComputerList SET ComputerName = 'pc3' WHERE ComputerName = 'pc1'")
+    sqlite_db.execute("UPDATE ComputerList SET LastSeen = '2024-01-01 00:00:00'")  # 不产生变更版本
+    sqlite_db.execute("DELETE FROM ComputerList WHERE ComputerName = 'pc2'")
+    sqlite_db.commit()
+
+    changed = sqlite_db.execute(sqlite(Statements.changed_computers(10, "sqlite")), [0]).fetchall()
+    assert [(row[0], row[1 + COLUMNS.index("ComputerName")]) for row in changed] == [(3, "pc3")]
+    deleted = sqlite_db.execute(sqlite(Statements.DELETED_COMPUTERS), [0]).fetchall()
+    assert deleted == [(3, "pc1", "a"), (4, "pc2", "b")]
+    assert sqlite_db.execute(Statements.MAX_CHANGE_VERSIONS).fetchone() == (3, 4)
+
+
+def test_purge_keeps_recent_tombstones(sqlite_db):
+    insert(sqlite_db, Name="a", ComputerName="pc1")
+    insert(sqlite_db, Name="b", ComputerName="pc2")
+    sqlite_db.execute("DELETE FROM ComputerList")
+    sqlite_db.execute("UPDATE ComputerListDeleted SET DeletedAt = '2000-01-01 00:00:00' WHERE ComputerName = 'pc1'")
+    sqlite_db.commit()
+
+    purge = sqlite(Statements.purge_deleted_computers("sqlite"))
+    assert sqlite_db.execute(purge, [100, 3600]).rowcount == 1
+    assert sqlite_db.execute("SELECT ComputerName FROM ComputerListDeleted").fetchall() == [("pc2",)]
+
+
+def test_online_computers(sqlite_db):
+    insert(sqlite_db, Name="a", ComputerName="pc1")
+    insert(sqlite_db, Name="b", ComputerName="pc2")
+    sqlite_db.execute(sqlite(Statements.bulk_touch_last_seen(1, "sqlite")), ["pc1", "a"])
+    sqlite_db.commit()
+    assert sqlite_db.execute(sqlite(Statements.online_computers("sqlite")), [120]).fetchall() == [("pc1", "a")]
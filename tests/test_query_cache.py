@@ -0,0 +1,64 @@
+from Func.QueryCache import QueryCache, extract_tables
+
+SELECT = "SELECT Name FROM ComputerList WHERE Name = %s"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_extract_tables():
+    assert extract_tables("SELECT * FROM [dbo].[ComputerList] JOIN Other o ON 1 = 1") == {"computerlist", "other"}
+    assert extract_tables("MERGE INTO dbo.ComputerList AS target") == {"computerlist"}
+    assert extract_tables("EXEC dbo.usp_UpsertComputer %s") == set()
+
+
+def test_fresh_then_stale_then_expired():
+    clock = Clock()
+    cache = QueryCache(ttl=30, stale_ttl=60, clock=clock)
+    cache.put(SELECT, ["a"], [("a",)])
+    assert cache.get("SELECT  Name\nFROM ComputerList WHERE Name = %s", ["a"]) == ([("a",)], QueryCache.FRESH)
+
+    clock.now = 31
+    assert cache.get(SELECT, ["a"]) == ([("a",)], QueryCache.STALE)
+
+    clock.now = 91
+    assert cache.get(SELECT, ["a"]) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_and_row_limits():
+    cache = QueryCache(max_entries=2, max_rows=2)
+    cache.put(SELECT, ["a"], [])
+    cache.put(SELECT, ["b"], [])
+    cache.get(SELECT, ["a"])
+    cache.put(SELECT, ["c"], [])
+    assert cache.get(SELECT, ["b"]) is None
+    assert cache.get(SELECT, ["a"]) is not None
+
+    cache.put(SELECT, ["d"], [("1",), ("2",), ("3",)])
+    assert cache.get(SELECT, ["d"]) is None
+
+
+def test_invalidate_by_table():
+    cache = QueryCache()
+    cache.put(SELECT, ["a"], [])
+    cache.put("SELECT Version FROM SchemaVersion", [], [])
+    cache.invalidate("UPDATE ComputerList SET Tab = %s")
+    assert cache.get(SELECT, ["a"]) is None
+    assert cache.get("SELECT Version FROM SchemaVersion", []) is not None
+
+    cache.invalidate("EXEC dbo.usp_UpdateComputer %s")  # 无法识别表名时全部失效
+    assert cache.get("SELECT Version FROM SchemaVersion", []) is None
+
+
+def test_put_ignored_after_invalidation_during_query():
+    cache = QueryCache()
+    generation = cache.generation()
+    cache.invalidate("DELETE FROM ComputerList")
+    cache.put(SELECT, ["a"], [("old",)], generation)
+    assert cache.get(SELECT, ["a"]) is None
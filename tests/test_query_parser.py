@@ -0,0 +1,65 @@
+import pytest
+
+from Func import QueryParser
+from Func.ComputerListQuery import COLUMNS
+
+
+def record(**values):
+    return tuple(values.get(column) for column in COLUMNS)
+
+
+@pytest.mark.parametrize("term, where, params", [
+    ("192.168.2.15", "ComputerIP = %s", ["192.168.2.15"]),
+    ("192.168.2", "ComputerIP LIKE %s", ["192.168.2%"]),
+    ("192.168.", "ComputerIP LIKE %s", ["192.168.%"]),
+    ("d8-80-83-1a-2b-3c", "ComputerMAC = %s", ["D8:80:83:1A:2B:3C"]),
+    ("D8:80:83", "ComputerMAC LIKE %s", ["D8:80:83%"]),
+    ("2025-07-28", "StartTime >= %s AND StartTime < %s", ["2025-07-28 00:00:00", "2025-07-29 00:00:00"]),
+    ("2025/12", "StartTime >= %s AND StartTime < %s", ["2025-12-01 00:00:00", "2026-01-01 00:00:00"]),
+])
+def test_typed_terms(term, where, params):
+    query = QueryParser.parse(term)
+    assert query.where == where
+    assert query.params == params
+    assert query.kind != QueryParser.TEXT
+
+
+def test_cidr_expands_to_prefixes():
+    query = QueryParser.parse("10.1.0.0/22")
+    assert query.kind == QueryParser.CIDR
+    assert query.params == ["10.1.0.%", "10.1.1.%", "10.1.2.%", "10.1.3.%"]
+
+
+def test_cidr_uses_ip_number_column():
+    query = QueryParser.parse("192.168.248.0/24", "ComputerIPNum")
+    assert query.where == "ComputerIPNum BETWEEN %s AND %s"
+    assert query.params == [3232299008, 3232299263]
+
+
+@pytest.mark.parametrize("term", ["10.1", "2.5"])
+def test_short_dotted_numbers_search_ip_prefix_and_text(term):
+    query = QueryParser.parse(term)
+    assert query.kind == QueryParser.TEXT
+    assert query.where.startswith("ComputerIP LIKE %s OR ")
+    assert query.params == [f"{term}%"] + [f"%{term}%"] * len(COLUMNS)
+
+
+@pytest.mark.parametrize("term", ["zhangsan", "300.1.1.1", "2025-13-01"])
+def test_untyped_terms_fall_back_to_generic(term):
+    assert QueryParser.parse(term).where == QueryParser.generic(term).where
+
+
+def test_generic_converts_start_time_on_mssql_only():
+    assert "CONVERT(varchar(19), StartTime, 120) LIKE %s" in QueryParser.generic("x").where
+    assert "StartTime LIKE %s" in QueryParser.generic("x", "sqlite").where
+
+
+def test_matcher_mirrors_parse():
+    assert QueryParser.matcher("192.168.2")(record(ComputerIP="192.168.20.1"))
+    assert not QueryParser.matcher("192.168.2.1")(record(ComputerIP="192.168.2.15"))
+    assert QueryParser.matcher("192.168.0.0/16")(record(ComputerIP="192.168.2.15"))
+    assert QueryParser.matcher("d8-80-83")(record(ComputerMAC="D8:80:83:1A:2B:3C"))
+    assert QueryParser.matcher("2025-07")(record(StartTime="2025-07-28 08:00:00"))
+    assert QueryParser.matcher("ZHANG")(record(Name="zhangsan"))
+    assert QueryParser.matcher("10.1")(record(ComputerIP="10.1.5.5"))
+    assert QueryParser.matcher("2.5")(record(Tab="version 2.5"))
@@ -0,0 +1,44 @@
+from Func.WriteJournal import WriteJournal
+
+UPSERT = "MERGE INTO ComputerList ..."
+
+
+def test_same_key_is_coalesced(tmp_path):
+    journal = WriteJournal(tmp_path / "journal.jsonl")
+    first, superseded = journal.append("insert", UPSERT, ["pc", "a", "1"], key=["pc", "a"])
+    assert superseded == []
+    journal.append("update", "UPDATE ComputerList SET Tab = %s", ["x"])
+    second, superseded = journal.append("insert", UPSERT, ["pc", "a", "2"], key=("pc", "a"))
+    assert superseded == [first]
+    assert [entry["id"] for entry in journal.pending()] == [first + 1, second]
+    assert journal.pending()[-1]["params"] == ["pc", "a", "2"]
+    journal.close()
+
+
+def test_pending_survives_restart(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = WriteJournal(path)
+    first, _ = journal.append("insert", UPSERT, ["1"], key=["pc", "a"])
+    second, _ = journal.append("insert", UPSERT, ["2"], key=["pc", "b"])
+    journal.ack(first)
+    journal.close()
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"id": 99, "type": "ins')  # 写入中途断电留下的不完整行
+
+    journal = WriteJournal(path)
+    assert [entry["id"] for entry in journal.pending()] == [second]
+    third, _ = journal.append("insert", UPSERT, ["3"])
+    assert third == second + 1
+    journal.close()
+
+
+def test_file_cleared_when_all_acked(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = WriteJournal(path)
+    entry_id, _ = journal.append("insert", UPSERT, ["1"])
+    journal.ack(entry_id)
+    journal.ack(entry_id)  # 重复确认无影响
+    assert len(journal) == 0
+    assert path.read_text(encoding="utf-8") == ""
+    journal.close()